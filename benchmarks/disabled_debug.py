@@ -0,0 +1,54 @@
+"""
+Benchmark of cost of disabled DEBUG call in nanoseconds, for every
+combination of loggers made by `LoggersFactory`, with and without keyword
+parameters of StructuredLogger. Best of few rounds is reported to limit
+noise of other processes.
+
+Run it from repository root, package doesn't have to be installed:
+
+    PYTHONPATH=. python benchmarks/disabled_debug.py
+"""
+import logging
+import time
+
+from pysllo.utils import LoggersFactory
+
+CALLS = 200000
+ROUNDS = 5
+
+
+def run(call):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        for _ in range(CALLS):
+            call()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / CALLS * 1e9
+
+
+def main():
+    print('{0:<35} {1:>10} {2:>10}'.format('loggers', 'plain', 'kwargs'))
+    for structured in (False, True):
+        for propagation in (False, True):
+            for tracking in (False, True):
+                MixedLogger = LoggersFactory.make(
+                    structured_logger=structured,
+                    propagation_logger=propagation,
+                    tracking_logger=tracking)
+                logger = MixedLogger('bench')
+                logger.setLevel(logging.INFO)
+                plain = run(lambda: logger.debug('user %s', 'john'))
+                kwargs = run(lambda: logger.debug('user %s', 'john',
+                                                  ip='127.0.0.1'))
+                names = [name for name, enabled in (
+                    ('structured', structured),
+                    ('propagation', propagation),
+                    ('tracking', tracking)) if enabled] or ['logging']
+                print('{0:<35} {1:>8.0f}ns {2:>8.0f}ns'.format(
+                    '+'.join(names), plain, kwargs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of JsonFormatter speed in records per second, current path that
+copies whole record against field plans, cheaper id strategies and
+BinaryFormatter. Best of few rounds is reported to limit noise of other
+processes.
+
+Run it from repository root, package doesn't have to be installed:
+
+    PYTHONPATH=. python benchmarks/json_formatter.py
+"""
+import logging
+import time
+
+from pysllo.formatters import BinaryFormatter, JsonFormatter, FieldPlan
+
+RECORDS = 20000
+ROUNDS = 5
+
+
+def make_record():
+    record = logging.LogRecord('app', logging.INFO, __file__, 10,
+                               'user %s logged in from %s',
+                               ('john', '127.0.0.1'), None)
+    record.request_id = 'a1b2c3'
+    record.ip = '127.0.0.1'
+    return record
+
+
+def run(formatter):
+    record = make_record()
+    best = None
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        for _ in range(RECORDS):
+            formatter.format(record)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return RECORDS / best
+
+
+def main():
+    current = run(JsonFormatter())
+    print('current path:   {0:>10.0f} records/s'.format(current))
+    variants = [
+        ('default plan:', {'plan': FieldPlan()}),
+        ('narrow plan:', {'plan': FieldPlan(
+            fields=['name', 'levelname', 'message', 'exc_info'],
+            rename={'levelname': 'level'}, static={'service': 'bench'})}),
+        ('counter ids:', {'doc_id': 'counter'}),
+        ('no ids:', {'doc_id': 'none'}),
+        ('binary:', {'doc_id': 'none', 'binary': True}),
+    ]
+    for label, options in variants:
+        formatter_class = BinaryFormatter if options.pop('binary', False) \
+            else JsonFormatter
+        speed = run(formatter_class(**options))
+        print('{0:<15} {1:>10.0f} records/s ({2:.2f}x)'.format(
+            label, speed, speed / current))
+    record = make_record()
+    for label, formatter in [('json size:', JsonFormatter(doc_id='none')),
+                             ('binary size:', BinaryFormatter(doc_id='none'))]:
+        print('{0:<15} {1:>10} bytes'.format(
+            label, len(formatter.format(record))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of UDPBuffer sending speed in datagrams per second, with and
+without batching datagrams by `sendmmsg`, against local UDP receiver.
+
+Receiver is drained between rounds, out of measured time, so it doesn't
+take CPU from sending thread on small machines.
+
+Run it from repository root, package doesn't have to be installed:
+
+    PYTHONPATH=. python benchmarks/udp_send.py
+"""
+import socket
+import time
+
+from pysllo.utils import sendmmsg
+from pysllo.utils.udp_buffer import UDPBuffer
+
+MESSAGE = '{"index": {"_index": "logs"}}\n{"message": "%s"}\n' % ('x' * 400)
+MESSAGES = [MESSAGE] * 2000
+ROUNDS = 50
+
+
+def drain(sock):
+    received = 0
+    while True:
+        try:
+            sock.recv(65535)
+            received += 1
+        except (socket.error, socket.timeout):
+            return received
+
+
+def run(receiver, batch):
+    udp = UDPBuffer([receiver.getsockname()], limit=1400, batch=batch)
+    elapsed = 0
+    datagrams = 0
+    received = 0
+    for _ in range(ROUNDS):
+        bounds, _ = udp.pack(MESSAGES)
+        start = time.time()
+        udp.send(MESSAGES)
+        elapsed += time.time() - start
+        datagrams += len(bounds)
+        received += drain(receiver)
+    return datagrams / elapsed, received
+
+
+def main():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 24)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.setblocking(False)
+
+    loop, received = run(receiver, batch=False)
+    print('sendto loop: {0:>10.0f} datagrams/s, {1} received'.format(
+        loop, received))
+    if sendmmsg.is_available():
+        batched, received = run(receiver, batch=True)
+        print('sendmmsg:    {0:>10.0f} datagrams/s, {1} received '
+              '({2:.2f}x)'.format(batched, received, batched / loop))
+    else:  # pragma: no cover
+        print('sendmmsg:    not available on this platform')
+    receiver.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
 from .json_formatter import JsonFormatter
+from .field_plan import FieldPlan
+from .binary_formatter import BinaryFormatter
 
-__all__ = ["JsonFormatter"]
+__all__ = ["JsonFormatter", "FieldPlan", "BinaryFormatter"]
@@ -0,0 +1,112 @@
+import warnings
+
+from pysllo.formatters.json_formatter import JsonFormatter, \
+    TRUNCATED_FIELDS, string_types
+from pysllo.utils.binary_codec import encode_document, encode_header, \
+    encode_id, make_frame
+from pysllo.utils.json_encoder import converters
+
+
+class BinaryFormatter(JsonFormatter):
+    """
+    BinaryFormatter makes the same documents as `JsonFormatter`, but
+    encodes them in compact binary format of
+    `pysllo.utils.binary_codec`: length prefixed frames, names of fields
+    and repeated strings written once and varint integers.
+
+    It can be used with UDP and stream handlers and with backup, messages
+    are converted to bulk format by decoder of `binary_codec` on receiver
+    side. `ElasticSearchHTTPHandler` sends messages directly to bulk API,
+    so it needs `JsonFormatter`.
+
+    >>> handler.setFormatter(BinaryFormatter(doc_id='counter'))
+
+    All options of `JsonFormatter` are supported, `backend` isn't used.
+    """
+
+    def __init__(self, name='logs', limit=9000, plan=None, doc_id=None,
+                 truncate=None, registry=None, traceback_cache=None):
+        """
+        :param name: (str) name of DB in store
+        :param limit: (int) maximum number of bytes in message
+        :param plan: (FieldPlan) plan of document fields, None \
+        means that whole record is copied and ignored fields are removed
+        :param doc_id: (IdStrategy or str) strategy of making `_id`: \
+        'uuid1', 'none', 'counter', 'random' or 'content', None means \
+        'uuid1'
+        :param truncate: (list) names of fields that can be cut when \
+        message is bigger than limit, the biggest ones are cut first, None \
+        means message and traceback
+        :param registry: (ConverterRegistry) converters of objects that \
+        aren't supported, None means default registry
+        :param traceback_cache: (TracebackCache) cache of rendered \
+        tracebacks, None means cache of 256 tracebacks that sends every \
+        traceback
+        """
+        JsonFormatter.__init__(
+            self, name=name, limit=limit, plan=plan, doc_id=doc_id,
+            truncate=truncate, registry=registry,
+            traceback_cache=traceback_cache)
+        self._registry = registry or converters
+
+    def _make_header(self, index_name, doc_type):
+        prefix = encode_header(index_name, doc_type)
+        return prefix, prefix + encode_id(None)
+
+    def _frame(self, header, document):
+        make_id = self._make_id
+        if make_id.uses_content:
+            doc_id = make_id(document)
+        else:
+            doc_id = make_id(None)
+        if doc_id is None:
+            return make_frame(header[1], document)
+        return make_frame(header[0] + encode_id(doc_id), document)
+
+    def _encode(self, data):
+        try:
+            return encode_document(data, self._registry)
+        except (TypeError, ValueError, RuntimeError) as e:
+            # RuntimeError is raised by too deep recursion of circular
+            # references
+            warnings.warn('cannot serialize: {0}'.format(e))
+            return encode_document({"error": "unable to serialize"})
+
+    def format_snapshot(self, snapshot):
+        """
+        Serialize snapshot taken by `snapshot` method
+
+        :param snapshot: (tuple) snapshot of record or None
+        :return: (bytes) frame, empty for skipped records
+        """
+        if snapshot is None:
+            return b''
+        created, data, message_key = snapshot
+        header = self._index_header(created)
+        message = self._frame(header, self._encode(data))
+        if len(message) <= self._limit:
+            return message
+        self.truncated += 1
+        return self._truncate_frame(header, data, message_key, message)
+
+    def _truncate_frame(self, header, data, message_key, message):
+        fields = self._truncate
+        if fields is None:
+            fields = (message_key, ) + TRUNCATED_FIELDS[1:]
+        data['ES_MTL'] = True
+        candidates = sorted(
+            ((len(data[key].encode('utf-8')), key) for key in fields
+             if isinstance(data.get(key), string_types) and data[key]),
+            reverse=True)
+        message = self._frame(header, self._encode(data))
+        # every cut is checked by encoding again, string can be reference
+        # to other field with the same value
+        for _, key in candidates:
+            overflow = len(message) - self._limit
+            if overflow <= 0:
+                break
+            value = data[key].encode('utf-8')
+            data[key] = value[:max(len(value) - overflow, 0)].decode(
+                'utf-8', 'ignore')
+            message = self._frame(header, self._encode(data))
+        return message
@@ -0,0 +1,103 @@
+import logging
+
+from pysllo.utils.timestamp import format_timestamp
+
+# attributes that every LogRecord has, other ones come from `extra`
+RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | \
+    frozenset(['message', 'asctime', 'exc_info', 'exc_text', 'stack_info'])
+# attributes that aren't included in document by default
+IGNORED_ATTRIBUTES = frozenset([
+    'process',
+    'relativeCreated',
+    'args',
+    'thread',
+    'created',
+    'threadName',
+    'msecs',
+    'levelno',
+    'processName',
+])
+
+DEFAULT_FIELDS = RECORD_ATTRIBUTES - IGNORED_ATTRIBUTES
+
+
+class FieldPlan(object):
+    """
+    FieldPlan describes document made from log record: which LogRecord
+    attributes are included, under which names and which static fields
+    are added to every document. Values passed by `extra` are always
+    included.
+
+    Lists of skipped and renamed attributes are prepared once, building
+    document is still one copy of record dict and removing skipped
+    attributes from it, so narrow plan isn't cheaper than default one.
+
+    >>> plan = FieldPlan(fields=['name', 'levelname', 'message', 'exc_info'],
+    >>>                  rename={'levelname': 'level'},
+    >>>                  static={'service': 'billing'})
+    >>> formatter = JsonFormatter(plan=plan)
+
+    Default plan makes the same documents as `JsonFormatter` without plan.
+    """
+
+    def __init__(self, fields=None, rename=None, static=None):
+        """
+        :param fields: (list) LogRecord attributes included in document, \
+        None means default set; `exc_info` is replaced by traceback and \
+        `message` is made from `msg` and `args` if it's included
+        :param rename: (dict) map of attribute names to field names, \
+        it's used also for `extra` values and '@timestamp'
+        :param static: (dict) fields added to every document, values from \
+        record override them
+        """
+        fields = DEFAULT_FIELDS if fields is None else frozenset(fields)
+        unknown = fields - RECORD_ATTRIBUTES
+        if unknown:
+            raise ValueError('unknown LogRecord attributes: {0}'.format(
+                ', '.join(sorted(unknown))))
+        rename = dict(rename or {})
+        if 'exc_info' in rename:
+            raise ValueError('exc_info can not be renamed')
+        self.fields = fields
+        self.message_key = rename.get('message', 'message') \
+            if 'message' in fields else None
+        self._timestamp_key = rename.get('@timestamp', '@timestamp')
+        self._static = dict(static or {})
+        # copy of record dict is made in C, it's cheaper than taking
+        # attributes one by one and finding extra values even for narrow
+        # plans
+        self._skip = [attr for attr in RECORD_ATTRIBUTES
+                      if attr not in fields]
+        self._renames = [(attr, name) for attr, name in rename.items()
+                         if attr not in self._skip and attr != name]
+
+    def build(self, record):
+        """
+        Build document of log record
+
+        :param record: (LogRecord) record to convert
+        :return: (dict) document
+        """
+        values = record.__dict__
+        if self._static:
+            data = self._static.copy()
+            data.update(values)
+        else:
+            data = values.copy()
+        pop = data.pop
+        for attr in self._skip:
+            pop(attr, None)
+        for attr, name in self._renames:
+            if attr in data:
+                data[name] = pop(attr)
+        data[self._timestamp_key] = format_timestamp(record.created)
+        message_key = self.message_key
+        if message_key is not None:
+            message = values.get('message', '')
+            if message == '':
+                try:
+                    message = record.msg % record.args
+                except Exception:
+                    message = "Couldn't parse arguments to message"
+            data[message_key] = message
+        return data
@@ -2,16 +2,64 @@ import logging
 import json
 import copy
 import traceback
-import math
 import warnings
 import datetime
-import sys
+import time
 from uuid import uuid1
-from pysllo.utils.json_encoder import LoggingJSONEncoder
+from pysllo.utils.json_encoder import LoggingJSONEncoder, JsonBackend, \
+    get_backend
+from pysllo.utils.timestamp import format_timestamp
+from pysllo.utils.doc_id import get_id_strategy
+from pysllo.utils.traceback_cache import TracebackCache
+from pysllo.utils.lazy import resolve_values
 
-MTL_OVER_SIZE = sys.getsizeof(", 'ES_MTL' : true,", 0)
+MTL_FIELD = ', "ES_MTL": true'
+TRUNCATED_FIELDS = ('message', 'traceback')
+SKIPPED_LOGGERS = ('elasticsearch', 'urllib3.connectionpool')
 logging_json_encoder = LoggingJSONEncoder()
 
+try:
+    string_types = basestring
+except NameError:  # pragma: no cover
+    string_types = str
+
+
+def _utf8_len(text):
+    try:
+        if text.isascii():
+            return len(text)
+    except AttributeError:  # pragma: no cover
+        pass
+    return len(text.encode('utf-8'))
+
+
+def _cut_to_size(value, target, size, encoder):
+    """
+    Find the longest prefix of value which encoded JSON string is not
+    bigger than target bytes, value is cut between characters, so UTF-8
+    sequences and escapes are never split
+
+    :param value: (str) value to cut
+    :param target: (int) maximum size of encoded value
+    :param size: (int) size of encoded value
+    :param encoder: JSON encoder
+    :return: (str) prefix of value
+    """
+    # empty string is encoded as two quotes
+    target = max(target, 2)
+    if size == len(value) + 2:
+        # every character takes one byte, there is nothing to search
+        return value[:target - 2]
+    # character takes from 1 to 12 bytes (escaped surrogate pair)
+    low, high = (target - 2) // 12, min(len(value), target - 2)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _utf8_len(encoder.encode(value[:middle])) <= target:
+            low = middle
+        else:
+            high = middle - 1
+    return value[:low]
+
 
 class JsonFormatter(logging.Formatter):
     """
@@ -19,20 +67,75 @@ class JsonFormatter(logging.Formatter):
     records that give possibility to save it in document based databases
 
     To use it simple add this formatter to handler that support JSON messages.
+
+    If `plan` is given, documents are built by
+    `pysllo.formatters.field_plan.FieldPlan`, that makes possible to choose
+    fields, rename them and add static fields:
+
+    >>> formatter = JsonFormatter(plan=FieldPlan(static={'env': 'prod'}))
+
+    JSON is encoded by the fastest available backend of
+    `pysllo.utils.json_encoder`, it can be chosen by name:
+
+    >>> formatter = JsonFormatter(backend='simplejson')
+
+    Objects that aren't supported by JSON are converted by
+    `pysllo.utils.json_encoder.ConverterRegistry`, converters of own types
+    can be added by `register_converter`.
+
+    By default every document gets `_id` made by `uuid1`, cheaper strategies
+    of `pysllo.utils.doc_id` can be chosen by name:
+
+    >>> formatter = JsonFormatter(doc_id='counter')
+
+    Rendered tracebacks are kept in
+    `pysllo.utils.traceback_cache.TracebackCache` and every document with
+    exception gets `exc_fingerprint` field that groups the same errors.
     """
 
     _limit = 9000
     _doc_type = 'logs'
 
-    def __init__(self, name='logs', limit=9000):
+    def __init__(self, name='logs', limit=9000, plan=None, backend=None,
+                 doc_id=None, truncate=None, registry=None,
+                 traceback_cache=None):
         """
         Configure limit of bytes in message, and name of document store
 
         :param name: (str) name of DB in store
         :param limit: (int) maximum number of bytes in message
+        :param plan: (FieldPlan) plan of document fields, None \
+        means that whole record is copied and ignored fields are removed
+        :param backend: (JsonBackend or str) JSON backend or its name, \
+        None means the fastest available one
+        :param doc_id: (IdStrategy or str) strategy of making `_id`: \
+        'uuid1', 'none', 'counter', 'random' or 'content', None means \
+        'uuid1'
+        :param truncate: (list) names of fields that can be cut when \
+        message is bigger than limit, the biggest ones are cut first, None \
+        means message and traceback
+        :param registry: (ConverterRegistry) converters of objects that \
+        aren't supported by JSON, used when backend is chosen by name, \
+        None means default registry
+        :param traceback_cache: (TracebackCache) cache of rendered \
+        tracebacks, None means cache of 256 tracebacks that sends every \
+        traceback
         """
         JsonFormatter._doc_type = name
         JsonFormatter._limit = limit
+        self._plan = plan
+        if not isinstance(backend, JsonBackend):
+            backend = get_backend(backend, registry)
+        self._backend = backend
+        self._make_id = get_id_strategy(doc_id)
+        self._truncate = truncate
+        self._tracebacks = TracebackCache() if traceback_cache is None \
+            else traceback_cache
+        # number of messages cut because of limit
+        self.truncated = 0
+        # encoded index header of current day cut before value of _id and
+        # header without _id
+        self._header = (0, 0, None, None, None)
 
     @staticmethod
     def format_exception(ei):
@@ -51,72 +154,102 @@ class JsonFormatter(logging.Formatter):
         }
 
     @staticmethod
-    def _jsonify_message(index, data):
+    def _jsonify_message(index, data, encoder=None):
+        encoder = encoder or logging_json_encoder
         if 'exc_info' in data and data['exc_info']:
             data.update(JsonFormatter.format_exception(data['exc_info']))
             del data['exc_info']
         try:
-            message = '\n'.join([
-                logging_json_encoder.encode(index),
-                logging_json_encoder.encode(data),
-                '',  # it's here to add \n at end of the message
-            ])
-        except TypeError as e:
-            message = '\n'.join([
-                json.dumps(index),
-                json.dumps({"error": "unable to serialize"}),
-                '',
-            ])
-            warnings.warn('cannot serialize: {0}'.format(e))
+            body = encoder.encode(data)
         except UnicodeDecodeError as e:  # pragma: no cover
-            message = '\n'.join([
-                json.dumps(index),
-                json.dumps({"error": "unable to decode"}),
-                '',
-            ])
+            body = json.dumps({"error": "unable to decode"})
             warnings.warn('cannot decode as utf8: {0}'.format(e))
-        return message
-
-    # no cover - support different versions of python
-    @staticmethod
-    def _count_to_remove_chars(over_limit, msg):  # pragma: no cover
-        to_remove_chars_count = 0
-        if sys.version_info[0] == 3:
-            # size of one character in string class in python 3.x is 2
-            to_remove_chars_count = int(math.ceil(over_limit / 2))
-        else:
-            if isinstance(msg, unicode):
-                # size of one character in unicode class in python 2.x is 4
-                to_remove_chars_count = int(math.ceil(over_limit / 4))
-            elif isinstance(msg, str):
-                # size of one character in str in python 2.x in 1
-                to_remove_chars_count = over_limit
-        return int(math.fabs(to_remove_chars_count))
+        except (TypeError, ValueError) as e:
+            # objects are converted field by field, only keys that aren't
+            # strings or circular references reject whole document
+            body = json.dumps({"error": "unable to serialize"})
+            warnings.warn('cannot serialize: {0}'.format(e))
+        # index can be already encoded header or function that makes
+        # header from encoded document
+        if isinstance(index, dict):
+            index = encoder.encode(index)
+        elif callable(index):
+            index = index(body)
+        return '\n'.join([
+            index,
+            body,
+            '',  # it's here to add \n at end of the message
+        ])
 
     @staticmethod
-    def _truncate_too_long_message(index, data, size, limit):
-        # is added to result when we have data over limit
-        over_limit = (size - limit) + MTL_OVER_SIZE
-        to_remove_chars_count = JsonFormatter._count_to_remove_chars(
-            over_limit, data['message'])
-        data['message'] = data['message'][:-to_remove_chars_count]
+    def _truncate_too_long_message(index, data, size, limit, fields,
+                                   encoder=None):
+        encoder = encoder or logging_json_encoder
+        # marker of truncated message is added too
+        overflow = size - limit + len(MTL_FIELD)
+        candidates = []
+        for key in fields:
+            value = data.get(key)
+            if isinstance(value, string_types) and value:
+                candidates.append((_utf8_len(encoder.encode(value)), key))
+        # the biggest fields are cut first
+        candidates.sort(reverse=True)
+        for value_size, key in candidates:
+            if overflow <= 0:
+                break
+            value = _cut_to_size(data[key], value_size - overflow,
+                                 value_size, encoder)
+            overflow -= value_size - _utf8_len(encoder.encode(value))
+            data[key] = value
         data['ES_MTL'] = True
-        return JsonFormatter._jsonify_message(index, data)
+        return JsonFormatter._jsonify_message(index, data, encoder)
 
     @staticmethod
-    def serialize_record(record, index_data, limit):
+    def serialize_record(record, index_data, limit, plan=None,
+                         encoder=None, truncate=None):
         """
         This method transfer and processes log record into JSON object
 
         :param record:
         :param index_data:
         :param limit:
+        :param plan: (FieldPlan) plan of document fields
+        :param encoder: (JsonBackend) JSON encoder, None means standard \
+        `LoggingJSONEncoder`
+        :param truncate: (list) names of fields that can be cut
         """
-        if record.name in ('elasticsearch', 'urllib3.connectionpool'):
+        if record.name in SKIPPED_LOGGERS:
             return ''
 
+        full_index = dict(index_data)
+        full_index['index']['_id'] = str(uuid1())
+        data, message_key = JsonFormatter._build(record, plan)
+        return JsonFormatter._serialize(data, message_key, full_index, limit,
+                                        encoder, truncate)[0]
+
+    @staticmethod
+    def _build(record, plan):
+        if plan is not None:
+            return plan.build(record), plan.message_key
+        return JsonFormatter._copy_record(record), 'message'
+
+    @staticmethod
+    def _serialize(data, message_key, index, limit, encoder, truncate):
+        message = JsonFormatter._jsonify_message(index, data, encoder)
+        size = _utf8_len(message)
+        if size <= limit:
+            return message, False
+
+        if truncate is None:
+            truncate = (message_key, ) + TRUNCATED_FIELDS[1:]
+        message = JsonFormatter._truncate_too_long_message(
+            index, data, size, limit, truncate, encoder)
+        return message, True
+
+    @staticmethod
+    def _copy_record(record):
         data = copy.copy(record.__dict__)
-        data['@timestamp'] = datetime.datetime.utcnow().isoformat() + 'Z'
+        data['@timestamp'] = format_timestamp(record.created)
 
         # The primary information is passed in msg and args,
         # which are combined using msg % args to create the message field
@@ -143,18 +276,7 @@ class JsonFormatter(logging.Formatter):
 
         for ignore in ignored:
             data.pop(ignore, None)
-
-        full_index = dict(index_data)
-        full_index['index']['_id'] = str(uuid1())
-
-        message = JsonFormatter._jsonify_message(full_index, data)
-        size = sys.getsizeof(message, 0)
-
-        if size > (limit - MTL_OVER_SIZE):
-            message = JsonFormatter._truncate_too_long_message(
-                full_index, data, size, limit)
-
-        return message
+        return data
 
     @staticmethod
     def index():
@@ -168,17 +290,102 @@ class JsonFormatter(logging.Formatter):
             datetime.date.today().strftime('%Y-%m-%d')
         ])
 
+    def _index_header(self, created):
+        start, end, doc_type, prefix, plain = self._header
+        if not start <= created < end or doc_type != self._doc_type:
+            doc_type = self._doc_type
+            day = time.localtime(created)
+            start = time.mktime(day[:3] + (0, 0, 0, 0, 0, -1))
+            end = time.mktime(day[:2] + (day[2] + 1, 0, 0, 0, 0, 0, -1))
+            prefix, plain = self._make_header(
+                '-'.join([doc_type, time.strftime('%Y-%m-%d', day)]),
+                doc_type)
+            self._header = (start, end, doc_type, prefix, plain)
+        return prefix, plain
+
+    def _make_header(self, index_name, doc_type):
+        index = {
+            '_index': index_name,
+            '_type': doc_type,
+        }
+        plain = self._backend.encode({'index': index})
+        index['_id'] = ''
+        # header is cut before closing quote of empty _id
+        prefix = self._backend.encode({'index': index})[:-len('"}}')]
+        return prefix, plain
+
+    @staticmethod
+    def _splice_id(header, doc_id):
+        if doc_id is None:
+            return header[1]
+        return ''.join([header[0], doc_id, '"}}'])
+
     def format(self, record):
         """
         It's standard logging method to format record to JSON
 
+        Index header is encoded once a day and only `_id` is added to it,
+        index and `@timestamp` are taken from time of record creation.
+
         :param record: (LogRecord) object to be serialized
         """
-        index_data = {
-            'index': {
-                '_index': self.index(),
-                '_type': self._doc_type
-            }
-        }
-        return self.serialize_record(record, index_data=index_data,
-                                     limit=self._limit)
+        return self.format_snapshot(self.snapshot(record))
+
+    def snapshot(self, record):
+        """
+        Take lightweight snapshot of record that can be serialized later,
+        in other thread or process. Message is made from `msg` and `args`
+        and exception is rendered to traceback now, so later changes of
+        arguments don't change message and snapshot can be pickled if
+        values from `extra` can. Values themselves aren't copied, only
+        `Lazy` values are computed.
+
+        :param record: (LogRecord) record to take snapshot of
+        :return: (tuple) snapshot or None if record isn't sent
+        """
+        if record.name in SKIPPED_LOGGERS:
+            return None
+        data, message_key = self._build(record, self._plan)
+        # lazy values are computed now, once per record, snapshot can be
+        # serialized later in other process
+        resolve_values(data)
+        if data.get('exc_info'):
+            # traceback objects keep frames alive and can't be pickled
+            data.update(self._tracebacks.render(data.pop('exc_info')))
+        return record.created, data, message_key
+
+    def format_snapshot(self, snapshot):
+        """
+        Serialize snapshot taken by `snapshot` method
+
+        :param snapshot: (tuple) snapshot of record or None
+        :return: (str) formatted message, empty for skipped records
+        """
+        if snapshot is None:
+            return ''
+        created, data, message_key = snapshot
+        header = self._index_header(created)
+        make_id = self._make_id
+        if make_id.uses_content:
+            def index(body):
+                return self._splice_id(header, make_id(body))
+        else:
+            index = self._splice_id(header, make_id(None))
+        message, truncated = self._serialize(
+            data, message_key, index, self._limit, self._backend,
+            self._truncate)
+        if truncated:
+            self.truncated += 1
+        return message
+
+    def format_batch(self, snapshots):
+        """
+        Serialize list of snapshots at once, it's used by handlers in
+        deferred mode when buffer is sent
+
+        :param snapshots: (list) snapshots of records
+        :return: (list) formatted messages
+        """
+        format_snapshot = self.format_snapshot
+        return [message for message in map(format_snapshot, snapshots)
+                if message]
@@ -1,3 +1,14 @@
+import sys
+
 from .elastic.elastic_handler import ElasticSearchUDPHandler
+from .elastic.http_handler import ElasticSearchHTTPHandler
+from .elastic.stream_handler import ElasticSearchStreamHandler
+from .elastic.aggregator import ElasticSearchAggregatorHandler, LogShipper
+
+__all__ = ["ElasticSearchUDPHandler", "ElasticSearchHTTPHandler",
+           "ElasticSearchStreamHandler", "ElasticSearchAggregatorHandler",
+           "LogShipper"]
 
-__all__ = ["ElasticSearchUDPHandler"]
+if sys.version_info >= (3, 5):
+    from .elastic.async_handler import AsyncElasticSearchUDPHandler
+    __all__.append("AsyncElasticSearchUDPHandler")
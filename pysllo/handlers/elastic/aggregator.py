@@ -0,0 +1,166 @@
+import logging
+import multiprocessing
+import time
+
+# empty message tells shipper process to send buffer and exit
+_STOP = b''
+# first byte of message tells if it was text or bytes, like frames of
+# binary formatter, that are passed as they are
+_TEXT = b't'
+_BYTES = b'b'
+
+
+def _run_shipper(reader, writer, handler_class, args, kwargs,
+                 flush_interval):
+    # only workers write, reader sees end of pipe when all of them are gone
+    writer.close()
+    handler = handler_class(*args, **kwargs)
+    deadline = time.time() + flush_interval if flush_interval else None
+    try:
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - time.time(), 0)
+            if reader.poll(timeout):
+                data = reader.recv_bytes()
+                if data == _STOP:
+                    return
+                if data[:1] == _TEXT:
+                    handler._append(data[1:].decode('utf-8'))
+                else:
+                    handler._append(data[1:])
+            if deadline is not None and time.time() >= deadline:
+                deadline = time.time() + flush_interval
+                handler.flush()
+    finally:
+        handler.close()
+
+
+class LogShipper(object):
+    """
+    LogShipper runs one process that receives formatted messages from many
+    worker processes and sends them in full size batches by one of
+    ElasticSearch handlers. Without it every worker sends its own small
+    batches.
+
+    Shipper has to be started before workers are forked, for example in
+    gunicorn master process, then workers log through
+    `ElasticSearchAggregatorHandler`:
+
+    >>> shipper = LogShipper(ElasticSearchUDPHandler, [('localhost', 9000)],
+    >>>                      flush_interval=1.0)
+    >>> shipper.start()
+    >>> ...
+    >>> # in worker process
+    >>> handler = ElasticSearchAggregatorHandler(shipper)
+    >>> handler.setFormatter(JsonFormatter())
+    >>> log.addHandler(handler)
+    >>> ...
+    >>> # in master process on exit
+    >>> shipper.stop()
+
+    Messages are passed through pipe, so workers wait when shipper can't
+    keep up with them. When shipper process dies, passing message fails
+    with broken pipe error, which is reported by `handleError` of handler.
+    """
+
+    def __init__(self, handler_class, *args, **kwargs):
+        """
+        :param handler_class: (type) handler used to send messages in \
+        shipper process, it's created with remaining arguments
+        :param flush_interval: (float) maximum number of seconds that \
+        message waits in shipper buffer, None means only size limit
+        """
+        self._flush_interval = kwargs.pop('flush_interval', None)
+        self._handler_class = handler_class
+        self._args = args
+        self._kwargs = kwargs
+        self._reader, self._writer = multiprocessing.Pipe(duplex=False)
+        self._lock = multiprocessing.Lock()
+        self._process = None
+
+    def start(self):
+        """
+        Start shipper process
+        """
+        self._process = multiprocessing.Process(
+            target=_run_shipper, name='pysllo-shipper',
+            args=(self._reader, self._writer, self._handler_class,
+                  self._args, self._kwargs, self._flush_interval))
+        self._process.daemon = True
+        self._process.start()
+        # without reader in this process and workers writes to pipe fail
+        # when shipper is gone instead of blocking on full pipe
+        self._reader.close()
+
+    def put(self, msg):
+        """
+        Pass formatted message to shipper process, it can be called from
+        any process forked after shipper was created
+
+        :param msg: (str or bytes) formatted message
+        """
+        if not msg:
+            return
+        if isinstance(msg, bytes):
+            data = _BYTES + msg
+        else:
+            data = _TEXT + msg.encode('utf-8')
+        # writes bigger than pipe buffer aren't atomic between processes
+        with self._lock:
+            self._writer.send_bytes(data)
+
+    def stop(self, timeout=None):
+        """
+        Send remaining messages and stop shipper process
+
+        :param timeout: (float) maximum number of seconds to wait
+        """
+        if self._process is None:
+            return
+        try:
+            with self._lock:
+                self._writer.send_bytes(_STOP)
+        except (IOError, OSError):
+            # shipper process is already gone
+            pass
+        self._process.join(timeout)
+        self._process = None
+
+
+class ElasticSearchAggregatorHandler(logging.Handler):
+    """
+        ElasticSearchAggregatorHandler is a logging handler for worker
+        processes that passes formatted messages to `LogShipper` process
+        instead of sending them by itself.
+
+        It has to be used with `pysllo.formatters.JsonFormatter` or
+        `pysllo.formatters.BinaryFormatter` like other ElasticSearch
+        handlers, messages are formatted in worker and shipper only
+        buffers and sends them:
+
+        >>> handler = ElasticSearchAggregatorHandler(shipper)
+        >>> handler.setFormatter(JsonFormatter())
+        >>> log.addHandler(handler)
+
+    """
+
+    def __init__(self, shipper, level=logging.NOTSET):
+        """
+        :param shipper: (LogShipper) started shipper
+        :param level: (int) logging level
+        """
+        logging.Handler.__init__(self, level)
+        self._shipper = shipper
+
+    def emit(self, record):
+        """
+        Is standard logging Handler method that send message to receiver, in
+        this case message is passed to shipper process
+
+        :param record: (LogRecord) - record to send
+        """
+        try:
+            self._shipper.put(self.format(record))
+        except Exception:
+            self.handleError(record)
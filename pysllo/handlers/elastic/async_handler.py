@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import socket
+
+from pysllo.handlers.elastic.base_handler import ElasticSearchBaseHandler
+from pysllo.utils.udp_buffer import UDPBuffer, pack_datagrams, \
+    store_frames
+
+_get_running_loop = getattr(asyncio, '_get_running_loop', lambda: None)
+
+
+class AsyncElasticSearchUDPHandler(ElasticSearchBaseHandler):
+    """
+        AsyncElasticSearchUDPHandler is a version of
+        `ElasticSearchUDPHandler` for applications based on asyncio.
+
+        `emit` keeps standard logging semantics and can be called from any
+        thread, but buffered messages are sent by non-blocking
+        `DatagramTransport` of event loop and backup is written in default
+        executor, so event loop never waits for socket or disk.
+
+        Buffer is sent when it's full or when `flush_interval` seconds
+        elapsed. Because `flush` and `close` can't block event loop, they
+        only schedule sending, to wait for it use `drain` coroutine:
+
+        >>> handler = AsyncElasticSearchUDPHandler([('localhost', 9000)],
+        >>>                                        loop=loop)
+        >>> handler.setFormatter(JsonFormatter())
+        >>> log.addHandler(handler)
+        >>> ...
+        >>> handler.close()
+        >>> await handler.drain()
+
+    """
+
+    def __init__(self, connections, loop=None,
+                 level=logging.NOTSET, name='logs', limit=9000, backup=False,
+                 flush_interval=None, compressor=None):
+        """
+        :param connections: (tuple or list) list of tuples with \
+        server address and port
+        :param loop: (AbstractEventLoop) event loop used to send messages, \
+        by default it's the first running loop that logs message
+        :param level: (int) logging level
+        :param name: (str) logger name
+        :param limit: (int) byte size of buffer, after this limit buffer is \
+        pushed to elastic cluster
+        :param backup: on/off backup
+        :param flush_interval: (float) maximum number of seconds that \
+        message waits in buffer, None means only size limit
+        :param compressor: (Compressor) compress every batch before it's \
+        sent in datagrams and saved in backup, None means no compression
+        """
+        ElasticSearchBaseHandler.__init__(
+            self, level=level, name=name, limit=limit, backup=backup,
+            flush_interval=flush_interval, shards=1, compressor=compressor)
+        self._connections = connections
+        self._current = -1
+        self._loop = loop
+        self._addresses = {}
+        self._transport = None
+        self._connecting = None
+        self._timer = None
+        self._tasks = set()
+        self._closing = None
+        self.dropped = 0
+
+    def _get_loop(self):
+        # handler is bound only to running loop, loop made implicitly for
+        # record logged before `asyncio.run` would never run
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            running = _get_running_loop()
+            if running is not None:
+                if loop is not None:
+                    self._reset_connection()
+                self._loop = loop = running
+        return loop
+
+    def _call(self, func, *args):
+        loop = self._get_loop()
+        if loop is None or _get_running_loop() is loop:
+            # without loop records wait in buffer and full buffer is sent
+            # by blocking socket
+            func(*args)
+        elif loop.is_closed():
+            raise RuntimeError('event loop is closed')
+        else:
+            loop.call_soon_threadsafe(func, *args)
+
+    def emit(self, record):
+        """
+        Is standard logging Handler method that send message to receiver, in
+        this case message is saved in buffer by event loop
+
+        :param record: (LogRecord) - record to send
+        """
+        msg = self.format(record)
+        try:
+            self._call(self._append, msg)
+        except RuntimeError:
+            # loop is gone, nothing can send buffer later
+            self._ship_blocking([msg])
+
+    def _append(self, msg):
+        ElasticSearchBaseHandler._append(self, msg)
+        if self._flush_interval and self._timer is None and \
+                self._loop is not None and len(self._buffer):
+            self._timer = self._loop.call_later(self._flush_interval,
+                                                self._flush_buffer)
+
+    def _flush_buffer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        payload = self._buffer.drain()
+        if payload and self._get_loop() is None:
+            self._ship_blocking(payload)
+        elif payload:
+            task = asyncio.ensure_future(self._ship(payload),
+                                         loop=self._loop)
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            try:
+                raise task.exception()
+            except Exception:
+                self.handleError(None)
+
+    def _reset_connection(self):
+        # event loop, its transport and tasks belong to parent process
+        self._loop = None
+        self._transport = self._connecting = self._closing = None
+        self._timer = None
+        self._tasks = set()
+
+    def _round_connection(self):
+        self._current = (self._current + 1) % len(self._connections)
+        return self._connections[self._current]
+
+    async def _resolve(self, connection):
+        try:
+            return self._addresses[connection]
+        except KeyError:
+            host, port = connection
+            info = await self._loop.getaddrinfo(
+                host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+            self._addresses[connection] = info[0][4]
+            return info[0][4]
+
+    async def _get_transport(self):
+        if self._transport is None:
+            if self._connecting is None:
+                self._connecting = asyncio.ensure_future(
+                    self._loop.create_datagram_endpoint(
+                        asyncio.DatagramProtocol, family=socket.AF_INET),
+                    loop=self._loop)
+            self._transport, _ = await self._connecting
+        return self._transport
+
+    async def _ship(self, payload):
+        ticket = None
+        if self._backup_enabled:
+            ticket = await self._loop.run_in_executor(None, self.backup,
+                                                      payload)
+        transport = await self._get_transport()
+        address = await self._resolve(self._round_connection())
+        # every batch has its own arena, transport may keep data of
+        # datagrams that can't be sent immediately
+        arena = bytearray()
+        if self._compressor is not None:
+            frames, dropped = self._compressor.pack(payload, self._limit)
+            bounds = store_frames(frames, arena)
+        else:
+            bounds, dropped = pack_datagrams(payload, self._limit, arena)
+        view = memoryview(arena)
+        for start, end in bounds:
+            transport.sendto(view[start:end], address)
+        self.dropped += dropped
+        if ticket is not None:
+            await self._loop.run_in_executor(None, self._acknowledge, ticket)
+
+    def _ship_blocking(self, payload):
+        if not payload:
+            return
+        ticket = self.backup(payload)
+        connection = UDPBuffer(self._connections, limit=self._limit,
+                               compressor=self._compressor)
+        try:
+            self.dropped += connection.send(payload)
+        finally:
+            connection.close()
+        self._acknowledge(ticket)
+
+    def flush(self):
+        """
+        Schedule sending of buffered messages, it doesn't wait for it
+        """
+        try:
+            self._call(self._flush_buffer)
+        except RuntimeError:
+            self._ship_blocking(self._buffer.drain())
+
+    async def _wait_tasks(self):
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    async def drain(self):
+        """
+        Coroutine that waits until all scheduled messages are sent and
+        saved in backup, and transport is closed if handler was closed
+        """
+        await self._wait_tasks()
+        if self._closing is not None:
+            await self._closing
+
+    async def _close_transport(self):
+        await self._wait_tasks()
+        if self._connecting is not None:
+            transport, _ = await self._connecting
+            transport.close()
+        self._transport = self._connecting = None
+
+    def _close(self):
+        self._flush_buffer()
+        if self._loop is None:
+            return
+        self._closing = asyncio.ensure_future(self._close_transport(),
+                                              loop=self._loop)
+
+    def close(self):
+        """
+        Tidy up any resources used by the handler.
+
+        Buffered messages are scheduled to send and transport is closed
+        after that, use `drain` coroutine to wait for it.
+        """
+        try:
+            self._call(self._close)
+        except RuntimeError:
+            self._ship_blocking(self._buffer.drain())
+        logging.Handler.close(self)
@@ -0,0 +1,410 @@
+import datetime
+import logging
+import os
+import threading
+import time
+import warnings
+import weakref
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+from pysllo.utils.sharded_buffer import ShardedBuffer
+
+# markers passed through the queue to control the flusher thread
+_FLUSH = object()
+_STOP = object()
+
+# number of snapshots formatted by one task of executor in deferred mode
+_CHUNK = 500
+
+# handlers that have to be reset in child process after fork
+_handlers = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for handler in list(_handlers):
+        try:
+            handler._reinit_after_fork()
+        except Exception:
+            handler.handleError(None)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class ElasticSearchBaseHandler(logging.Handler):
+    """
+    ElasticSearchBaseHandler is base class of handlers that send logs to
+    ElasticSearch cluster in batches. It buffers formatted messages, sends
+    them when buffer is full and optionally saves them in backup.
+
+    Subclasses have to implement `_send` method that delivers list of
+    formatted messages using their own transport.
+
+    If you don't want to pay for network and disk latency in thread that
+    logs, enable threaded mode. Then `emit` only puts formatted message
+    into queue and dedicated flusher thread sends them when buffer is
+    full or when `flush_interval` seconds elapsed.
+
+    Every handler has its own buffer, so you can use few handlers to send
+    logs to different clusters or indices in the same time. Records aren't
+    handled under lock of handler, every thread formats its records and
+    appends them to its own shard of buffer, only sending of batch is
+    serialized. Formatter of handler has to be thread safe, like
+    `JsonFormatter` is.
+
+    By default backup is saved in daily files that are never read again.
+    To make it possible to ship again messages that weren't sent, set
+    `pysllo.utils.backup_store.SegmentedBackupStore` as backup store:
+
+    >>> handler.set_backup_store(SegmentedBackupStore('/var/log/backup'))
+    >>> handler.enable_backup()
+
+    In deferred mode `emit` takes only lightweight snapshot of record and
+    whole batch is serialized by `JsonFormatter.format_batch` when buffer
+    is sent, so with threaded mode JSON encoding leaves thread that logs.
+    CPU heavy batches can be serialized by `concurrent.futures` executor,
+    for example `ProcessPoolExecutor`, then snapshots and formatter are
+    pickled:
+
+    >>> handler = ElasticSearchUDPHandler([(host, port)], threaded=True,
+    >>>                                   deferred=True)
+
+    Handler is safe to use in processes forked by gunicorn or
+    multiprocessing. Child process starts with empty buffer, its own
+    connection and flusher thread, messages buffered before fork are sent
+    only by parent. Backup store isn't shared safely between processes,
+    set new one in every worker.
+    """
+
+    # transports that deliver messages later acknowledge backup themselves
+    _acknowledge_on_send = True
+
+    def __init__(self,
+                 level=logging.NOTSET, name='logs', limit=9000, backup=False,
+                 threaded=False, flush_interval=None, queue_size=0,
+                 shards=8, compressor=None, deferred=False, executor=None):
+        """
+        :param level: (int) logging level
+        :param name: (str) logger name
+        :param limit: (int) byte size of buffer, after this limit buffer is \
+        pushed to elastic cluster
+        :param backup: on/off backup
+        :param threaded: (bool) on/off sending messages from dedicated \
+        flusher thread instead of thread that logs
+        :param flush_interval: (float) maximum number of seconds that \
+        message waits in buffer in threaded mode, None means only size limit
+        :param queue_size: (int) maximum number of messages waiting for \
+        flusher thread, 0 means unlimited
+        :param shards: (int) number of buffers that logging threads append \
+        to, they are merged when messages are sent
+        :param compressor: (Compressor) compress every batch before it's \
+        sent and saved in backup, None means no compression
+        :param deferred: (bool) on/off serializing records when buffer is \
+        sent instead of when they are logged
+        :param executor: (Executor) executor that serializes batches in \
+        deferred mode, None means thread that sends buffer
+        """
+        logging.Handler.__init__(self, level)
+        self._buffer = ShardedBuffer(shards)
+        # buffer and transport have their own lock, flusher thread never
+        # takes lock of handler that `logging` holds around `emit` and
+        # during `shutdown`, so waiting for flusher can't deadlock
+        self._flush_lock = threading.RLock()
+        self._doc_type = name
+        self._limit = limit
+        self._backup_enabled = backup
+        self._backup_path = "./"
+        self._backup_store = None
+        self._compressor = compressor
+        self._flush_interval = flush_interval
+        self._shards = shards
+        self._queue_size = queue_size
+        self._deferred = deferred
+        self._executor = executor
+        # snapshots have no size yet, average formatted message is used
+        self._message_size = 512
+        self._queue = None
+        self._flusher = None
+        if threaded:
+            self._start_flusher()
+        _handlers.add(self)
+
+    def _start_flusher(self):
+        self._queue = queue.Queue(self._queue_size)
+        self._flusher = threading.Thread(target=self._flusher_loop,
+                                         name='pysllo-flusher')
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _reinit_after_fork(self):
+        # messages inherited from parent are sent by parent, threads
+        # don't survive fork and connection can't be shared
+        self._buffer = ShardedBuffer(self._shards)
+        self._flush_lock = threading.RLock()
+        if self._flusher is not None:
+            self._start_flusher()
+        self._reset_connection()
+
+    def _reset_connection(self):
+        """
+        Replace connection inherited from parent process by new one, it's
+        called in child process after fork
+        """
+
+    def set_backup_path(self, path):
+        """
+        Set path to backup files
+
+        :param path: (str) unix path
+        """
+        self._backup_path = \
+            path + ("/" if not path.endswith('/') else "")
+
+    def set_backup_store(self, store):
+        """
+        Set store that keeps backup of messages until they are sent, if
+        store is set it's used instead of daily backup files
+
+        :param store: (SegmentedBackupStore) backup store or None
+        """
+        self._backup_store = store
+
+    def enable_backup(self):
+        """
+        Enable backup functionality that make possible to make logs sending
+        secure in situation of loosing connection.
+        """
+        self._backup_enabled = True
+
+    def disable_backup(self):
+        """
+        Disable backup functionality
+        """
+        self._backup_enabled = False
+
+    def set_limit(self, limit):  # pragma: no cover
+        """
+        Set limit value, limit is size of buffer to store messages, after
+        make this buffer full all messages will be send.
+        It's important to make there good number to make sure that you don't
+        have too many connections to DB and to have too big snap of messages
+        that can make delay's on real time dashboards
+
+        :param limit: (int) number of bytes
+        """
+        self._limit = limit
+
+    def index(self):
+        """
+        Special method that create identifier for today logs
+
+        :return: (dict)
+        """
+        return '-'.join([
+            self._doc_type,
+            datetime.date.today().strftime('%Y-%m-%d')
+        ])
+
+    def handle(self, record):
+        """
+        Filter record and emit it without lock of handler, formatting and
+        buffering are thread safe, so threads that log in the same time
+        format records in parallel and append them to their own shards
+
+        :param record: (LogRecord) - record to handle
+        :return: result of filters
+        """
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            # filters of python 3.12 can return changed record
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        """
+        Is standard logging Handler method that send message to receiver, in
+        this case message is saved in buffer
+
+        :param record: (LogRecord) - record to send
+        """
+        if self._deferred:
+            msg = self._snapshot(record)
+            if msg is None:
+                return
+        else:
+            msg = self.format(record)
+        if self._queue is not None:
+            self._queue.put(msg)
+        else:
+            self._append(msg)
+
+    def _snapshot(self, record):
+        snapshot = getattr(self.formatter, 'snapshot', None)
+        if snapshot is None:
+            return self.format(record)
+        return snapshot(record)
+
+    def _append(self, msg):
+        if self._deferred and isinstance(msg, tuple):
+            data_size = self._message_size
+        else:
+            data_size = len(msg)
+
+        # only sending takes lock of whole buffer, message is appended to
+        # shard of thread, so size of batch can exceed limit a bit
+        if self._buffer.size + data_size > self._limit:
+            self._flush_buffer()
+
+        self._buffer.append(msg, data_size)
+
+    def _flusher_loop(self):
+        interval = self._flush_interval
+        deadline = time.time() + interval if interval else None
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - time.time(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                # thread stops even if the last send fails, `close` waits
+                # for it
+                try:
+                    self._flush_buffer()
+                except Exception:
+                    self.handleError(None)
+                return
+
+            try:
+                if isinstance(item, tuple) and item[0] is _FLUSH:
+                    try:
+                        self._flush_buffer()
+                    finally:
+                        item[1].set()
+                elif item is not None:
+                    self._append(item)
+
+                if deadline is not None and time.time() >= deadline:
+                    deadline = time.time() + interval
+                    self._flush_buffer()
+            except Exception:
+                # flusher thread have to survive problems with connection
+                self.handleError(None)
+
+    def flush(self):
+        """
+        Method to send buffered messages to cluster, in threaded mode it
+        waits until flusher thread sends everything queued before
+        """
+        if self._flusher is not None and self._flusher.is_alive():
+            done = threading.Event()
+            self._queue.put((_FLUSH, done))
+            done.wait()
+        else:
+            self._flush_buffer()
+
+    def _flush_buffer(self):
+        with self._flush_lock:
+            payload = self._buffer.drain()
+            if self._deferred and payload:
+                payload = self._format_payload(payload)
+            if not payload:
+                return
+            ticket = self.backup(payload)
+            self._send(payload, ticket)
+            if self._acknowledge_on_send:
+                self._acknowledge(ticket)
+
+    def _format_payload(self, payload):
+        format_batch = getattr(self.formatter, 'format_batch', None)
+        if format_batch is None:
+            return payload
+        messages = None
+        if self._executor is not None:
+            chunks = [payload[start:start + _CHUNK]
+                      for start in range(0, len(payload), _CHUNK)]
+            try:
+                messages = [message for chunk in
+                            self._executor.map(format_batch, chunks)
+                            for message in chunk]
+            except Exception as e:
+                # values from `extra` that can't be pickled and broken
+                # executor don't lose batch, it's serialized here
+                warnings.warn('cannot serialize batch in executor: '
+                              '{0}'.format(e))
+                messages = None
+        if messages is None:
+            messages = format_batch(payload)
+        if messages:
+            self._message_size = \
+                sum(len(message) for message in messages) // len(messages)
+        return messages
+
+    def _send(self, payload, ticket=None):
+        """
+        Deliver list of formatted messages to cluster
+
+        :param payload: (list) formatted messages
+        :param ticket: backup ticket of this payload
+        """
+        raise NotImplementedError
+
+    def backup(self, data):
+        """
+        Method that save messages to backup if this functionality is enabled,
+        it's called before messages are sent
+
+        :param data: (str) - string version of buffered data
+        :return: ticket to acknowledge if backup store is used
+        """
+        if not self._backup_enabled:
+            return None
+        if self._backup_store is not None:
+            return self._backup_store.append(data)
+        path = self._backup_path + self.index()
+        if self._compressor is not None:
+            # appended gzip members make valid gzip file
+            with open(path + '.gz', 'ab') as out_file:
+                out_file.write(self._compressor.compress(data))
+            return None
+        if not isinstance(data[0], str):
+            # frames of binary formatter are written as they are
+            with open(path + '.bin', 'ab') as out_file:
+                out_file.write(b''.join(data))
+            return None
+        with open(path, 'a') as out_file:
+            out_file.write('\n'.join(data))
+
+    def _acknowledge(self, ticket):
+        if ticket is not None and self._backup_store is not None:
+            self._backup_store.acknowledge(ticket)
+
+    def close(self):
+        """
+        Tidy up any resources used by the handler.
+
+        This version removes the handler from an internal map of handlers,
+        _handlers, which is used for handler lookup by name. Subclasses
+        should ensure that this gets called from overridden close()
+        methods.
+
+        In threaded mode flusher thread sends all queued messages before
+        it's stopped.
+        """
+        if self._flusher is not None and self._flusher.is_alive():
+            self._queue.put(_STOP)
+            self._flusher.join()
+        else:
+            self._flush_buffer()
+        _handlers.discard(self)
+        logging.Handler.close(self)
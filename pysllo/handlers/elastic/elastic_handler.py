@@ -1,11 +1,10 @@
-import datetime
 import logging
-import sys
 
+from pysllo.handlers.elastic.base_handler import ElasticSearchBaseHandler
 from pysllo.utils.udp_buffer import UDPBuffer
 
 
-class ElasticSearchUDPHandler(logging.Handler):
+class ElasticSearchUDPHandler(ElasticSearchBaseHandler):
     """
         ElasticSearchUDPHandler is a logging handler that makes possible
         to send your logs to ElasticSearch cluster.
@@ -30,16 +29,24 @@ class ElasticSearchUDPHandler(logging.Handler):
         >>> log.setLevel(logging.DEBUG)
         >>> log.addHandler(handler)
 
+        If you don't want to pay for network and disk latency in thread that
+        logs, enable threaded mode. Then `emit` only puts formatted message
+        into queue and dedicated flusher thread sends them when buffer is
+        full or when `flush_interval` seconds elapsed:
+
+        >>> handler = ElasticSearchUDPHandler([(host, port)], threaded=True,
+        >>>                                   flush_interval=1.0)
+
+        Every handler has its own buffer, so you can use few handlers to send
+        logs to different clusters or indices in the same time.
+
     """
-    _buffer = []
-    _current_size = 0
-    _limit = 0
-    _backup_enabled = False
-    _backup_path = "./"
-    _doc_type = 'logs'
 
     def __init__(self, connections,
-                 level=logging.NOTSET, name='logs', limit=9000, backup=False):
+                 level=logging.NOTSET, name='logs', limit=9000, backup=False,
+                 threaded=False, flush_interval=None, queue_size=0,
+                 shards=8, compressor=None, balancer=None, deferred=False,
+                 executor=None):
         """
         Configure most important thing to setting this handler, list of
         connections is required, you can set more than one them round robin
@@ -52,109 +59,40 @@ class ElasticSearchUDPHandler(logging.Handler):
         :param limit: (int) byte size of buffer, after this limit buffer is \
         pushed to elastic cluster
         :param backup: on/off backup
+        :param threaded: (bool) on/off sending messages from dedicated \
+        flusher thread instead of thread that logs
+        :param flush_interval: (float) maximum number of seconds that \
+        message waits in buffer in threaded mode, None means only size limit
+        :param queue_size: (int) maximum number of messages waiting for \
+        flusher thread, 0 means unlimited
+        :param shards: (int) number of buffers that logging threads append \
+        to, they are merged when messages are sent
+        :param compressor: (Compressor) compress every batch before it's \
+        sent in datagrams and saved in backup, None means no compression
+        :param balancer: (Balancer or str) balancer or name of balancing \
+        strategy: 'round_robin', 'weighted' or 'least_recently_failed', \
+        None means round robin
+        :param deferred: (bool) on/off serializing records when buffer is \
+        sent instead of when they are logged
+        :param executor: (Executor) executor that serializes batches in \
+        deferred mode, None means thread that sends buffer
+        """
+        self._connection = UDPBuffer(connections, limit=limit,
+                                     compressor=compressor, balancer=balancer)
+        ElasticSearchBaseHandler.__init__(
+            self, level=level, name=name, limit=limit, backup=backup,
+            threaded=threaded, flush_interval=flush_interval,
+            queue_size=queue_size, shards=shards, compressor=compressor,
+            deferred=deferred, executor=executor)
+
+    def _send(self, payload, ticket=None):
+        """
+        Send formatted messages packed into UDP datagrams
+
+        :param payload: (list) formatted messages
+        :param ticket: backup ticket of this payload
         """
-        logging.Handler.__init__(self, level)
-        self._connection = UDPBuffer(connections, limit=limit)
-        ElasticSearchUDPHandler._doc_type = name
-        ElasticSearchUDPHandler._limit = limit
-        ElasticSearchUDPHandler._backup_enabled = backup
-
-    @staticmethod
-    def set_backup_path(path):
-        """
-        Set path to backup files
-
-        :param path: (str) unix path
-        """
-        ElasticSearchUDPHandler._backup_path = \
-            path + ("/" if not path.endswith('/') else "")
-
-    @staticmethod
-    def enable_backup():
-        """
-        Enable backup functionality that make possible to make logs sending
-        secure in situation of loosing connection.
-        """
-        ElasticSearchUDPHandler._backup_enabled = True
-
-    @staticmethod
-    def disable_backup():
-        """
-        Disable backup functionality
-        """
-        ElasticSearchUDPHandler._backup_enabled = False
-
-    @staticmethod
-    def set_limit(limit):  # pragma: no cover
-        """
-        Set limit value, limit is size of buffer to store messages, after
-        make this buffer full all messages will be send.
-        It's important to make there good number to make sure that you don't
-        have too many connections to DB and to have too big snap of messages
-        that can make delay's on real time dashboards
-
-        :param limit: (int) number of bytes
-        """
-        ElasticSearchUDPHandler._limit = limit
-
-    @staticmethod
-    def index():
-        """
-        Special method that create identifier for today logs
-
-        :return: (dict)
-        """
-        return '-'.join([
-            ElasticSearchUDPHandler._doc_type,
-            datetime.date.today().strftime('%Y-%m-%d')
-        ])
-
-    def emit(self, record):
-        """
-        Is standard logging Handler method that send message to receiver, in
-        this case message is saved in buffer
-
-        :param record: (LogRecord) - record to send
-        """
-        msg = self.format(record)
-        data_size = sys.getsizeof(msg, 0)
-
-        if ElasticSearchUDPHandler._current_size + data_size > self._limit:
-            self.flush()
-
-        ElasticSearchUDPHandler._current_size += data_size
-        ElasticSearchUDPHandler._buffer.append(msg)
-
-    def flush(self):
-        """
-        Method to send buffered messages to cluster
-        """
-        self.acquire()
-        payload = ElasticSearchUDPHandler._buffer
         self._connection.send(payload)
-        self.backup(payload)
-        ElasticSearchUDPHandler._current_size = 0
-        ElasticSearchUDPHandler._buffer = []
-        self.release()
 
-    def backup(self, data):
-        """
-        Method that save messages to backup if this functionality is enabled
-
-        :param data: (str) - string version of buffered data
-        """
-        if self._backup_enabled:
-            path = self._backup_path + self.index()
-            with open(path, 'a') as out_file:
-                out_file.write('\n'.join(data))
-
-    def close(self):
-        """
-        Tidy up any resources used by the handler.
-
-        This version removes the handler from an internal map of handlers,
-        _handlers, which is used for handler lookup by name. Subclasses
-        should ensure that this gets called from overridden close()
-        methods.
-        """
-        self.flush()
+    def _reset_connection(self):
+        self._connection.reset()
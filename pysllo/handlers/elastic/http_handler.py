@@ -0,0 +1,200 @@
+import json
+import logging
+import threading
+import warnings
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+from pysllo.handlers.elastic.base_handler import ElasticSearchBaseHandler
+from pysllo.utils.http_pool import HTTPConnectionPool
+
+_STOP = object()
+
+
+class BulkRequestError(Exception):
+    """
+    Raised when ElasticSearch rejects whole bulk request
+    """
+
+    def __init__(self, status, body):
+        Exception.__init__(self, 'bulk request failed with status {0}: '
+                                 '{1!r}'.format(status, body[:200]))
+        self.status = status
+        self.body = body
+
+
+class ElasticSearchHTTPHandler(ElasticSearchBaseHandler):
+    """
+        ElasticSearchHTTPHandler is a logging handler that sends your logs
+        to ElasticSearch `_bulk` API over HTTP.
+
+        It uses bounded pool of keep-alive connections and few sender
+        threads, so more than one bulk request can be in flight and
+        logging thread doesn't wait for cluster response. Like for
+        `ElasticSearchUDPHandler` you have to use
+        `pysllo.formatters.JsonFormatter` that makes records in bulk format.
+
+        Documents rejected by cluster are reported by warning and counted in
+        `failed_items` attribute. Backup of batch is acknowledged only when
+        bulk request succeeded.
+
+        To use this handler just setup:
+
+        >>> host, port = 'localhost', 9200
+        >>> handler = ElasticSearchHTTPHandler([(host, port)], pool_size=4)
+        >>> handler.setFormatter(JsonFormatter())
+        >>> log = logging.getLogger('test')
+        >>> log.addHandler(handler)
+
+    """
+
+    _acknowledge_on_send = False
+
+    def __init__(self, hosts,
+                 level=logging.NOTSET, name='logs', limit=1024 * 1024,
+                 backup=False, threaded=False, flush_interval=None,
+                 queue_size=0, shards=8, pool_size=4, timeout=10,
+                 url='/_bulk', compressor=None, deferred=False,
+                 executor=None):
+        """
+        :param hosts: (tuple or list) list of tuples with server address \
+        and port of ElasticSearch nodes
+        :param level: (int) logging level
+        :param name: (str) logger name
+        :param limit: (int) byte size of buffer, after this limit buffer is \
+        sent as one bulk request
+        :param backup: on/off backup
+        :param threaded: (bool) on/off buffering messages in dedicated \
+        flusher thread instead of thread that logs
+        :param flush_interval: (float) maximum number of seconds that \
+        message waits in buffer in threaded mode, None means only size limit
+        :param queue_size: (int) maximum number of messages waiting for \
+        flusher thread, 0 means unlimited
+        :param shards: (int) number of buffers that logging threads append \
+        to, they are merged when messages are sent
+        :param pool_size: (int) maximum number of open connections and \
+        concurrent bulk requests
+        :param timeout: (float) socket timeout in seconds
+        :param url: (str) path of bulk endpoint
+        :param compressor: (Compressor) compress body of bulk requests, \
+        gzip method has to be used for ElasticSearch
+        :param deferred: (bool) on/off serializing records when buffer is \
+        sent instead of when they are logged
+        :param executor: (Executor) executor that serializes batches in \
+        deferred mode, None means thread that sends buffer
+        """
+        self._pool = HTTPConnectionPool(hosts, maxsize=pool_size,
+                                        timeout=timeout)
+        self._url = url
+        self._requests = queue.Queue(pool_size)
+        self._counter_lock = threading.Lock()
+        self.sent_items = 0
+        self.failed_items = 0
+        self._senders = []
+        self._start_senders(pool_size)
+        ElasticSearchBaseHandler.__init__(
+            self, level=level, name=name, limit=limit, backup=backup,
+            threaded=threaded, flush_interval=flush_interval,
+            queue_size=queue_size, shards=shards, compressor=compressor,
+            deferred=deferred, executor=executor)
+
+    def _start_senders(self, count):
+        for i in range(count):
+            sender = threading.Thread(target=self._sender_loop,
+                                      name='pysllo-bulk-{0}'.format(i))
+            sender.daemon = True
+            sender.start()
+            self._senders.append(sender)
+
+    def _reset_connection(self):
+        # requests queued in parent are sent by parent
+        count = len(self._senders)
+        self._senders = []
+        self._requests = queue.Queue(count)
+        self._pool.reset()
+        self._start_senders(count)
+
+    def _send(self, payload, ticket=None):
+        """
+        Pass formatted messages as one bulk request to sender threads, it
+        waits only if all of them are busy
+
+        :param payload: (list) formatted messages
+        :param ticket: backup ticket of this payload
+        """
+        if self._compressor is not None:
+            body = self._compressor.compress(payload) if payload else b''
+        else:
+            body = b''.join(
+                msg if isinstance(msg, bytes) else msg.encode('utf-8')
+                for msg in payload
+            )
+        if body:
+            self._requests.put((body, ticket))
+        else:
+            self._acknowledge(ticket)
+
+    def _sender_loop(self):
+        while True:
+            item = self._requests.get()
+            try:
+                if item is _STOP:
+                    return
+                body, ticket = item
+                self._post(body)
+                self._acknowledge(ticket)
+            except Exception:
+                self.handleError(None)
+            finally:
+                self._requests.task_done()
+
+    def _post(self, body):
+        headers = {'Content-Type': 'application/x-ndjson'}
+        if self._compressor is not None:
+            headers['Content-Encoding'] = self._compressor.method
+        status, data = self._pool.request('POST', self._url, body, headers)
+        if not 200 <= status < 300:
+            raise BulkRequestError(status, data)
+        self._check_items(json.loads(data.decode('utf-8')))
+
+    def _check_items(self, response):
+        items = response.get('items', [])
+        errors = []
+        if response.get('errors'):
+            for item in items:
+                result = list(item.values())[0]
+                if 'error' in result:
+                    errors.append(result['error'])
+        with self._counter_lock:
+            self.sent_items += len(items) - len(errors)
+            self.failed_items += len(errors)
+        if errors:
+            warnings.warn('{0} of {1} documents rejected by bulk API, '
+                          'first error: {2}'.format(len(errors), len(items),
+                                                    errors[0]))
+
+    def flush(self):
+        """
+        Method to send buffered messages to cluster, it waits until all
+        bulk requests are finished
+        """
+        ElasticSearchBaseHandler.flush(self)
+        self._requests.join()
+
+    def close(self):
+        """
+        Tidy up any resources used by the handler.
+
+        Buffered messages are sent, sender threads are stopped after all
+        requests are finished and connections are closed.
+        """
+        ElasticSearchBaseHandler.close(self)
+        senders, self._senders = self._senders, []
+        for _ in senders:
+            self._requests.put(_STOP)
+        for sender in senders:
+            sender.join()
+        self._pool.close()
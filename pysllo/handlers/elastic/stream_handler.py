@@ -0,0 +1,119 @@
+import logging
+
+from pysllo.handlers.elastic.base_handler import ElasticSearchBaseHandler
+from pysllo.utils.stream_buffer import StreamBuffer
+
+
+class ElasticSearchStreamHandler(ElasticSearchBaseHandler):
+    """
+        ElasticSearchStreamHandler is a logging handler that sends your logs
+        over persistent TCP or Unix domain socket connection, for example to
+        Logstash `tcp` input with `json_lines` codec or to shipper working
+        on the same host.
+
+        Unlike UDP, stream connection gives flow control and messages that
+        can't be sent wait in bounded retry queue while handler reconnects
+        with exponential backoff.
+
+        To use this handler just setup:
+
+        >>> handler = ElasticSearchStreamHandler([('localhost', 5000)])
+        >>> handler = ElasticSearchStreamHandler(['/var/run/shipper.sock'])
+        >>> handler.setFormatter(JsonFormatter())
+        >>> log.addHandler(handler)
+
+    """
+
+    _acknowledge_on_send = False
+
+    def __init__(self, connections,
+                 level=logging.NOTSET, name='logs', limit=64 * 1024,
+                 backup=False, threaded=False, flush_interval=None,
+                 queue_size=0, shards=8, retry_limit=10000, timeout=5,
+                 backoff=0.1, max_backoff=30, balancer=None,
+                 deferred=False, executor=None):
+        """
+        :param connections: (tuple or list) list of tuples with server \
+        address and port for TCP or paths of Unix sockets
+        :param level: (int) logging level
+        :param name: (str) logger name
+        :param limit: (int) byte size of buffer, after this limit buffer is \
+        sent
+        :param backup: on/off backup
+        :param threaded: (bool) on/off sending messages from dedicated \
+        flusher thread instead of thread that logs
+        :param flush_interval: (float) maximum number of seconds that \
+        message waits in buffer in threaded mode, None means only size limit
+        :param queue_size: (int) maximum number of messages waiting for \
+        flusher thread, 0 means unlimited
+        :param shards: (int) number of buffers that logging threads append \
+        to, they are merged when messages are sent
+        :param retry_limit: (int) maximum number of messages waiting for \
+        connection
+        :param timeout: (float) socket timeout in seconds
+        :param backoff: (float) delay in seconds before first reconnect
+        :param max_backoff: (float) maximum delay between reconnects
+        :param balancer: (Balancer or str) balancer or name of balancing \
+        strategy: 'round_robin', 'weighted' or 'least_recently_failed', \
+        None means round robin
+        :param deferred: (bool) on/off serializing records when buffer is \
+        sent instead of when they are logged
+        :param executor: (Executor) executor that serializes batches in \
+        deferred mode, None means thread that sends buffer
+        """
+        self._waiting = []
+        self._connection = StreamBuffer(
+            connections, retry_limit=retry_limit, timeout=timeout,
+            backoff=backoff, max_backoff=max_backoff,
+            balancer=balancer)
+        ElasticSearchBaseHandler.__init__(
+            self, level=level, name=name, limit=limit, backup=backup,
+            threaded=threaded, flush_interval=flush_interval,
+            queue_size=queue_size, shards=shards, deferred=deferred,
+            executor=executor)
+
+    def _send(self, payload, ticket=None):
+        """
+        Send formatted messages over stream connection, backup of messages
+        is acknowledged only after retry queue is empty
+
+        :param payload: (list) formatted messages
+        :param ticket: backup ticket of this payload
+        """
+        if ticket is not None:
+            self._waiting.append((self._connection.queued, ticket))
+        self._deliver(payload)
+
+    def _deliver(self, payload, force=False):
+        if self._connection.send(payload, force=force) == 0:
+            waiting, self._waiting = self._waiting, []
+            lost_before = self._connection.lost_before
+            for start, ticket in waiting:
+                # batch with messages dropped from full retry queue stays
+                # in backup, so it's replayed instead of being lost
+                if start >= lost_before:
+                    self._acknowledge(ticket)
+
+    def _flush_buffer(self):
+        with self._flush_lock:
+            ElasticSearchBaseHandler._flush_buffer(self)
+            # waiting messages are retried even if nothing new was logged
+            if self._connection.pending:
+                self._deliver([])
+
+    def _reset_connection(self):
+        self._waiting = []
+        self._connection.reset()
+
+    def close(self):
+        """
+        Tidy up any resources used by the handler.
+
+        Buffered messages are sent and connection is closed, messages
+        waiting for connection get one last attempt without backoff.
+        """
+        ElasticSearchBaseHandler.close(self)
+        with self._flush_lock:
+            if self._connection.pending:
+                self._deliver([], force=True)
+            self._connection.close()
@@ -1,5 +1,7 @@
 from .structured_logger import StructuredLogger
 from .propagation_logger import PropagationLogger
 from .tracking_logger import TrackingLogger
+from .logger_view import LoggerView
 
-__all__ = ("StructuredLogger", "PropagationLogger", "TrackingLogger")
+__all__ = ("StructuredLogger", "PropagationLogger", "TrackingLogger",
+           "LoggerView")
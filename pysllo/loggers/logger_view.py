@@ -0,0 +1,135 @@
+# coding:utf-8
+
+import logging
+
+from pysllo.utils import context
+
+
+class LoggerView(object):
+    """
+    View of `StructuredLogger` with its own fields, made by
+    `StructuredLogger.new`. Fields of view are added only to records
+    logged by it, so fields of one component or request don't leak to
+    other parts of process like values bound by `bind` do.
+
+    >>> request_log = log.new(request_id=request.id, ip=request.ip)
+    >>> request_log.info('Request started')
+    >>> db_log = request_log.new(component='db')
+
+    Fields are merged once, when view is made, and view keeps only
+    reference to logger and to merged fields, so making view for every
+    request is cheap. Fields of view behave like keyword parameters of
+    log call: parameters of call override them and values bound to
+    context override both. Other attributes and methods are taken from
+    logger.
+    """
+
+    __slots__ = ('_logger', '_fields')
+
+    def __init__(self, logger, fields):
+        """
+        :param logger: (StructuredLogger) logger that makes records
+        :param fields: (dict) fields of view, dict is taken by reference \
+        and mustn't be changed later
+        """
+        self._logger = logger
+        self._fields = fields
+
+    @property
+    def logger(self):
+        """
+        Logger that makes records of view
+        """
+        return self._logger
+
+    @property
+    def fields(self):
+        """
+        Copy of fields of view
+        """
+        return self._fields.copy()
+
+    def new(self, **kwargs):
+        """
+        Make view with fields of this view and new ones
+
+        >>> db_log = request_log.new(component='db')
+
+        :param kwargs: (dict) named fields, they override fields of view
+        :return: (LoggerView) new view
+        """
+        fields = self._fields.copy()
+        fields.update(kwargs)
+        return LoggerView(self._logger, fields)
+
+    with_fields = new
+
+    def _merged(self, kwargs):
+        if not kwargs:
+            return self._fields
+        fields = self._fields.copy()
+        fields.update(kwargs)
+        return fields
+
+    # level is checked like by methods of `logging.Logger`, record is
+    # made by `_log` of logger directly, without one more call
+
+    def debug(self, msg, *args, **kwargs):
+        logger = self._logger
+        if logger.isEnabledFor(logging.DEBUG):
+            logger._log(logging.DEBUG, msg, args, **self._merged(kwargs))
+
+    def info(self, msg, *args, **kwargs):
+        logger = self._logger
+        if logger.isEnabledFor(logging.INFO):
+            logger._log(logging.INFO, msg, args, **self._merged(kwargs))
+
+    def warning(self, msg, *args, **kwargs):
+        logger = self._logger
+        if logger.isEnabledFor(logging.WARNING):
+            logger._log(logging.WARNING, msg, args, **self._merged(kwargs))
+
+    warn = warning
+
+    def error(self, msg, *args, **kwargs):
+        logger = self._logger
+        if logger.isEnabledFor(logging.ERROR):
+            logger._log(logging.ERROR, msg, args, **self._merged(kwargs))
+
+    def exception(self, msg, *args, **kwargs):
+        kwargs['exc_info'] = True
+        self.error(msg, *args, **kwargs)
+
+    def critical(self, msg, *args, **kwargs):
+        logger = self._logger
+        if logger.isEnabledFor(logging.CRITICAL):
+            logger._log(logging.CRITICAL, msg, args, **self._merged(kwargs))
+
+    fatal = critical
+
+    def log(self, level, msg, *args, **kwargs):
+        logger = self._logger
+        if logger.isEnabledFor(level):
+            logger._log(level, msg, args, **self._merged(kwargs))
+
+    def __contains__(self, item):
+        return item in self._fields or item in context.get_context()
+
+    def get(self, item, default=None):
+        """
+        Return value of item added to records of view, value bound to
+        context overrides field of view
+
+        :param item: (str) - name of field
+        :param default: (object) - default value if field doesn't exist
+        :return: (object)
+        """
+        return context.get_context().get(
+            item, self._fields.get(item, default))
+
+    def __getattr__(self, name):
+        return getattr(self._logger, name)
+
+    def __repr__(self):
+        return '<LoggerView {0} {1!r}>'.format(
+            self._logger.name, self._fields)
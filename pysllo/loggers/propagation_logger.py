@@ -47,6 +47,10 @@ class PropagationLogger(Logger):
 
     _forcing = {}
     _global_propagation_level = logging.NOTSET
+    # changed every time when forced levels change, loggers clear cache of
+    # level checks when they see other generation
+    _levels_generation = 0
+    _cached_generation = 0
 
     def __init__(self, name, level=logging.NOTSET, propagation=False):
         """
@@ -88,12 +92,38 @@ class PropagationLogger(Logger):
             return PropagationLogger._global_propagation_level
         return Logger.getEffectiveLevel(self)
 
+    def isEnabledFor(self, level):
+        """
+        Is this logger enabled for level 'level'?
+
+        Results are cached by Logger, cache is cleared when forced level
+        was changed after last check.
+        """
+        # logging.config disables existing loggers without clearing cache
+        if self.disabled:
+            return False
+        generation = PropagationLogger._levels_generation
+        if self._cached_generation == generation:
+            try:
+                return self._cache[level]
+            except (KeyError, AttributeError):
+                pass
+        else:
+            self._cached_generation = generation
+            getattr(self, '_cache', {}).clear()
+        return Logger.isEnabledFor(self, level)
+
+    @staticmethod
+    def _levels_changed():
+        PropagationLogger._levels_generation += 1
+
     @staticmethod
     def reset_level():
         """
         Resetting level of propagation
         """
         PropagationLogger._global_propagation_level = logging.NOTSET
+        PropagationLogger._levels_changed()
 
     @staticmethod
     def level_propagation(level):
@@ -120,6 +150,7 @@ class PropagationLogger(Logger):
         :param args: (str or dict) level name or configuration for more levels
         :param kwargs: (dict) name of logger and value as elements
         """
+        PropagationLogger._levels_changed()
         if len(args) > 1:
             raise TypeError("force_level() takes exactly one argument "
                             "or named arguments ({0} given)".format(len(args)))
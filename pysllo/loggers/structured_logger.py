@@ -2,6 +2,9 @@
 
 from logging import Logger
 
+from pysllo.utils import context
+from pysllo.loggers.logger_view import LoggerView
+
 
 class StructuredLogger(Logger):
     """
@@ -28,20 +31,53 @@ cookies=session.cookies)
     >>> request.logout()
     >>> log.unbind('user', 'ip')
 
+    Values can be also bound only for block of code or function, they are
+    removed on exit, even if exception is raised:
+
+    >>> with log.bound(request_id=request.id):
+    >>>     log.info('Request started')
+    >>>
+    >>> @log.bound(job='cleanup')
+    >>> def cleanup():
+    >>>     log.info('Cleaning')
+
+    Bound values are kept in `contextvars`, so every thread and asyncio
+    task has its own context and concurrent requests don't overwrite
+    values of each other. Task started by asyncio gets values bound when
+    it was created, but new thread starts with empty context. Values that
+    every thread and task has to log, like name of service, are bound by
+    `bind_global`, values bound by `bind` override them:
+
+    >>> log.bind_global(service='billing')
+
+    Values that are costly to compute can be wrapped by
+    `pysllo.utils.Lazy`, they are computed only for records formatted by
+    `JsonFormatter`, not for records filtered out by level:
+
+    >>> log.bind(memory=Lazy(memory_usage))
+    >>> log.debug('Request', body=Lazy(lambda: json.dumps(request.body)))
+
+    Fields of one component or request can be added by view of logger,
+    they aren't visible to other loggers:
+
+    >>> request_log = log.new(request_id=request.id)
+    >>> request_log.info('Request started')
+
     """
-    _context = {}
 
     def _proper_extra(self, kwargs):
         extra = kwargs.pop('extra', {})
         exc_info = kwargs.pop('exc_info', None)
         extra.update(kwargs)
-        extra.update(StructuredLogger._context)
+        extra.update(context.get_context())
         new_kwargs = {'extra': extra, 'exc_info': exc_info}
         return new_kwargs
 
     def _log(self, level, msg, args, **kwargs):
-        kwargs = self._proper_extra(kwargs)
-        Logger._log(self, level, msg, args, **kwargs)
+        # it's reached only by records that pass level check, so kwargs
+        # are converted only for records that are really made
+        kwargs = StructuredLogger._proper_extra(self, kwargs)
+        super(StructuredLogger, self)._log(level, msg, args, **kwargs)
 
     def exception(self, msg, *args, **kwargs):
         """
@@ -52,7 +88,7 @@ cookies=session.cookies)
         self.error(msg, *args, **kwargs)
 
     def __contains__(self, item):
-        return item in self._context
+        return item in context.get_context()
 
     def get(self, item, default=None):
         """
@@ -65,7 +101,7 @@ cookies=session.cookies)
         :param default: (object) - default value if element is not in context
         :return: (object)
         """
-        return self._context.get(item, default)
+        return context.get_context().get(item, default)
 
     @staticmethod
     def bind(**kwargs):
@@ -76,7 +112,59 @@ cookies=session.cookies)
 
         :param kwargs: (dict) - named parameters with values to bind
         """
-        StructuredLogger._context.update(kwargs)
+        context.bind(**kwargs)
+
+    @staticmethod
+    def bind_global(**kwargs):
+        """
+        Bind params to logs of all threads and tasks
+
+        >>> log.bind_global(service='billing')
+
+        :param kwargs: (dict) - named parameters with values to bind
+        """
+        context.bind_global(**kwargs)
+
+    @staticmethod
+    def unbind_global(*args):
+        """
+        Remove params bound by `bind_global`, all are removed if no name
+        is given
+
+        >>> log.unbind_global('service')
+
+        :param args: (list) names of params to remove
+        """
+        context.unbind_global(*args)
+
+    @staticmethod
+    def bound(**kwargs):
+        """
+        Bind params as context to logger only inside of `with` block or
+        decorated function
+
+        >>> with log.bound(ip='127.0.0.1'):
+        >>>     log.info('Request')
+
+        :param kwargs: (dict) - named parameters with values to bind
+        :return: (bound) context manager and decorator
+        """
+        return context.bound(**kwargs)
+
+    def new(self, **kwargs):
+        """
+        Make view of logger that adds fields only to its own records,
+        context of other loggers isn't changed
+
+        >>> request_log = log.new(request_id=request.id)
+        >>> request_log.info('Request started')
+
+        :param kwargs: (dict) - named fields of view
+        :return: (LoggerView) view of logger
+        """
+        return LoggerView(self, kwargs)
+
+    with_fields = new
 
     @staticmethod
     def unbind(*args):
@@ -88,8 +176,4 @@ cookies=session.cookies)
 
         :param args: (list) names of context elements to remove
         """
-        if args:
-            for arg in args:
-                StructuredLogger._context.pop(arg)
-        else:
-            StructuredLogger._context = {}
+        context.unbind(*args)
@@ -2,6 +2,7 @@
 import logging
 
 from .propagation_logger import PropagationLogger
+from ..utils import context
 from ..utils.tracer import Tracer, TraceContext
 
 
@@ -78,10 +79,6 @@ class TrackingLogger(PropagationLogger):
         """
         return self._trace_ctx
 
-    @staticmethod
-    def _proper_extra(kwargs):
-        return kwargs
-
     def enable_tracking(self, force_level=logging.DEBUG):
         """
         Make tracking enable in whole logging. If force_level is configured on
@@ -100,8 +97,9 @@ class TrackingLogger(PropagationLogger):
 
         logs = TrackingLogger._tracer.dump_logs()
         for log in logs:
-            level, msg, args, kwargs = log
-            self._log(level, msg, args, **kwargs)
+            level, msg, args, kwargs, scope = log
+            context.call_in_scope(scope, self._log, level, msg, args,
+                                  **kwargs)
 
         if reset_level_after:
             self.reset_level()
@@ -120,9 +118,9 @@ class TrackingLogger(PropagationLogger):
         self._flush_tracer(reset_level_after=True)
 
     def _log(self, level, msg, args, **kwargs):
-        kwargs = self._proper_extra(kwargs)
+        # traced logs keep kwargs as they were given, loggers next in MRO
+        # convert them only when logs are really emitted
         if TrackingLogger._is_tracking_enable:
             TrackingLogger._tracer.log(level, msg, args, **kwargs)
-        else:
-            if self.isEnabledFor(level):
-                PropagationLogger._log(self, level, msg, args, **kwargs)
+        elif self.isEnabledFor(level):
+            super(TrackingLogger, self)._log(level, msg, args, **kwargs)
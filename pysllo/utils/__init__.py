@@ -1,3 +1,4 @@
 from .factory import LoggersFactory
+from .lazy import Lazy
 
-__all__ = ["LoggersFactory"]
+__all__ = ["LoggersFactory", "Lazy"]
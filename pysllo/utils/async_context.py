@@ -0,0 +1,23 @@
+"""
+Parts of `pysllo.utils.context` that use syntax of python 3.5
+"""
+import functools
+
+
+def bound_coroutine(func, enter, exit):
+    """
+    Wrap coroutine function, so scope is entered while its coroutine runs
+
+    :param func: (callable) coroutine function
+    :param enter: (callable) function that enters scope and returns token
+    :param exit: (callable) function that restores scope of token
+    :return: (callable) wrapped coroutine function
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = enter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            exit(token)
+    return wrapper
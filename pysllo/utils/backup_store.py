@@ -0,0 +1,418 @@
+"""
+Segmented backup store for messages sent by ElasticSearch handlers.
+
+Messages are appended to segment files as records prefixed with length and
+CRC32 checksum, so torn record after crash is detected and ignored. With
+compressor whole batch is saved as one compressed record. Handler
+acknowledges batches that were sent and store keeps checkpoint of
+acknowledged position, so messages that weren't sent can be shipped again
+by `replay`. Replay can be run from command line:
+
+    python -m pysllo.utils.backup_store /var/log/backup \\
+        --name logs --udp localhost:9000 --workers 4
+"""
+import argparse
+import collections
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from multiprocessing.pool import ThreadPool
+
+from pysllo.utils.compression import decompress
+
+_HEADER = struct.Struct('>II')
+# highest bit of record size marks compressed batch of records
+_COMPRESSED = 0x80000000
+_replace = getattr(os, 'replace', os.rename)
+
+FSYNC_NEVER = 'never'
+FSYNC_ALWAYS = 'always'
+FSYNC_INTERVAL = 'interval'
+
+
+class SegmentedBackupStore(object):
+    """
+    SegmentedBackupStore keeps messages in fixed size segment files until
+    they are acknowledged.
+
+    >>> store = SegmentedBackupStore('/var/log/backup', name='logs')
+    >>> ticket = store.append(messages)
+    >>> send(messages)
+    >>> store.acknowledge(ticket)
+
+    Tickets can be acknowledged in other order than appended, checkpoint is
+    moved only over batches that all were acknowledged. Segments before
+    checkpoint are removed.
+
+    Checkpoint is written to disk by fsync policy: after every
+    acknowledge with 'always', otherwise not more often than every
+    `fsync_interval` seconds, and always when segment is fully
+    acknowledged and on `close`. After crash messages acknowledged after
+    the last written checkpoint are shipped again.
+    """
+
+    def __init__(self, path, name='logs', segment_size=64 * 1024 * 1024,
+                 fsync=FSYNC_NEVER, fsync_interval=1.0, compressor=None):
+        """
+        :param path: (str) directory of segment files
+        :param name: (str) prefix of segment files
+        :param segment_size: (int) size in bytes after which new segment \
+        file is started
+        :param fsync: (str) 'never' leaves flushing to system, 'always' \
+        makes fsync after every batch, 'interval' makes fsync not more \
+        often than every `fsync_interval` seconds
+        :param fsync_interval: (float) seconds between fsync calls in \
+        'interval' mode and between writes of checkpoint in 'interval' \
+        and 'never' modes
+        :param compressor: (Compressor) compress every batch as one record, \
+        None means no compression
+        """
+        if fsync not in (FSYNC_NEVER, FSYNC_ALWAYS, FSYNC_INTERVAL):
+            raise ValueError('unknown fsync policy: {0!r}'.format(fsync))
+        self._path = path
+        self._name = name
+        self._segment_size = segment_size
+        self._fsync = fsync
+        self._fsync_interval = fsync_interval
+        self._compressor = compressor
+        self._last_fsync = time.time()
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._pattern = re.compile(re.escape(name) + r'-(\d{10})\.seg$')
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._checkpoint = self._read_checkpoint()
+        self._written = self._checkpoint
+        self._last_checkpoint = time.time()
+        self._file = None
+        self._open_last_segment()
+        segments = self.segments()
+        self._first_seq = segments[0] if segments else self._seq
+        # messages left by previous run block checkpoint until replay
+        self._backlog = None
+        if self._has_backlog():
+            self._backlog = [(self._seq, self._offset), False]
+            self._pending.append(self._backlog)
+
+    def _segment_path(self, seq):
+        return os.path.join(self._path,
+                            '{0}-{1:010d}.seg'.format(self._name, seq))
+
+    def _checkpoint_path(self):
+        return os.path.join(self._path, self._name + '.checkpoint')
+
+    def segments(self):
+        """
+        List numbers of existing segment files
+
+        :return: (list) sorted segment numbers
+        """
+        result = []
+        for file_name in os.listdir(self._path):
+            match = self._pattern.match(file_name)
+            if match:
+                result.append(int(match.group(1)))
+        return sorted(result)
+
+    def _read_checkpoint(self):
+        try:
+            with open(self._checkpoint_path()) as in_file:
+                seq, offset = in_file.read().split()
+            return int(seq), int(offset)
+        except (IOError, OSError, ValueError):
+            return 0, 0
+
+    def _write_checkpoint(self, position):
+        tmp_path = self._checkpoint_path() + '.tmp'
+        with open(tmp_path, 'w') as out_file:
+            out_file.write('{0} {1}\n'.format(*position))
+            if self._fsync != FSYNC_NEVER:
+                out_file.flush()
+                os.fsync(out_file.fileno())
+        _replace(tmp_path, self._checkpoint_path())
+
+    def _open_last_segment(self):
+        segments = self.segments()
+        seq = segments[-1] if segments else self._checkpoint[0] + 1
+        path = self._segment_path(seq)
+        # cut torn record that could be written during crash
+        valid_end = read_segment(path)[1] if os.path.exists(path) else 0
+        self._file = open(path, 'ab')
+        self._file.truncate(valid_end)
+        self._seq = seq
+        self._offset = valid_end
+
+    def _has_backlog(self):
+        for seq in self.segments():
+            if seq < self._checkpoint[0]:
+                continue
+            if seq == self._seq:
+                size = self._offset
+            else:
+                size = os.path.getsize(self._segment_path(seq))
+            start = self._checkpoint[1] if seq == self._checkpoint[0] else 0
+            if size > start:
+                return True
+        return False
+
+    def _rotate(self):
+        self._file.close()
+        self._seq += 1
+        self._offset = 0
+        self._file = open(self._segment_path(self._seq), 'ab')
+
+    def _sync(self):
+        if self._fsync == FSYNC_NEVER:
+            return
+        now = time.time()
+        if self._fsync == FSYNC_ALWAYS or \
+                now - self._last_fsync >= self._fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def append(self, messages):
+        """
+        Write batch of messages to current segment in one write
+
+        :param messages: (list) messages as str or bytes
+        :return: (list) ticket used to acknowledge this batch
+        """
+        data = _records(messages)
+        if self._compressor is not None:
+            data = _records([self._compressor.compress([data])], _COMPRESSED)
+        with self._lock:
+            if self._offset and \
+                    self._offset + len(data) > self._segment_size:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._sync()
+            self._offset += len(data)
+            ticket = [(self._seq, self._offset), False]
+            self._pending.append(ticket)
+        return ticket
+
+    def acknowledge(self, ticket):
+        """
+        Mark batch as sent, checkpoint is moved over all acknowledged
+        batches that were appended before first not acknowledged one
+
+        :param ticket: (list) ticket returned by `append`
+        """
+        with self._lock:
+            ticket[1] = True
+            position = None
+            while self._pending and self._pending[0][1]:
+                position = self._pending.popleft()[0]
+            if position is not None:
+                self._set_checkpoint(position)
+
+    def _set_checkpoint(self, position, force=False):
+        if position <= self._checkpoint:
+            return
+        self._checkpoint = position
+        # checkpoint has to be on disk before acknowledged segments are
+        # removed
+        segment_done = position[0] > self._first_seq
+        now = time.time()
+        if force or segment_done or self._fsync == FSYNC_ALWAYS or \
+                now - self._last_checkpoint >= self._fsync_interval:
+            self._store_checkpoint(now)
+        if segment_done:
+            # segments are numbered one after another, so directory isn't
+            # listed
+            for seq in range(self._first_seq, position[0]):
+                try:
+                    os.remove(self._segment_path(seq))
+                except OSError:
+                    pass
+            self._first_seq = position[0]
+
+    def _store_checkpoint(self, now=None):
+        if self._written != self._checkpoint:
+            self._write_checkpoint(self._checkpoint)
+            self._written = self._checkpoint
+        self._last_checkpoint = now or time.time()
+
+    def unacknowledged(self):
+        """
+        Read messages that were not acknowledged, segment by segment. If
+        store was opened with messages left by previous run, only them
+        are returned.
+
+        :return: (list) list of tuples with list of messages and position \
+        of end of segment
+        """
+        with self._lock:
+            checkpoint = self._checkpoint
+            if self._backlog is not None:
+                last = self._backlog[0]
+            else:
+                last = (self._seq, self._offset)
+        result = []
+        for seq in self.segments():
+            if seq < checkpoint[0] or seq > last[0]:
+                continue
+            messages, end = read_segment(self._segment_path(seq))
+            if seq == last[0]:
+                end = min(end, last[1])
+            start = checkpoint[1] if seq == checkpoint[0] else 0
+            messages = [msg for offset, msg in messages
+                        if start <= offset < end]
+            if messages:
+                result.append((messages, (seq, end)))
+        return result
+
+    def replay(self, send, workers=4):
+        """
+        Ship again messages that were not acknowledged, segments are sent in
+        parallel and checkpoint is moved in order after every sent segment
+
+        :param send: (callable) function that sends list of messages, \
+        it's called from worker threads
+        :param workers: (int) number of parallel senders
+        :return: (int) number of sent messages
+        """
+        segments = self.unacknowledged()
+
+        def ship(segment):
+            send(segment[0])
+            return segment
+
+        pool = ThreadPool(workers)
+        sent = 0
+        try:
+            for messages, position in pool.imap(ship, segments):
+                with self._lock:
+                    self._set_checkpoint(position, force=True)
+                sent += len(messages)
+        finally:
+            pool.close()
+            pool.join()
+        if self._backlog is not None:
+            backlog, self._backlog = self._backlog, None
+            self.acknowledge(backlog)
+        return sent
+
+    def close(self):
+        """
+        Close current segment file and write checkpoint
+        """
+        with self._lock:
+            self._store_checkpoint()
+            if self._file is not None:
+                self._file.flush()
+                if self._fsync != FSYNC_NEVER:
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+
+def _records(messages, flags=0):
+    chunks = []
+    for msg in messages:
+        if not isinstance(msg, bytes):
+            msg = msg.encode('utf-8')
+        crc = zlib.crc32(msg) & 0xffffffff
+        chunks.append(_HEADER.pack(len(msg) | flags, crc))
+        chunks.append(msg)
+    return b''.join(chunks)
+
+
+def _parse_records(data):
+    records = []
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        size, crc = _HEADER.unpack_from(data, offset)
+        flags, size = size & _COMPRESSED, size & ~_COMPRESSED
+        start = offset + _HEADER.size
+        msg = data[start:start + size]
+        if len(msg) < size or zlib.crc32(msg) & 0xffffffff != crc:
+            break
+        if flags & _COMPRESSED:
+            batch = _parse_records(decompress(msg))[0]
+            records.extend((offset, inner) for _, inner in batch)
+        else:
+            records.append((offset, msg))
+        offset = start + size
+    return records, offset
+
+
+def read_segment(path):
+    """
+    Read valid records from segment file, reading stops on first torn or
+    damaged record
+
+    :param path: (str) path of segment file
+    :return: (tuple) list of (offset, message) tuples and offset of end \
+    of last valid record
+    """
+    with open(path, 'rb') as in_file:
+        return _parse_records(in_file.read())
+
+
+def _address(value):
+    host, port = value.rsplit(':', 1)
+    return host, int(port)
+
+
+def _udp_sender(connections):
+    from pysllo.utils.udp_buffer import UDPBuffer
+    local = threading.local()
+
+    def send(messages):
+        if not hasattr(local, 'buffer'):
+            local.buffer = UDPBuffer(connections)
+        local.buffer.send(messages)
+    return send
+
+
+def _http_sender(hosts, url):
+    from pysllo.utils.http_pool import HTTPConnectionPool
+    pool = HTTPConnectionPool(hosts)
+
+    def send(messages):
+        status, body = pool.request(
+            'POST', url, b''.join(messages),
+            {'Content-Type': 'application/x-ndjson'})
+        if not 200 <= status < 300:
+            raise IOError('bulk request failed with status {0}'.format(
+                status))
+    return send
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Ship again not acknowledged messages from backup')
+    parser.add_argument('path', help='directory of backup segments')
+    parser.add_argument('--name', default='logs',
+                        help='prefix of segment files')
+    parser.add_argument('--udp', type=_address, action='append',
+                        help='host:port of UDP input, can be repeated')
+    parser.add_argument('--http', type=_address, action='append',
+                        help='host:port of ElasticSearch, can be repeated')
+    parser.add_argument('--url', default='/_bulk', help='bulk API path')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='number of parallel senders')
+    args = parser.parse_args(argv)
+
+    if args.http:
+        send = _http_sender(args.http, args.url)
+    elif args.udp:
+        send = _udp_sender(args.udp)
+    else:
+        parser.error('one of --udp or --http is required')
+
+    store = SegmentedBackupStore(args.path, name=args.name)
+    try:
+        sent = store.replay(send, workers=args.workers)
+    finally:
+        store.close()
+    print('{0} messages sent'.format(sent))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,250 @@
+"""
+Balancing of messages between many connections.
+
+Every connection is represented by `Endpoint` that keeps its health.
+Transports report errors and successful sends to balancer, endpoints that
+failed `eject_after` times in a row are ejected for `eject_time` seconds, so
+dead node doesn't receive part of messages. When all endpoints are ejected
+the one that will return first is used anyway, messages are never held
+back by balancer.
+
+>>> balancer = WeightedBalancer([('node1', 9000), ('node2', 9000)],
+>>>                             weights=[3, 1])
+>>> endpoint = balancer.choose()
+>>> try:
+>>>     send(endpoint.address)
+>>> except socket.error:
+>>>     balancer.failed(endpoint)
+>>> else:
+>>>     balancer.succeeded(endpoint)
+"""
+import socket
+import threading
+import time
+
+ROUND_ROBIN = 'round_robin'
+WEIGHTED = 'weighted'
+LEAST_RECENTLY_FAILED = 'least_recently_failed'
+
+
+class Endpoint(object):
+    """
+    Endpoint keeps address of connection and its health state
+    """
+
+    __slots__ = ('address', 'weight', 'failures', 'last_failure',
+                 'ejected_until', 'current_weight')
+
+    def __init__(self, address, weight=1):
+        """
+        :param address: (tuple or str) address of connection
+        :param weight: (int) part of messages sent to this endpoint
+        """
+        self.address = address
+        self.weight = weight
+        self.failures = 0
+        self.last_failure = 0
+        self.ejected_until = 0
+        self.current_weight = 0
+
+    def is_available(self, now=None):
+        """
+        Check that endpoint isn't ejected
+
+        :param now: (float) current time
+        :return: (bool) True if endpoint can be used
+        """
+        return (now or time.time()) >= self.ejected_until
+
+    def __repr__(self):
+        return 'Endpoint({0!r}, weight={1}, failures={2})'.format(
+            self.address, self.weight, self.failures)
+
+
+class Balancer(object):
+    """
+    Base class of balancing strategies, subclasses implement `_select`
+    that chooses one endpoint from list of available ones
+    """
+
+    def __init__(self, connections, weights=None, eject_after=1,
+                 eject_time=30):
+        """
+        :param connections: (list) addresses of connections
+        :param weights: (list) weight of every connection, used only by \
+        weighted strategy
+        :param eject_after: (int) number of failures in a row after which \
+        endpoint is ejected
+        :param eject_time: (float) seconds for which endpoint is ejected
+        """
+        if not connections:
+            raise ValueError('at least one connection is required')
+        weights = weights or [1] * len(connections)
+        if len(weights) != len(connections):
+            raise ValueError('number of weights must match connections')
+        self.endpoints = [Endpoint(address, weight)
+                          for address, weight in zip(connections, weights)]
+        self._eject_after = eject_after
+        self._eject_time = eject_time
+        self._current = -1
+        self._lock = threading.Lock()
+
+    def available(self):
+        """
+        List endpoints that aren't ejected
+
+        :return: (list) available endpoints
+        """
+        now = time.time()
+        return [endpoint for endpoint in self.endpoints
+                if endpoint.is_available(now)]
+
+    def choose(self):
+        """
+        Choose endpoint for next send
+
+        :return: (Endpoint) chosen endpoint
+        """
+        with self._lock:
+            candidates = self.available()
+            if not candidates:
+                return min(self.endpoints,
+                           key=lambda endpoint: endpoint.ejected_until)
+            return self._select(candidates)
+
+    def _select(self, candidates):
+        raise NotImplementedError
+
+    def _next(self, candidates):
+        # rotation over all endpoints skipping the ejected ones
+        count = len(self.endpoints)
+        for _ in range(count):
+            self._current = (self._current + 1) % count
+            endpoint = self.endpoints[self._current]
+            if endpoint in candidates:
+                return endpoint
+        return candidates[0]
+
+    def failed(self, endpoint):
+        """
+        Report failure of endpoint, it's ejected after `eject_after`
+        failures in a row
+
+        :param endpoint: (Endpoint) endpoint that failed
+        """
+        with self._lock:
+            now = time.time()
+            endpoint.failures += 1
+            endpoint.last_failure = now
+            if endpoint.failures >= self._eject_after:
+                endpoint.ejected_until = now + self._eject_time
+
+    def succeeded(self, endpoint):
+        """
+        Report successful send to endpoint, it resets its failures
+
+        :param endpoint: (Endpoint) endpoint that worked
+        """
+        if endpoint.failures or endpoint.ejected_until:
+            with self._lock:
+                endpoint.failures = 0
+                endpoint.ejected_until = 0
+
+    def probe(self, check):
+        """
+        Update health of all endpoints using probe, for example response
+        of local receiver to health check request
+
+        :param check: (callable) function that gets address and returns \
+        True if endpoint is healthy
+        """
+        for endpoint in self.endpoints:
+            try:
+                healthy = check(endpoint.address)
+            except (socket.error, IOError):
+                healthy = False
+            if healthy:
+                self.succeeded(endpoint)
+            else:
+                self.failed(endpoint)
+
+
+class RoundRobinBalancer(Balancer):
+    """
+    Every send goes to next available endpoint
+    """
+
+    def _select(self, candidates):
+        return self._next(candidates)
+
+
+class WeightedBalancer(Balancer):
+    """
+    Available endpoints get sends in proportion to their weights, sends
+    are interleaved smoothly instead of going in series to one endpoint
+    """
+
+    def _select(self, candidates):
+        total = 0
+        best = None
+        for endpoint in candidates:
+            endpoint.current_weight += endpoint.weight
+            total += endpoint.weight
+            if best is None or endpoint.current_weight > best.current_weight:
+                best = endpoint
+        best.current_weight -= total
+        return best
+
+
+class LeastRecentlyFailedBalancer(Balancer):
+    """
+    Sends go to available endpoint that failed longest time ago, endpoints
+    that never failed are used in round robin order
+    """
+
+    def _select(self, candidates):
+        oldest = min(endpoint.last_failure for endpoint in candidates)
+        return self._next([endpoint for endpoint in candidates
+                           if endpoint.last_failure == oldest])
+
+
+_STRATEGIES = {
+    ROUND_ROBIN: RoundRobinBalancer,
+    WEIGHTED: WeightedBalancer,
+    LEAST_RECENTLY_FAILED: LeastRecentlyFailedBalancer,
+}
+
+
+def make_balancer(connections, balancer=None, **kwargs):
+    """
+    Create balancer for connections
+
+    :param connections: (list) addresses of connections
+    :param balancer: (Balancer or str) balancer instance or name of \
+    strategy: 'round_robin', 'weighted' or 'least_recently_failed', \
+    None means round robin
+    :return: (Balancer) balancer
+    """
+    if isinstance(balancer, Balancer):
+        return balancer
+    try:
+        strategy = _STRATEGIES[balancer or ROUND_ROBIN]
+    except KeyError:
+        raise ValueError('unknown balancing strategy: {0!r}'.format(
+            balancer))
+    return strategy(connections, **kwargs)
+
+
+def tcp_probe(timeout=1):
+    """
+    Make probe that checks whether TCP port of endpoint accepts
+    connections, useful when receiver listens also on TCP
+
+    :param timeout: (float) connection timeout in seconds
+    :return: (callable) probe for `Balancer.probe`
+    """
+    def check(address):
+        sock = socket.create_connection(address, timeout)
+        sock.close()
+        return True
+    return check
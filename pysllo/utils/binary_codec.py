@@ -0,0 +1,397 @@
+"""
+Compact binary format of log messages made by
+`pysllo.formatters.BinaryFormatter` and its decoder.
+
+Every message is one frame::
+
+    frame    := MAGIC varint(length) body '\\n'
+    body     := header document
+    header   := VERSION string(index) string(type) id
+    id       := varint(0) | varint(length + 1) utf-8
+    document := value
+
+Values start with one byte tag, integers are zigzag varints, floats are
+8 byte doubles. Strings are written once per frame, next occurrences are
+references to table of the frame that starts with `STATIC_STRINGS`, so
+names of record attributes and level names are never written at all.
+Frames are independent, they can be lost, reordered or replayed from
+backup one by one, and the trailing new line makes them pass through
+transports that frame messages by lines.
+
+Decoder uses only standard library, it converts frames back to the
+ElasticSearch bulk format made by `JsonFormatter`::
+
+    $ python -m pysllo.utils.binary_codec backup.bin > bulk.json
+"""
+import json
+import struct
+import sys
+
+from pysllo.utils.json_encoder import converters
+
+MAGIC = 0xb1
+VERSION = 1
+
+_NULL = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STRING = 5
+_REF = 6
+_LIST = 7
+_DICT = 8
+
+# order of this list is part of format, new strings can be only appended
+# in new version
+STATIC_STRINGS = (
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 'filename',
+    'module', 'exc_info', 'exc_text', 'stack_info', 'lineno', 'funcName',
+    'created', 'msecs', 'relativeCreated', 'thread', 'threadName',
+    'processName', 'process', 'message', 'asctime', '@timestamp',
+    'traceback', 'exc_class', 'exc_fingerprint', 'ES_MTL', 'taskName',
+    'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL', 'MainThread',
+    'MainProcess', '<module>', 'root',
+)
+_STATIC_TABLE = dict((text, ref) for ref, text in enumerate(STATIC_STRINGS))
+
+_double = struct.Struct('>d')
+
+try:
+    string_types = basestring
+    integer_types = (int, long)
+except NameError:  # pragma: no cover
+    string_types = str
+    integer_types = int
+
+_KEY_TYPES = (integer_types, float, type(None))
+
+
+class DecodeError(ValueError):
+    """
+    Data isn't valid binary log frame
+    """
+
+
+def write_varint(out, number):
+    """
+    Append unsigned integer to buffer, 7 bits in every byte
+
+    :param out: (bytearray) buffer
+    :param number: (int) not negative integer
+    """
+    while number > 0x7f:
+        out.append((number & 0x7f) | 0x80)
+        number >>= 7
+    out.append(number)
+
+
+def write_string(out, text):
+    """
+    Append length prefixed UTF-8 string to buffer
+
+    :param out: (bytearray) buffer
+    :param text: (str) string
+    """
+    data = text.encode('utf-8')
+    write_varint(out, len(data))
+    out += data
+
+
+class _Writer(object):
+
+    __slots__ = ('out', 'table', 'registry')
+
+    def __init__(self, registry):
+        self.out = bytearray()
+        self.table = _STATIC_TABLE.copy()
+        self.registry = registry
+
+    def write(self, value):
+        out = self.out
+        if isinstance(value, string_types):
+            table = self.table
+            ref = table.get(value)
+            if ref is None:
+                table[value] = len(table)
+                data = value.encode('utf-8')
+                out.append(_STRING)
+                write_varint(out, len(data))
+                out += data
+            else:
+                out.append(_REF)
+                write_varint(out, ref)
+        elif value is None:
+            out.append(_NULL)
+        elif value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif isinstance(value, integer_types):
+            out.append(_INT)
+            write_varint(out, value << 1 if value >= 0 else
+                         ((-value) << 1) - 1)
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _double.pack(value)
+        elif isinstance(value, dict):
+            out.append(_DICT)
+            write_varint(out, len(value))
+            self._write_items(value)
+        elif isinstance(value, (list, tuple)):
+            out.append(_LIST)
+            write_varint(out, len(value))
+            write = self.write
+            for item in value:
+                write(item)
+        else:
+            self.write(self.registry(value))
+
+    def _write_items(self, value):
+        # loop over documents writes strings and None itself, method call
+        # for every field costs more than encoding it
+        out = self.out
+        table = self.table
+        write = self.write
+        for key, item in value.items():
+            if key.__class__ is not str and \
+                    not isinstance(key, string_types) and \
+                    not isinstance(key, _KEY_TYPES):
+                raise TypeError('keys must be str, int, float, bool or '
+                                'None, not {0}'.format(type(key).__name__))
+            for part in (key, item):
+                if part.__class__ is str:
+                    ref = table.get(part)
+                    if ref is None:
+                        table[part] = len(table)
+                        data = part.encode('utf-8')
+                        out.append(_STRING)
+                        if len(data) < 0x80:
+                            out.append(len(data))
+                        else:
+                            write_varint(out, len(data))
+                        out += data
+                    else:
+                        out.append(_REF)
+                        if ref < 0x80:
+                            out.append(ref)
+                        else:
+                            write_varint(out, ref)
+                elif part is None:
+                    out.append(_NULL)
+                else:
+                    write(part)
+
+
+def encode_document(document, registry=None):
+    """
+    Encode document of message
+
+    :param document: (dict) document
+    :param registry: (ConverterRegistry) converters of objects that \
+    aren't supported, None means default registry
+    :return: (bytes) encoded document
+    """
+    writer = _Writer(registry or converters)
+    writer.write(document)
+    return bytes(writer.out)
+
+
+def encode_header(index, doc_type):
+    """
+    Encode index header without `_id`, it's followed by `encode_id`
+
+    :param index: (str) name of index
+    :param doc_type: (str) type of document
+    :return: (bytes) encoded header
+    """
+    out = bytearray([VERSION])
+    write_string(out, index)
+    write_string(out, doc_type)
+    return bytes(out)
+
+
+def encode_id(doc_id):
+    """
+    Encode `_id` of document
+
+    :param doc_id: (str) id or None
+    :return: (bytes) encoded id
+    """
+    out = bytearray()
+    if doc_id is None:
+        write_varint(out, 0)
+    else:
+        data = doc_id.encode('utf-8')
+        write_varint(out, len(data) + 1)
+        out += data
+    return bytes(out)
+
+
+def make_frame(header, document):
+    """
+    Join encoded header and document into frame
+
+    :param header: (bytes) encoded header with id
+    :param document: (bytes) encoded document
+    :return: (bytes) frame
+    """
+    out = bytearray([MAGIC])
+    write_varint(out, len(header) + len(document))
+    out += header
+    out += document
+    out.append(0x0a)
+    return bytes(out)
+
+
+class _Reader(object):
+
+    __slots__ = ('data', 'offset', 'table')
+
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+        self.table = list(STATIC_STRINGS)
+
+    def byte(self):
+        try:
+            value = self.data[self.offset]
+        except IndexError:
+            raise DecodeError('unexpected end of frame')
+        self.offset += 1
+        return value
+
+    def varint(self):
+        number = shift = 0
+        while True:
+            value = self.byte()
+            number |= (value & 0x7f) << shift
+            if value < 0x80:
+                return number
+            shift += 7
+
+    def raw_string(self, size):
+        end = self.offset + size
+        if end > len(self.data):
+            raise DecodeError('unexpected end of frame')
+        text = self.data[self.offset:end].decode('utf-8')
+        self.offset = end
+        return text
+
+    def string(self):
+        return self.raw_string(self.varint())
+
+    def value(self):
+        tag = self.byte()
+        if tag == _STRING:
+            text = self.string()
+            self.table.append(text)
+            return text
+        elif tag == _REF:
+            ref = self.varint()
+            if ref >= len(self.table):
+                raise DecodeError('unknown string reference {0}'.format(ref))
+            return self.table[ref]
+        elif tag == _NULL:
+            return None
+        elif tag == _TRUE:
+            return True
+        elif tag == _FALSE:
+            return False
+        elif tag == _INT:
+            number = self.varint()
+            return number >> 1 if not number & 1 else -((number + 1) >> 1)
+        elif tag == _FLOAT:
+            end = self.offset + _double.size
+            if end > len(self.data):
+                raise DecodeError('unexpected end of frame')
+            value = _double.unpack(bytes(self.data[self.offset:end]))[0]
+            self.offset = end
+            return value
+        elif tag == _DICT:
+            result = {}
+            for _ in range(self.varint()):
+                key = self.value()
+                result[key] = self.value()
+            return result
+        elif tag == _LIST:
+            return [self.value() for _ in range(self.varint())]
+        raise DecodeError('unknown tag {0}'.format(tag))
+
+
+def decode_frame(body):
+    """
+    Decode body of one frame
+
+    :param body: (bytes) body without magic byte, length and new line
+    :return: (tuple) index header and document as dicts
+    """
+    reader = _Reader(bytearray(body))
+    version = reader.byte()
+    if version != VERSION:
+        raise DecodeError('unsupported version {0}'.format(version))
+    index = {'_index': reader.string(), '_type': reader.string()}
+    size = reader.varint()
+    if size:
+        index['_id'] = reader.raw_string(size - 1)
+    document = reader.value()
+    if reader.offset != len(reader.data):
+        raise DecodeError('trailing data in frame')
+    return {'index': index}, document
+
+
+def iter_frames(data):
+    """
+    Decode all frames of data, for example content of backup file
+
+    :param data: (bytes) frames one after another
+    :return: (generator) index header and document of every frame
+    """
+    data = bytearray(data)
+    reader = _Reader(data)
+    while reader.offset < len(data):
+        if reader.byte() != MAGIC:
+            raise DecodeError('frame expected at {0}'.format(
+                reader.offset - 1))
+        size = reader.varint()
+        start = reader.offset
+        end = start + size
+        if end + 1 > len(data) or data[end] != 0x0a:
+            raise DecodeError('broken frame at {0}'.format(start))
+        reader.offset = end + 1
+        yield decode_frame(data[start:end])
+
+
+def to_bulk(data):
+    """
+    Convert frames to bulk format made by `JsonFormatter`
+
+    :param data: (bytes) frames one after another
+    :return: (str) index headers and documents in JSON lines
+    """
+    lines = []
+    for header, document in iter_frames(data):
+        lines.append(json.dumps(header))
+        lines.append(json.dumps(document))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """
+    Print frames of files in bulk format
+
+    :param argv: (list) paths of files, '-' or none means standard input
+    """
+    paths = (sys.argv[1:] if argv is None else argv) or ['-']
+    for path in paths:
+        if path == '-':
+            data = getattr(sys.stdin, 'buffer', sys.stdin).read()
+        else:
+            with open(path, 'rb') as in_file:
+                data = in_file.read()
+        sys.stdout.write(to_bulk(data))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,111 @@
+import zlib
+
+GZIP = 'gzip'
+ZLIB = 'zlib'
+
+_WBITS = {
+    GZIP: 16 + zlib.MAX_WBITS,
+    ZLIB: zlib.MAX_WBITS,
+}
+# decompressor detects gzip or zlib header automatically
+_AUTO_WBITS = 32 + zlib.MAX_WBITS
+
+
+class Compressor(object):
+    """
+    Compressor makes one compressed frame from every batch of messages,
+    frame is complete gzip member or zlib stream, so every datagram or
+    request can be decompressed alone by standard tools.
+
+    >>> compressor = Compressor(GZIP, level=6)
+    >>> frame = compressor.compress([msg1, msg2])
+    >>> decompress(frame)
+    """
+
+    def __init__(self, method=GZIP, level=6):
+        """
+        :param method: (str) 'gzip' or 'zlib'
+        :param level: (int) compression level from 1 (fastest) to 9 (best)
+        """
+        if method not in _WBITS:
+            raise ValueError('unknown compression method: {0!r}'.format(
+                method))
+        self.method = method
+        self.level = level
+        self._wbits = _WBITS[method]
+        # expected ratio of raw to compressed size, it's updated after
+        # every frame and used to choose how much data fits in datagram
+        self.ratio = 4.0
+
+    def compress(self, messages):
+        """
+        Compress list of messages into one frame
+
+        :param messages: (list) messages as bytes or str
+        :return: (bytes) compressed frame
+        """
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self._wbits)
+        chunks = []
+        for msg in messages:
+            if not isinstance(msg, bytes):
+                msg = msg.encode('utf-8')
+            chunks.append(compressor.compress(msg))
+        chunks.append(compressor.flush())
+        return b''.join(chunks)
+
+    def pack(self, messages, limit):
+        """
+        Split messages into compressed frames not bigger than limit,
+        messages that can't fit into limit even after compression are
+        dropped
+
+        :param messages: (list) messages as bytes or str
+        :param limit: (int) maximum size of frame in bytes
+        :return: (tuple) list of frames and number of dropped messages
+        """
+        budget = int(limit * self.ratio)
+        groups = []
+        group, group_size = [], 0
+        for msg in messages:
+            if not isinstance(msg, bytes):
+                msg = msg.encode('utf-8')
+            if group and group_size + len(msg) > budget:
+                groups.append(group)
+                group, group_size = [], 0
+            group.append(msg)
+            group_size += len(msg)
+        if group:
+            groups.append(group)
+
+        frames = []
+        dropped = 0
+        raw_size = compressed_size = 0
+        groups.reverse()
+        while groups:
+            group = groups.pop()
+            frame = self.compress(group)
+            if len(frame) <= limit:
+                frames.append(frame)
+                raw_size += sum(len(msg) for msg in group)
+                compressed_size += len(frame)
+            elif len(group) == 1:
+                dropped += 1
+            else:
+                half = len(group) // 2
+                groups.append(group[half:])
+                groups.append(group[:half])
+        if compressed_size:
+            # keep some margin, too big group costs one more compression
+            self.ratio = max(raw_size / float(compressed_size) * 0.9, 1.0)
+        return frames, dropped
+
+
+def decompress(frame):
+    """
+    Decompress frame made by `Compressor`, gzip and zlib are detected
+    automatically
+
+    :param frame: (bytes) compressed frame
+    :return: (bytes) original data
+    """
+    return zlib.decompress(frame, _AUTO_WBITS)
@@ -0,0 +1,299 @@
+"""
+Context of values bound to logs by `StructuredLogger.bind` and
+`StructuredLogger.bound`.
+
+Context is kept in `contextvars.ContextVar`, so every thread and every
+asyncio task sees its own bindings. Value of context is immutable chain
+of `Scope` objects, every scope keeps only values bound by it and
+reference to its parent, so nested scopes share structure and starting
+task takes context by reference. Merged values of scope are computed
+once, when the first record is logged in it, and are reused by next
+records. Without `contextvars` (python < 3.7) context is local for
+thread.
+
+New threads start with empty context, values that have to be added to
+records of every thread and task, like name of service or host, are
+bound to process-wide base layer that all contexts fall back to:
+
+>>> log.bind_global(service='billing', host=socket.gethostname())
+
+>>> with log.bound(request_id=request.id):
+>>>     log.info('request started')
+>>>
+>>> @log.bound(job='cleanup')
+>>> def cleanup():
+>>>     log.info('cleaning')
+"""
+import functools
+import inspect
+import sys
+import threading
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None
+
+# number of chained scopes made by `bind` after which they are merged
+# into one, it keeps chain short when `bind` is called in loop
+MAX_DEPTH = 8
+
+
+class Scope(object):
+    """
+    Immutable node of context, values of scope override values of parent
+    """
+
+    __slots__ = ('parent', 'values', 'depth', '_merged', '_over_base')
+
+    def __init__(self, values, parent=None):
+        """
+        :param values: (dict) values bound by this scope, dict is taken by \
+        reference and mustn't be changed later
+        :param parent: (Scope) parent scope
+        """
+        self.parent = parent
+        self.values = values
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self._merged = None if parent is not None else values
+        self._over_base = (None, None)
+
+    def merged(self):
+        """
+        Return values of scope and all its parents, they are computed once
+
+        :return: (dict) merged values, it mustn't be changed
+        """
+        merged = self._merged
+        if merged is None:
+            # scopes without merged values are merged from the nearest
+            # merged parent, without recursion
+            chain = []
+            scope = self
+            while scope._merged is None:
+                chain.append(scope)
+                scope = scope.parent
+            merged = scope._merged
+            for scope in reversed(chain):
+                merged = merged.copy()
+                merged.update(scope.values)
+                scope._merged = merged
+        return merged
+
+    def merged_over(self, base):
+        """
+        Return values of scope over values of base layer, they are
+        computed once for every base layer
+
+        :param base: (Scope) process-wide base layer
+        :return: (dict) merged values, it mustn't be changed
+        """
+        # base and values merged with it are kept in one tuple, so other
+        # thread never sees values merged with other base
+        cached, merged = self._over_base
+        if cached is not base:
+            merged = base.values.copy()
+            merged.update(self.merged())
+            self._over_base = (base, merged)
+        return merged
+
+    def child(self, values):
+        """
+        Make scope nested in this one
+
+        :param values: (dict) values bound by new scope
+        :return: (Scope) new scope
+        """
+        return Scope(values, self)
+
+
+EMPTY = Scope({})
+
+# process-wide values, replaced by new scope when they are changed
+_base = EMPTY
+_base_lock = threading.Lock()
+
+if contextvars is not None:
+    _current = contextvars.ContextVar('pysllo_context', default=EMPTY)
+    get_scope = _current.get
+    _push = _current.set
+    _pop = _current.reset
+    # tokens of entered `bound` blocks, kept as immutable linked list, so
+    # every thread and task has its own stack even if block is shared
+    _entered = contextvars.ContextVar('pysllo_entered', default=None)
+
+    def _enter(scope):
+        _entered.set((_push(scope), _entered.get()))
+
+    def _exit():
+        token, parent = _entered.get()
+        _entered.set(parent)
+        _pop(token)
+else:  # pragma: no cover
+    _local = threading.local()
+
+    def get_scope():
+        return getattr(_local, 'scope', EMPTY)
+
+    def _push(scope):
+        previous = get_scope()
+        _local.scope = scope
+        return previous
+
+    def _pop(previous):
+        _local.scope = previous
+
+    def _enter(scope):
+        _local.entered = (_push(scope), getattr(_local, 'entered', None))
+
+    def _exit():
+        token, _local.entered = _local.entered
+        _pop(token)
+
+
+def set_scope(scope):
+    """
+    Replace scope of current thread or task
+
+    :param scope: (Scope) new scope
+    """
+    _push(scope)
+
+
+def get_context():
+    """
+    Return values bound in current thread or task, returned dict mustn't
+    be changed
+
+    :return: (dict) bound values
+    """
+    scope = get_scope()
+    base = _base
+    if base is EMPTY:
+        return scope.merged()
+    if scope is EMPTY:
+        return base.values
+    return scope.merged_over(base)
+
+
+def call_in_scope(scope, func, *args, **kwargs):
+    """
+    Call function with scope of current thread or task replaced by given
+    one, for example to emit log made earlier with values bound then
+
+    :param scope: (Scope) scope taken by `get_scope`
+    :param func: (callable) function to call
+    :return: result of function
+    """
+    token = _push(scope)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _pop(token)
+
+
+def bind(**kwargs):
+    """
+    Bind values in current thread or task
+
+    :param kwargs: (dict) named values to bind
+    """
+    scope = get_scope()
+    if scope.depth >= MAX_DEPTH:
+        scope = Scope(scope.merged())
+    set_scope(scope.child(kwargs))
+
+
+def unbind(*names):
+    """
+    Remove values from context of current thread or task, all values are
+    removed if no name is given
+
+    :param names: (list) names of values to remove
+    """
+    if not names:
+        set_scope(EMPTY)
+        return
+    values = get_scope().merged().copy()
+    for name in names:
+        values.pop(name)
+    set_scope(Scope(values))
+
+
+def bind_global(**kwargs):
+    """
+    Bind values in base layer of all threads and tasks, values bound in
+    thread or task override them
+
+    :param kwargs: (dict) named values to bind
+    """
+    global _base
+    with _base_lock:
+        values = _base.values.copy()
+        values.update(kwargs)
+        _base = Scope(values)
+
+
+def unbind_global(*names):
+    """
+    Remove values from base layer, all values are removed if no name is
+    given
+
+    :param names: (list) names of values to remove
+    """
+    global _base
+    with _base_lock:
+        if not names:
+            _base = EMPTY
+            return
+        values = _base.values.copy()
+        for name in names:
+            values.pop(name)
+        _base = Scope(values)
+
+
+if sys.version_info >= (3, 5):
+    from pysllo.utils.async_context import bound_coroutine
+else:  # pragma: no cover
+    bound_coroutine = None
+
+
+class bound(object):
+    """
+    Bind values only inside of `with` block or decorated function, on exit
+    previous context is restored in O(1). Block has to be exited in the
+    same thread or task that entered it, one object can be entered by
+    many threads and tasks at once. Decorated coroutine function binds
+    values while its coroutine runs.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        :param kwargs: (dict) named values to bind
+        """
+        self._values = kwargs
+
+    def __enter__(self):
+        _enter(get_scope().child(self._values))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _exit()
+
+    def __call__(self, func):
+        values = self._values
+        if bound_coroutine is not None and \
+                inspect.iscoroutinefunction(func):
+            # calling coroutine function only makes coroutine, scope has
+            # to be entered when it runs
+            return bound_coroutine(
+                func, lambda: _push(get_scope().child(values)), _pop)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _push(get_scope().child(values))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _pop(token)
+        return wrapper
@@ -0,0 +1,140 @@
+"""
+Strategies of making `_id` of documents sent to ElasticSearch.
+
+Every strategy is callable that gets encoded document and returns its id
+or None when cluster should assign id itself:
+
+- 'uuid1' - `uuid.uuid1`, it's default but the slowest one and it takes
+  lock inside `uuid` module
+- 'none' - no id, cluster assigns it, it's the cheapest one
+- 'counter' - process prefix and counter, unique in process and very cheap
+- 'random' - random 128 bit number in hex
+- 'content' - hash of document, the same record always gets the same id,
+  so shipping it again from backup doesn't make duplicates
+"""
+import hashlib
+import itertools
+import os
+import random
+import uuid
+
+UUID1 = 'uuid1'
+NONE = 'none'
+COUNTER = 'counter'
+RANDOM = 'random'
+CONTENT = 'content'
+
+
+class IdStrategy(object):
+    """
+    Base class of id strategies
+    """
+
+    name = None
+    # strategies that use content get encoded document
+    uses_content = False
+
+    def __call__(self, body):
+        """
+        Make id of document
+
+        :param body: (str) encoded document, only if `uses_content` is set
+        :return: (str) id or None
+        """
+        raise NotImplementedError
+
+
+class Uuid1Id(IdStrategy):
+
+    name = UUID1
+
+    def __call__(self, body=None):
+        return str(uuid.uuid1())
+
+
+class NoId(IdStrategy):
+
+    name = NONE
+
+    def __call__(self, body=None):
+        return None
+
+
+class CounterId(IdStrategy):
+    """
+    Id made of random prefix of process and counter, prefix is changed in
+    child process after fork
+    """
+
+    name = COUNTER
+
+    def __init__(self):
+        self._pid = None
+        self._prefix = None
+        self._counter = None
+
+    def _reset(self, pid):
+        self._prefix = '{0:x}{1:016x}-'.format(pid, random.getrandbits(64))
+        self._counter = itertools.count()
+        self._pid = pid
+
+    def __call__(self, body=None):
+        pid = os.getpid()
+        if pid != self._pid:
+            self._reset(pid)
+        # next on itertools.count is atomic, so ids are unique in threads
+        return '{0}{1:x}'.format(self._prefix, next(self._counter))
+
+
+class RandomId(IdStrategy):
+    """
+    Random 128 bit id, random module is reseeded after fork, so processes
+    don't repeat ids
+    """
+
+    name = RANDOM
+
+    def __call__(self, body=None):
+        return '{0:032x}'.format(random.getrandbits(128))
+
+
+class ContentId(IdStrategy):
+    """
+    Id made from hash of encoded document
+    """
+
+    name = CONTENT
+    uses_content = True
+
+    def __call__(self, body):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        return _hash(body).hexdigest()
+
+
+if hasattr(hashlib, 'blake2b'):
+    def _hash(data):
+        return hashlib.blake2b(data, digest_size=16)
+else:  # pragma: no cover
+    def _hash(data):
+        return hashlib.sha1(data)
+
+
+STRATEGIES = dict((strategy.name, strategy) for strategy in (
+    Uuid1Id, NoId, CounterId, RandomId, ContentId))
+
+
+def get_id_strategy(strategy=None):
+    """
+    Create id strategy by name
+
+    :param strategy: (IdStrategy or str) strategy or its name: 'uuid1', \
+    'none', 'counter', 'random' or 'content', None means 'uuid1'
+    :return: (IdStrategy) strategy
+    """
+    if isinstance(strategy, IdStrategy):
+        return strategy
+    try:
+        return STRATEGIES[strategy or UUID1]()
+    except KeyError:
+        raise ValueError('unknown id strategy: {0!r}'.format(strategy))
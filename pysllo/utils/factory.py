@@ -38,13 +38,15 @@ class LoggersFactory(object):
         if sys.version.startswith('2.6'):  # pragma: no cover
             setattr(Logger.__bases__[0], '__mro__', object)
 
+        # tracking logger is the first one, it decides about level of log
+        # before structured logger converts its parameters
         cls_list = []
-        if structured_logger:
-            from ..loggers import StructuredLogger
-            cls_list.append(StructuredLogger)
         if tracking_logger:
             from ..loggers import TrackingLogger
             cls_list.append(TrackingLogger)
+        if structured_logger:
+            from ..loggers import StructuredLogger
+            cls_list.append(StructuredLogger)
         if propagation_logger:
             from ..loggers import TrackingLogger
             if TrackingLogger not in cls_list:
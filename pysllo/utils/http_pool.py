@@ -0,0 +1,107 @@
+import socket
+import threading
+
+try:
+    import http.client as httplib
+except ImportError:  # pragma: no cover
+    import httplib
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+
+class HTTPConnectionPool(object):
+    """
+    HTTPConnectionPool keeps bounded number of keep-alive HTTP connections
+    to list of hosts. New connections are opened to hosts in round robin
+    order and returned to pool after every request, so next requests
+    don't pay for TCP handshake.
+
+    >>> pool = HTTPConnectionPool([('localhost', 9200)], maxsize=4)
+    >>> status, body = pool.request('POST', '/_bulk', data, headers)
+    """
+
+    def __init__(self, hosts, maxsize=4, timeout=10):
+        """
+        :param hosts: (list) list of tuples with server address and port
+        :param maxsize: (int) maximum number of open connections
+        :param timeout: (float) socket timeout in seconds
+        """
+        self._hosts = hosts
+        self._current = -1
+        self._timeout = timeout
+        self._maxsize = maxsize
+        self._idle = queue.LifoQueue()
+        self._slots = threading.Semaphore(maxsize)
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        with self._lock:
+            self._current = (self._current + 1) % len(self._hosts)
+            host, port = self._hosts[self._current]
+        return httplib.HTTPConnection(host, port, timeout=self._timeout)
+
+    def _get(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _put(self, connection):
+        if connection is not None:
+            self._idle.put(connection)
+        self._slots.release()
+
+    def request(self, method, url, body=None, headers=None):
+        """
+        Make request using connection from pool, waits if all connections
+        are busy. Request on reused connection is repeated once on new
+        connection if server closed it in meantime.
+
+        :param method: (str) HTTP method
+        :param url: (str) request path
+        :param body: (bytes) request body
+        :param headers: (dict) request headers
+        :return: (tuple) response status and body
+        """
+        connection, reused = self._get()
+        try:
+            while True:
+                try:
+                    connection.request(method, url, body, headers or {})
+                    response = connection.getresponse()
+                    data = response.read()
+                except (httplib.HTTPException, socket.error):
+                    connection.close()
+                    if not reused:
+                        connection = None
+                        raise
+                    connection, reused = self._new_connection(), False
+                    continue
+                if response.getheader('connection', '').lower() == 'close':
+                    connection.close()
+                return response.status, data
+        finally:
+            self._put(connection)
+
+    def reset(self):
+        """
+        Drop connections and slots inherited from parent process, it's used
+        in child process after fork
+        """
+        self.close()
+        self._slots = threading.Semaphore(self._maxsize)
+        self._lock = threading.Lock()
+
+    def close(self):
+        """
+        Close all idle connections
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -1,12 +1,325 @@
+"""
+JSON encoders used by `pysllo.formatters.JsonFormatter`.
+
+Encoding is done by one of backends, every backend makes byte-identical
+output: the same separators, escaping of non ASCII characters, float
+representation and the same conversion of objects that aren't supported
+by JSON.
+
+Objects are converted by `ConverterRegistry` that finds converter by type
+of object once and keeps it in cache. Dates, `Decimal`, `UUID`, `Enum`,
+sets, bytes, dataclasses and objects with `__json__` method are supported
+by default, other objects are replaced by their `repr`, so one strange
+value doesn't make whole document lost:
+
+>>> backend = get_backend()            # fastest available
+>>> backend = get_backend('simplejson')
+>>> backend.encode({'date': datetime.date.today()})
+>>> register_converter(Money, lambda money: money.amount)
+
+Libraries like `orjson` or `ujson` aren't supported, they use other
+separators and escaping, so their output can't be the same.
+"""
 import datetime
+import decimal
 import json
+import threading
+import uuid
+import warnings
+
+from pysllo.utils.lazy import Lazy
+
+try:
+    import simplejson
+except ImportError:  # pragma: no cover
+    simplejson = None
+
+try:
+    import enum
+except ImportError:  # pragma: no cover
+    enum = None
+
+try:
+    import dataclasses
+except ImportError:  # pragma: no cover
+    dataclasses = None
+
+
+def _to_str(obj):
+    return str(obj)  # str because of python3.x
+
+
+def _to_list(obj):
+    return list(obj)
+
+
+def _decode_bytes(obj):
+    return obj.decode('utf-8', 'replace')
+
+
+def _enum_value(obj):
+    return obj.value
+
+
+def _call_json(obj):
+    return obj.__json__()
+
+
+def _dataclass_fields(obj):
+    # nested values are converted by encoder, so asdict deep copy isn't
+    # needed
+    return dict((field.name, getattr(obj, field.name))
+                for field in dataclasses.fields(obj))
+
+
+def unserializable(obj):
+    """
+    Fallback converter of objects that have no converter, it makes their
+    `repr`
+
+    :param obj: (object) object to convert
+    :return: (str) representation of object
+    """
+    try:
+        return repr(obj)
+    except Exception:
+        return '<unserializable {0}>'.format(type(obj).__name__)
+
+
+class ConverterRegistry(object):
+    """
+    ConverterRegistry converts objects that aren't supported by JSON, it's
+    used as `default` hook of encoders.
+
+    Converter of type is found once: first `__json__` method of object,
+    then converter registered for type or one of its base classes, then
+    dataclass fields; types without converter use `fallback`. Result is
+    kept in cache, so next objects of the same type cost one dict lookup.
+    Converter may return object that isn't supported by JSON too, it's
+    converted again.
+    """
+
+    def __init__(self, fallback=unserializable):
+        """
+        :param fallback: (callable) converter of objects without \
+        converter, it may raise `TypeError` to reject whole document
+        """
+        self._converters = {}
+        self._cache = {}
+        self._fallback = fallback
+        self._lock = threading.Lock()
+
+    def register(self, cls, converter):
+        """
+        Register converter of type, it's used also for subclasses
+
+        :param cls: (type) type of objects
+        :param converter: (callable) function that gets object and \
+        returns value supported by JSON
+        """
+        with self._lock:
+            self._converters[cls] = converter
+            self._cache = {}
+
+    def lookup(self, cls):
+        """
+        Find converter of type
+
+        :param cls: (type) type of object
+        :return: (callable) converter
+        """
+        converter = self._cache.get(cls)
+        if converter is None:
+            converter = self._resolve(cls)
+            self._cache[cls] = converter
+        return converter
+
+    def _resolve(self, cls):
+        if callable(getattr(cls, '__json__', None)):
+            return _call_json
+        for base in cls.__mro__:
+            if base in self._converters:
+                return self._converters[base]
+        if dataclasses is not None and dataclasses.is_dataclass(cls):
+            return _dataclass_fields
+        warnings.warn('no JSON converter for {0}, fallback is used'.format(
+            cls.__name__))
+        return self._fallback
+
+    def __getstate__(self):
+        # registry is pickled with formatter sent to process pool
+        return {'converters': self._converters, 'fallback': self._fallback}
+
+    def __setstate__(self, state):
+        self.__init__(state['fallback'])
+        self._converters.update(state['converters'])
+
+    def __call__(self, obj):
+        converter = self._cache.get(obj.__class__)
+        if converter is None:
+            converter = self.lookup(obj.__class__)
+        return converter(obj)
+
+
+converters = ConverterRegistry()
+converters.register(datetime.date, _to_str)
+converters.register(decimal.Decimal, _to_str)
+converters.register(uuid.UUID, _to_str)
+converters.register(set, _to_list)
+converters.register(frozenset, _to_list)
+converters.register(bytes, _decode_bytes)
+# lazy values nested in other values are computed during encoding
+converters.register(Lazy, Lazy.resolve)
+if enum is not None:
+    converters.register(enum.Enum, _enum_value)
+
+
+def register_converter(cls, converter):
+    """
+    Register converter in default registry
+
+    :param cls: (type) type of objects
+    :param converter: (callable) function that gets object and returns \
+    value supported by JSON
+    """
+    converters.register(cls, converter)
+
+
+def default(obj):
+    """
+    Fallback for objects that aren't supported by JSON, they are converted
+    by default registry
+
+    :param obj: (object) object to convert
+    :return: converted object
+    """
+    return converters(obj)
 
 
 class LoggingJSONEncoder(json.JSONEncoder):
-    """ encoder that supports datetime and time builtin types
+    """ encoder that supports types of default converters registry
     """
 
     def default(self, obj):
-        if isinstance(obj, (datetime.datetime, datetime.date)):
-            return str(obj)  # str because of python3.x
-        return super(LoggingJSONEncoder, self).default(obj)
+        return converters(obj)
+
+
+class JsonBackend(object):
+    """
+    Base class of JSON backends, subclasses set `encode` method
+    """
+
+    name = None
+
+    @staticmethod
+    def is_available():
+        """
+        Check that library of backend can be used
+
+        :return: (bool)
+        """
+        return True
+
+    @staticmethod
+    def is_accelerated():
+        """
+        Check that backend encodes in C
+
+        :return: (bool)
+        """
+        return False
+
+    def encode(self, obj):
+        """
+        Encode object to JSON
+
+        :param obj: (object) object to encode
+        :return: (str) JSON document
+        """
+        raise NotImplementedError
+
+
+class StdlibBackend(JsonBackend):
+    """
+    Backend that uses standard `json` module, its C encoder calls `default`
+    hook only for objects that aren't supported by JSON
+    """
+
+    name = 'json'
+
+    def __init__(self, registry=None):
+        """
+        :param registry: (ConverterRegistry) converters of objects, None \
+        means default registry
+        """
+        self.encode = json.JSONEncoder(
+            default=registry or converters).encode
+
+    @staticmethod
+    def is_accelerated():
+        return getattr(json.encoder, 'c_make_encoder', None) is not None
+
+
+class SimplejsonBackend(JsonBackend):
+    """
+    Backend that uses `simplejson` library, its extensions that make other
+    output than standard `json` module are disabled
+    """
+
+    name = 'simplejson'
+
+    def __init__(self, registry=None):
+        """
+        :param registry: (ConverterRegistry) converters of objects, None \
+        means default registry
+        """
+        if simplejson is None:
+            raise ImportError('simplejson is not installed')
+        self.encode = simplejson.JSONEncoder(
+            default=registry or converters, allow_nan=True, encoding=None,
+            use_decimal=False, namedtuple_as_object=False,
+            tuple_as_array=True, iterable_as_array=False,
+            bigint_as_string=False, for_json=False, ignore_nan=False).encode
+
+    @staticmethod
+    def is_available():
+        return simplejson is not None
+
+    @staticmethod
+    def is_accelerated():
+        return simplejson is not None and \
+            simplejson.encoder.c_make_encoder is not None
+
+
+# order of preference when backend is selected automatically
+BACKENDS = [StdlibBackend, SimplejsonBackend]
+
+
+def available_backends():
+    """
+    List names of backends which libraries are installed
+
+    :return: (list) names of backends
+    """
+    return [backend.name for backend in BACKENDS if backend.is_available()]
+
+
+def get_backend(name=None, registry=None):
+    """
+    Create backend by name, by default the first accelerated backend is
+    chosen and standard `json` module is used if there is no one
+
+    :param name: (str) 'json' or 'simplejson', None means automatic choice
+    :param registry: (ConverterRegistry) converters of objects, None \
+    means default registry
+    :return: (JsonBackend) backend
+    """
+    if name is None:
+        for backend in BACKENDS:
+            if backend.is_available() and backend.is_accelerated():
+                return backend(registry)
+        return StdlibBackend(registry)
+    for backend in BACKENDS:
+        if backend.name == name:
+            return backend(registry)
+    raise ValueError('unknown JSON backend: {0!r}'.format(name))
@@ -0,0 +1,84 @@
+"""
+Values computed only when record is really formatted.
+
+Value that is costly to compute, like memory usage or serialized body of
+request, can be bound or passed to log call wrapped by `Lazy`, function is
+called only if record passes level check and is formatted by
+`JsonFormatter`, once per record:
+
+>>> log.bind(memory=Lazy(memory_usage))
+>>> log.debug('Request', body=Lazy(lambda: json.dumps(request.body)))
+
+With `memoize` function is called once and value is reused by every
+record, for example for value bound only in scope of one request:
+
+>>> with log.bound(span=Lazy(db.span_id, memoize=True)):
+>>>     handle(request)
+"""
+import threading
+
+
+class Lazy(object):
+    """
+    Wrapper of function that computes value of field
+    """
+
+    __slots__ = ('func', 'memoize', '_value', '_lock')
+
+    _MISSING = object()
+
+    def __init__(self, func, memoize=False):
+        """
+        :param func: (callable) function without arguments that returns \
+        value of field
+        :param memoize: (bool) compute value once and reuse it
+        """
+        self.func = func
+        self.memoize = memoize
+        self._value = self._MISSING
+        self._lock = threading.Lock() if memoize else None
+
+    def resolve(self):
+        """
+        Compute value, exception raised by function is replaced by its
+        description, so logging never fails because of it
+
+        :return: computed value
+        """
+        if not self.memoize:
+            return self._compute()
+        value = self._value
+        if value is self._MISSING:
+            with self._lock:
+                value = self._value
+                if value is self._MISSING:
+                    value = self._value = self._compute()
+        return value
+
+    def _compute(self):
+        try:
+            return self.func()
+        except Exception as e:
+            return '<lazy value failed: {0!r}>'.format(e)
+
+    def __str__(self):
+        # standard formatters use %(name)s of record attributes
+        return str(self.resolve())
+
+    def __repr__(self):
+        return 'Lazy({0!r}, memoize={1})'.format(self.func, self.memoize)
+
+
+def resolve_values(data):
+    """
+    Replace lazy values of dict by computed ones
+
+    :param data: (dict) values, it's changed in place
+    :return: (dict) the same dict
+    """
+    # it's called for every record, class is compared instead of slower
+    # isinstance, subclasses are computed by converters during encoding
+    for key, value in data.items():
+        if value.__class__ is Lazy:
+            data[key] = value.resolve()
+    return data
@@ -0,0 +1,165 @@
+import array
+import ctypes
+import errno
+import os
+import socket
+import struct
+import sys
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+def _load_sendmmsg():
+    if not sys.platform.startswith('linux'):  # pragma: no cover
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        func = libc.sendmmsg
+    except (OSError, AttributeError):  # pragma: no cover
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                     ctypes.c_uint, ctypes.c_int]
+    func.restype = ctypes.c_int
+    return func
+
+
+_sendmmsg = _load_sendmmsg()
+_POINTER_CODE = 'L' if ctypes.sizeof(ctypes.c_ulong) == \
+    ctypes.sizeof(ctypes.c_void_p) else 'Q'
+
+
+def is_available():
+    """
+    Check if `sendmmsg` system call can be used on this platform
+
+    :return: (bool)
+    """
+    return _sendmmsg is not None
+
+
+class BatchSender(object):
+    """
+    BatchSender sends many datagrams with one `sendmmsg` system call,
+    datagrams are slices of one buffer so data are not copied.
+
+    It's available only on Linux, use `is_available` to check it.
+
+    >>> sender = BatchSender()
+    >>> sender.send(sock, arena, [(0, 100), (100, 180)], ('localhost', 9000))
+    """
+
+    def __init__(self, max_batch=1024):
+        """
+        :param max_batch: (int) maximum number of datagrams in one call, \
+        Linux doesn't accept more than 1024
+        """
+        self._max_batch = max_batch
+        self._addresses = {}
+        self._capacity = 0
+        self._iovecs = None
+        self._headers = None
+        self._address = None
+
+    def _sockaddr(self, address):
+        try:
+            return self._addresses[address]
+        except KeyError:
+            host, port = address
+            ip = socket.getaddrinfo(host, port, socket.AF_INET,
+                                    socket.SOCK_DGRAM)[0][4][0]
+            raw = (struct.pack('=H', socket.AF_INET) +
+                   struct.pack('!H', port) +
+                   socket.inet_aton(ip) + b'\0' * 8)
+            sockaddr = ctypes.create_string_buffer(raw, len(raw))
+            self._addresses[address] = sockaddr
+            return sockaddr
+
+    def _reserve(self, count):
+        if count > self._capacity:
+            self._capacity = count
+            self._iovecs = (_IOVec * count)()
+            self._headers = (_MMsgHdr * count)()
+            for iovec, header in zip(self._iovecs, self._headers):
+                header.msg_hdr.msg_iov = ctypes.pointer(iovec)
+                header.msg_hdr.msg_iovlen = 1
+            self._address = None
+
+    def _set_address(self, address):
+        if address == self._address:
+            return
+        sockaddr = self._sockaddr(address)
+        name = ctypes.addressof(sockaddr)
+        for header in self._headers:
+            header.msg_hdr.msg_name = name
+            header.msg_hdr.msg_namelen = len(sockaddr)
+        self._address = address
+
+    def send(self, sock, arena, bounds, address):
+        """
+        Send datagrams given as bounds in arena to address
+
+        :param sock: (socket) UDP socket of AF_INET family
+        :param arena: (bytearray) buffer with data of all datagrams
+        :param bounds: (list) list of (start, end) tuples of datagrams
+        :param address: (tuple) host and port
+        :return: (int) number of sent datagrams
+        """
+        count = len(bounds)
+        if not count:
+            return 0
+        self._reserve(count)
+        self._set_address(address)
+        buf = (ctypes.c_char * len(arena)).from_buffer(arena)
+        try:
+            base = ctypes.addressof(buf)
+            # iovec is pair of pointer and size, both have size of pointer
+            flat = array.array(_POINTER_CODE)
+            for start, end in bounds:
+                flat.append(base + start)
+                flat.append(end - start)
+            ctypes.memmove(self._iovecs, flat.buffer_info()[0],
+                           len(flat) * flat.itemsize)
+            return self._send_all(sock.fileno(), self._headers, count)
+        finally:
+            del buf
+
+    def _send_all(self, fd, headers, count):
+        sent = 0
+        size = ctypes.sizeof(_MMsgHdr)
+        address = ctypes.addressof(headers)
+        while sent < count:
+            batch = min(count - sent, self._max_batch)
+            first = ctypes.cast(address + sent * size,
+                                ctypes.POINTER(_MMsgHdr))
+            result = _sendmmsg(fd, first, batch, 0)
+            if result < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:  # pragma: no cover
+                    continue
+                raise socket.error(err, os.strerror(err))
+            sent += result
+        return sent
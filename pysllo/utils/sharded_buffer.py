@@ -0,0 +1,75 @@
+import itertools
+import threading
+
+
+class _Shard(object):
+    __slots__ = ('lock', 'items', 'size')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = []
+        self.size = 0
+
+
+class ShardedBuffer(object):
+    """
+    ShardedBuffer is thread safe list of messages split into few shards,
+    every thread appends only to its own shard so threads that log in the
+    same time don't wait for each other. All shards are merged when buffer
+    is drained.
+
+    >>> buffer = ShardedBuffer(shards=4)
+    >>> buffer.append(msg, len(msg))
+    >>> messages = buffer.drain()
+    """
+
+    def __init__(self, shards=8):
+        """
+        :param shards: (int) number of independent append buffers
+        """
+        self._shards = [_Shard() for _ in range(max(int(shards), 1))]
+        self._counter = itertools.count()
+        self._local = threading.local()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._shards[next(self._counter) % len(self._shards)]
+            self._local.shard = shard
+            return shard
+
+    @property
+    def size(self):
+        """
+        Sum of sizes of all buffered messages
+        """
+        return sum(shard.size for shard in self._shards)
+
+    def __len__(self):
+        return sum(len(shard.items) for shard in self._shards)
+
+    def append(self, msg, size):
+        """
+        Add message to shard of current thread
+
+        :param msg: (object) message to buffer
+        :param size: (int) size of message used to count buffer size
+        """
+        shard = self._shard()
+        with shard.lock:
+            shard.items.append(msg)
+            shard.size += size
+
+    def drain(self):
+        """
+        Remove all messages from buffer and return them as one list
+
+        :return: (list) buffered messages
+        """
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                items, shard.items, shard.size = shard.items, [], 0
+            result.extend(items)
+        return result
@@ -0,0 +1,165 @@
+import collections
+import random
+import socket
+import time
+
+from pysllo.utils.balancing import make_balancer
+
+
+class StreamBuffer(object):
+    """
+    StreamBuffer sends messages over long-lived TCP or Unix domain socket
+    connection, every message is ended by new line as it's expected by
+    Logstash `tcp` input with `json_lines` codec.
+
+    Connections are given as tuples with address and port for TCP or as
+    paths of Unix sockets, connection is chosen by balancer. If connection
+    fails, it's reported to balancer and next available connection is tried
+    at once, when there is no available one, messages wait in bounded retry
+    queue and reconnecting is tried with exponential backoff. When retry
+    queue is full the oldest messages are dropped, number of them is stored
+    in `dropped` attribute.
+
+    Every message gets sequence number, `queued` is number of all queued
+    messages and messages with numbers below `lost_before` that weren't
+    sent were dropped, so sender can tell which batches never came
+    through.
+
+    >>> tcp = StreamBuffer([('localhost', 5000)])
+    >>> unix = StreamBuffer(['/var/run/logstash.sock'])
+    >>> tcp.send(messages)
+    """
+
+    def __init__(self, connections, retry_limit=10000, timeout=5,
+                 backoff=0.1, max_backoff=30, balancer=None):
+        """
+        :param connections: (list) list of (host, port) tuples or paths
+        :param retry_limit: (int) maximum number of messages waiting for \
+        connection
+        :param timeout: (float) socket timeout in seconds
+        :param backoff: (float) delay in seconds before first reconnect
+        :param max_backoff: (float) maximum delay between reconnects
+        :param balancer: (Balancer or str) balancer or name of balancing \
+        strategy, None means round robin
+        """
+        self._balancer = make_balancer(connections, balancer)
+        self._endpoint = None
+        self._timeout = timeout
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._failures = 0
+        self._next_attempt = 0
+        self._socket = None
+        self._pending = collections.deque()
+        self._retry_limit = retry_limit
+        self.dropped = 0
+        self.queued = 0
+        self.lost_before = 0
+
+    def _connect(self):
+        self._endpoint = self._balancer.choose()
+        address = self._endpoint.address
+        if isinstance(address, tuple):
+            sock = socket.create_connection(address, self._timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self._timeout)
+            try:
+                sock.connect(address)
+            except socket.error:
+                sock.close()
+                raise
+        return sock
+
+    def _failed(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        self._balancer.failed(self._endpoint)
+        if self._balancer.available():
+            self._next_attempt = 0
+            return
+        delay = min(self._backoff * 2 ** self._failures, self._max_backoff)
+        # jitter prevents all processes from reconnecting at the same time
+        self._next_attempt = time.time() + delay * random.uniform(0.5, 1)
+        self._failures += 1
+
+    def _queue(self, msg):
+        for data in msg:
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+            if not data.endswith(b'\n'):
+                data += b'\n'
+            self._pending.append(data)
+            self.queued += 1
+        overflow = len(self._pending) - self._retry_limit
+        for _ in range(max(overflow, 0)):
+            self._pending.popleft()
+        if overflow > 0:
+            self.dropped += overflow
+            self.lost_before = self.queued - len(self._pending)
+
+    @property
+    def pending(self):
+        """
+        Number of messages waiting in retry queue
+        """
+        return len(self._pending)
+
+    def send(self, msg, force=False):
+        """
+        Send messages, if connection isn't available they wait in retry
+        queue for next call, empty list only retries waiting messages
+
+        :param msg: (list) messages as str or bytes
+        :param force: (bool) try to connect without waiting for backoff
+        :return: (int) number of messages waiting in retry queue
+        """
+        self._queue(msg)
+        if not self._pending:
+            return 0
+        if force:
+            self._next_attempt = 0
+        for _ in range(len(self._balancer.endpoints)):
+            if self._socket is None and time.time() < self._next_attempt:
+                break
+            try:
+                if self._socket is None:
+                    self._socket = self._connect()
+                self._socket.sendall(b''.join(self._pending))
+            except socket.error:
+                # messages are sent again, some of them can be duplicated
+                self._failed()
+                continue
+            self._balancer.succeeded(self._endpoint)
+            self._pending.clear()
+            self._failures = 0
+            return 0
+        return len(self._pending)
+
+    def reset(self):
+        """
+        Forget connection and messages waiting in retry queue, it's used
+        in child process after fork, so parent's stream isn't mixed
+        """
+        self._pending.clear()
+        self.lost_before = self.queued
+        self.close()
+        self._failures = 0
+        self._next_attempt = 0
+
+    def close(self):
+        """
+        Close connection, messages left in retry queue are dropped
+
+        :return: (int) number of dropped messages
+        """
+        lost = len(self._pending)
+        if lost:
+            self._pending.clear()
+            self.dropped += lost
+            self.lost_before = self.queued
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
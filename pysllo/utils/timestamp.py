@@ -0,0 +1,29 @@
+import math
+import time
+
+# second and formatted date and time of last timestamp, tuple is replaced
+# at once so it's safe to use from many threads
+_last = (None, None)
+
+
+def format_timestamp(created):
+    """
+    Format time of record creation as ISO 8601 UTC timestamp with
+    microseconds, date and time part is cached for current second
+
+    >>> format_timestamp(record.created)
+    '2016-05-10T12:01:02.123456Z'
+
+    :param created: (float) seconds since epoch, like `LogRecord.created`
+    :return: (str) timestamp
+    """
+    global _last
+    second = int(math.floor(created))
+    micro = int(round((created - second) * 1000000))
+    if micro == 1000000:
+        second, micro = second + 1, 0
+    cached_second, prefix = _last
+    if cached_second != second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        _last = (second, prefix)
+    return '%s.%06dZ' % (prefix, micro)
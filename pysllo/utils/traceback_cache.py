@@ -0,0 +1,126 @@
+"""
+Cache of rendered tracebacks.
+
+During error storms many records carry the same exception raised in the
+same place, rendering traceback for every one of them reads source lines
+again and again. `TracebackCache` keys rendered traceback by fingerprint
+of exception class and code locations of traceback, walking traceback is
+much cheaper than formatting it.
+
+Fingerprint is sent in `exc_fingerprint` field, so errors can be grouped
+in ElasticSearch. With `window` full traceback is sent only by the first
+record of fingerprint in window, next ones have only fingerprint:
+
+>>> formatter = JsonFormatter(traceback_cache=TracebackCache(window=60))
+"""
+import collections
+import hashlib
+import threading
+import time
+import traceback
+
+
+def _locations(trace):
+    locations = []
+    while trace is not None:
+        code = trace.tb_frame.f_code
+        locations.append((code.co_filename, trace.tb_lineno, code.co_name))
+        trace = trace.tb_next
+    return tuple(locations)
+
+
+def _class_name(exc_class):
+    name = getattr(exc_class, '__qualname__', None) or \
+        getattr(exc_class, '__name__', repr(exc_class))
+    return '{0}.{1}'.format(getattr(exc_class, '__module__', ''), name)
+
+
+def fingerprint(exc_class, locations):
+    """
+    Make fingerprint of exception, it doesn't depend on message of
+    exception, so the same error with other values gets the same one
+
+    :param exc_class: (type) class of exception
+    :param locations: (tuple) file name, line number and function name \
+    of every frame of traceback
+    :return: (str) hex digest
+    """
+    parts = [_class_name(exc_class)]
+    parts.extend('{0}:{1}:{2}'.format(*location) for location in locations)
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class TracebackCache(object):
+    """
+    Bounded LRU cache of rendered tracebacks
+    """
+
+    def __init__(self, size=256, window=None):
+        """
+        :param size: (int) maximum number of cached tracebacks
+        :param window: (float) number of seconds in which traceback of \
+        fingerprint is sent only once, None means always
+        """
+        self._size = size
+        self._window = window
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, ei):
+        """
+        Convert exception information into fields of document
+
+        :param ei: exception info
+        :return: (dict) `exc_class`, `exc_fingerprint` and `traceback` \
+        if it isn't suppressed by window
+        """
+        exc_class, exc_obj, trace = ei
+        key = (exc_class, _locations(trace))
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                # moved to the end, it's the most recently used now
+                self._entries[key] = entry
+        if entry is None:
+            entry = [fingerprint(*key), repr(exc_class),
+                     ''.join(traceback.format_tb(trace)), None]
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self._size:
+                    self._entries.popitem(last=False)
+
+        fields = {
+            'exc_class': entry[1],
+            'exc_fingerprint': entry[0],
+        }
+        if self._window is None:
+            fields['traceback'] = entry[2]
+            return fields
+        now = time.time()
+        with self._lock:
+            sent = entry[3]
+            if sent is None or now - sent >= self._window:
+                entry[3] = now
+                sent = None
+        if sent is None:
+            fields['traceback'] = entry[2]
+        return fields
+
+    def __getstate__(self):
+        # formatter sent to process pool gets empty cache
+        return {'size': self._size, 'window': self._window}
+
+    def __setstate__(self, state):
+        self.__init__(state['size'], state['window'])
+
+    def clear(self):
+        """
+        Remove all cached tracebacks
+        """
+        with self._lock:
+            self._entries.clear()
@@ -1,5 +1,7 @@
 import functools
 
+from pysllo.utils import context
+
 
 class TraceContext(object):
 
@@ -35,7 +37,9 @@ class Tracer(object):
         self._logs = []
 
     def log(self, level, msg, args=(), **kwargs):
-        self._logs.append((level, msg, args, kwargs))
+        # bound context is kept by reference to its scope, so log is
+        # emitted later with values bound when it was made
+        self._logs.append((level, msg, args, kwargs, context.get_scope()))
 
     def dump_logs(self):
         result = tuple(self._logs)
@@ -1,37 +1,183 @@
 import socket
-import sys
+
+from pysllo.utils import sendmmsg
+from pysllo.utils.balancing import make_balancer
+
+
+def pack_datagrams(msg, limit, arena):
+    """
+    Copy messages encoded to UTF-8 into arena and split them into datagrams
+    not bigger than limit, messages bigger than limit are dropped
+
+    :param msg: (list) messages as str or bytes
+    :param limit: (int) maximum size of datagram in bytes
+    :param arena: (bytearray) buffer for datagrams, it's reused if it's \
+    big enough
+    :return: (tuple) list of (start, end) datagram bounds in arena \
+    and number of dropped messages
+    """
+    bounds = []
+    start = end = 0
+    dropped = 0
+    for data in msg:
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        data_size = len(data)
+        if data_size > limit:
+            dropped += 1
+            continue
+        if end - start + data_size > limit:
+            bounds.append((start, end))
+            start = end
+        # slice assignment of the same length never resizes arena
+        if end + data_size <= len(arena):
+            arena[end:end + data_size] = data
+        else:
+            arena[end:] = data
+        end += data_size
+    if end > start:
+        bounds.append((start, end))
+    return bounds, dropped
+
+
+def store_frames(frames, arena):
+    """
+    Copy ready datagrams into arena one after another
+
+    :param frames: (list) datagrams as bytes
+    :param arena: (bytearray) buffer for datagrams
+    :return: (list) list of (start, end) datagram bounds in arena
+    """
+    bounds = []
+    end = 0
+    for frame in frames:
+        start, end = end, end + len(frame)
+        arena[start:end] = frame
+        bounds.append((start, end))
+    return bounds
 
 
 class UDPBuffer(object):
-    def __init__(self, connections, limit=9000):
-        self._connections = connections
-        self._current = -1
-        self.host, self.port = None, None
-        self._round_connection()
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    """
+    UDPBuffer packs messages into datagrams not bigger than `limit` bytes
+    and sends them to connections chosen by balancer, by default in round
+    robin order. Endpoint that raises socket error is reported to balancer
+    and messages are sent to next one.
+
+    Every endpoint has its own connected socket, so port unreachable
+    reported by ICMP for datagrams sent to dead receiver is raised as
+    `ECONNREFUSED` by next send to it and endpoint is ejected. Datagrams
+    sent before error came back are lost, UDP doesn't confirm delivery.
+
+    Messages are encoded to UTF-8 once and copied into one reused
+    `bytearray`, datagrams are sent as `memoryview` slices of it, so there
+    are no intermediate strings. Messages bigger than limit can't be sent
+    in one datagram and are dropped, number of them is stored in
+    `dropped` attribute.
+
+    On Linux many datagrams are sent with one `sendmmsg` system call,
+    on other platforms or if `batch` is disabled they are sent one by one.
+
+    If `compressor` is given, every datagram is one compressed frame made
+    by `pysllo.utils.compression.Compressor`.
+    """
+
+    def __init__(self, connections, limit=9000, batch=True, compressor=None,
+                 balancer=None):
+        self._balancer = make_balancer(connections, balancer)
+        self.host, self.port = self._balancer.endpoints[0].address
+        self._sockets = {}
         self._limit = limit
+        self._arena = bytearray()
+        self.dropped = 0
+        self._compressor = compressor
+        self._batch = None
+        if batch and sendmmsg.is_available():
+            self._batch = sendmmsg.BatchSender()
+
+    def _make_socket(self, address):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.connect(address)
+        except socket.error:
+            sock.close()
+            raise
+        return sock
+
+    def _socket_for(self, address):
+        try:
+            return self._sockets[address]
+        except KeyError:
+            sock = self._sockets[address] = self._make_socket(address)
+            return sock
+
+    def pack(self, msg):
+        """
+        Copy messages into internal arena and split them into datagrams
 
-    def _round_connection(self):
-        self._current = (self._current + 1) % len(self._connections)
-        self.host, self.port = self._connections[self._current]
+        :param msg: (list) messages as str or bytes
+        :return: (tuple) list of (start, end) datagram bounds in arena \
+        and number of dropped messages
+        """
+        if self._compressor is not None:
+            frames, dropped = self._compressor.pack(msg, self._limit)
+            return store_frames(frames, self._arena), dropped
+        return pack_datagrams(msg, self._limit, self._arena)
 
-    def _send_msg(self, msg):
-        self._socket.sendto(msg, (self.host, self.port))
+    def _send_each(self, sock, bounds):
+        view = memoryview(self._arena)
+        try:
+            for start, end in bounds:
+                sock.send(view[start:end])
+        finally:
+            if hasattr(view, 'release'):
+                view.release()
+
+    def _send_bounds(self, address, bounds):
+        sock = self._socket_for(address)
+        if self._batch is not None and len(bounds) > 1 and \
+                isinstance(sock, socket.socket):
+            self._batch.send(sock, self._arena, bounds, address)
+        else:
+            self._send_each(sock, bounds)
 
     def send(self, msg):
-        result = ''
-        current_bytes = 0
-        for data in msg:
-            data_size = sys.getsizeof(data, 0)
-            if data_size > self._limit:
-                continue
-            current_bytes += data_size
-            if current_bytes <= self._limit:
-                result += data
+        """
+        Send messages packed into datagrams to connection chosen by balancer,
+        if sending fails the next connection is tried
+
+        :param msg: (list) messages as str or bytes
+        :return: (int) number of messages dropped because of size
+        """
+        bounds, dropped = self.pack(msg)
+        attempts = len(self._balancer.endpoints)
+        while True:
+            endpoint = self._balancer.choose()
+            self.host, self.port = endpoint.address
+            try:
+                self._send_bounds(endpoint.address, bounds)
+            except socket.error:
+                self._balancer.failed(endpoint)
+                attempts -= 1
+                if not attempts:
+                    raise
             else:
-                self._send_msg(result)
-                current_bytes = data_size
-                result = data
-        if current_bytes:
-            self._send_msg(result)
-        self._round_connection()
+                self._balancer.succeeded(endpoint)
+                break
+        self.dropped += dropped
+        return dropped
+
+    def reset(self):
+        """
+        Close sockets, new ones are opened by next send, it's used in child
+        process after fork
+        """
+        self.close()
+
+    def close(self):
+        """
+        Close sockets of all endpoints
+        """
+        sockets, self._sockets = self._sockets, {}
+        for sock in sockets.values():
+            sock.close()
@@ -1,3 +1,5 @@
+import sys
+
 import pytest
 import logging
 
@@ -5,6 +7,14 @@ from tests.utils import TestHandler, TestSocket
 from pysllo.formatters.json_formatter import JsonFormatter
 from pysllo.handlers import ElasticSearchUDPHandler
 
+collect_ignore = []
+if sys.version_info < (3, 5):
+    # asyncio handler uses async/await syntax
+    collect_ignore.append('test_async_handler.py')
+if sys.version_info < (3, 7):
+    # asyncio tasks get copy of context only with contextvars
+    collect_ignore.append('test_context.py')
+
 
 @pytest.fixture()
 def handler():
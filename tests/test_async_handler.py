@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import socket
+
+import pytest
+
+from pysllo.formatters.json_formatter import JsonFormatter
+from pysllo.handlers import AsyncElasticSearchUDPHandler
+
+
+@pytest.fixture()
+def loop(request):
+    event_loop = asyncio.new_event_loop()
+    request.addfinalizer(event_loop.close)
+    return event_loop
+
+
+@pytest.fixture()
+def receiver(request):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(1)
+    request.addfinalizer(sock.close)
+    return sock
+
+
+@pytest.fixture()
+def async_handler(loop, receiver):
+    handler = AsyncElasticSearchUDPHandler([receiver.getsockname()],
+                                           loop=loop, limit=1000)
+    handler.setFormatter(JsonFormatter(limit=1000))
+    return handler
+
+
+def _make_record(msg):
+    return logging.makeLogRecord({'msg': msg, 'levelname': 'DEBUG'})
+
+
+def _messages(datagram):
+    lines = [l for l in datagram.decode('utf-8').split('\n') if l]
+    return [json.loads(doc)['message'] for doc in lines[1::2]]
+
+
+def test_emit_in_event_loop(loop, async_handler, receiver):
+    async def main():
+        async_handler.emit(_make_record("TEST1"))
+        async_handler.emit(_make_record("TEST2"))
+        async_handler.flush()
+        await async_handler.drain()
+
+    loop.run_until_complete(main())
+    assert _messages(receiver.recv(65535)) == ["TEST1", "TEST2"]
+
+
+def test_flush_interval(loop, receiver):
+    handler = AsyncElasticSearchUDPHandler([receiver.getsockname()],
+                                           loop=loop, flush_interval=0.01)
+    handler.setFormatter(JsonFormatter())
+
+    async def main():
+        handler.emit(_make_record("TEST"))
+        await asyncio.sleep(0.05)
+        await handler.drain()
+
+    loop.run_until_complete(main())
+    assert _messages(receiver.recv(65535)) == ["TEST"]
+
+
+def test_emit_from_other_thread(loop, async_handler, receiver):
+    async def main():
+        await loop.run_in_executor(
+            None, async_handler.emit, _make_record("TEST"))
+        async_handler.close()
+        await async_handler.drain()
+
+    loop.run_until_complete(main())
+    assert _messages(receiver.recv(65535)) == ["TEST"]
+    assert async_handler._transport is None
+
+
+def test_backup_in_executor(tmpdir, loop, async_handler, receiver):
+    async_handler.set_backup_path(str(tmpdir))
+    async_handler.enable_backup()
+
+    async def main():
+        async_handler.emit(_make_record("TEST"))
+        async_handler.close()
+        await async_handler.drain()
+
+    loop.run_until_complete(main())
+    assert _messages(receiver.recv(65535)) == ["TEST"]
+    assert tmpdir.join(async_handler.index()).check()
+
+
+def test_closed_loop(loop, async_handler, receiver):
+    loop.close()
+    async_handler.emit(_make_record("TEST"))
+    assert _messages(receiver.recv(65535)) == ["TEST"]
+
+
+def test_emit_before_loop_runs(receiver):
+    handler = AsyncElasticSearchUDPHandler([receiver.getsockname()])
+    handler.setFormatter(JsonFormatter())
+    handler.emit(_make_record("TEST1"))
+
+    async def main():
+        handler.emit(_make_record("TEST2"))
+        handler.flush()
+        await handler.drain()
+
+    asyncio.run(main())
+    assert _messages(receiver.recv(65535)) == ["TEST1", "TEST2"]
+
+    async def next_run():
+        handler.emit(_make_record("TEST3"))
+        handler.close()
+        await handler.drain()
+
+    # loop of the first run is closed, handler moves to the new one
+    asyncio.run(next_run())
+    assert _messages(receiver.recv(65535)) == ["TEST3"]
+
+
+def test_flush_without_loop(receiver):
+    handler = AsyncElasticSearchUDPHandler([receiver.getsockname()])
+    handler.setFormatter(JsonFormatter())
+    handler.emit(_make_record("TEST"))
+    handler.flush()
+    assert _messages(receiver.recv(65535)) == ["TEST"]
+    assert handler._loop is None
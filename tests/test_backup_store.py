@@ -0,0 +1,141 @@
+import logging
+import socket
+
+import pytest
+
+from pysllo.utils.backup_store import SegmentedBackupStore, main
+
+
+@pytest.fixture()
+def store(request, tmpdir):
+    backup_store = SegmentedBackupStore(str(tmpdir), segment_size=100)
+    request.addfinalizer(backup_store.close)
+    return backup_store
+
+
+def _reopen(store, tmpdir):
+    store.close()
+    return SegmentedBackupStore(str(tmpdir), segment_size=100)
+
+
+def test_acknowledged_messages_are_not_replayed(store):
+    ticket = store.append(["TEST1", "TEST2"])
+    store.append(["TEST3"])
+    store.acknowledge(ticket)
+    assert store.unacknowledged()[0][0] == [b"TEST3"]
+
+
+def test_checkpoint_waits_for_older_batches(store):
+    first = store.append(["TEST1"])
+    second = store.append(["TEST2"])
+    store.acknowledge(second)
+    assert store.unacknowledged()[0][0] == [b"TEST1", b"TEST2"]
+    store.acknowledge(first)
+    assert store.unacknowledged() == []
+
+
+def test_segments_rotation_and_removal(store):
+    tickets = [store.append(["TEST" * 10]) for _ in range(5)]
+    assert len(store.segments()) > 1
+    for ticket in tickets:
+        store.acknowledge(ticket)
+    assert len(store.segments()) == 1
+    assert store.unacknowledged() == []
+
+
+def test_checkpoint_is_written_by_policy(tmpdir):
+    checkpoint = tmpdir.join('logs.checkpoint')
+    store = SegmentedBackupStore(str(tmpdir), fsync_interval=60)
+    store.acknowledge(store.append(["TEST1"]))
+    assert not checkpoint.check()
+    store.close()
+    assert checkpoint.check()
+
+    store = SegmentedBackupStore(str(tmpdir), fsync='always')
+    store.acknowledge(store.append(["TEST2"]))
+    written = checkpoint.read()
+    store.acknowledge(store.append(["TEST3"]))
+    assert checkpoint.read() != written
+    store.close()
+
+
+def test_replay_after_restart(store, tmpdir):
+    store.acknowledge(store.append(["TEST0"]))
+    for i in range(1, 6):
+        store.append(["TEST{0}".format(i) * 5])
+    store = _reopen(store, tmpdir)
+
+    # new batch can't move checkpoint over messages from previous run
+    store.acknowledge(store.append(["NEW"]))
+    sent = []
+    assert store.replay(sent.extend, workers=3) == 5
+    assert sorted(sent) == [("TEST{0}".format(i) * 5).encode('utf-8')
+                            for i in range(1, 6)]
+    assert store.unacknowledged() == []
+    store.close()
+
+
+def test_torn_record_is_ignored(store, tmpdir):
+    store.append(["TEST1"])
+    store.append(["TEST2"])
+    path = tmpdir.join('logs-{0:010d}.seg'.format(store.segments()[-1]))
+    store.close()
+    data = path.read_binary()
+    path.write_binary(data[:-2])
+
+    store = SegmentedBackupStore(str(tmpdir))
+    store.append(["TEST3"])
+    messages = [m for batch, _ in store.unacknowledged() for m in batch]
+    assert messages == [b"TEST1"]
+    store.replay(lambda batch: None)
+    messages = [m for batch, _ in store.unacknowledged() for m in batch]
+    assert messages == [b"TEST3"]
+    store.close()
+
+
+def test_wrong_fsync_policy(tmpdir):
+    with pytest.raises(ValueError):
+        SegmentedBackupStore(str(tmpdir), fsync='sometimes')
+
+
+def test_handler_acknowledges_sent_batches(tmpdir, es_handler, socket):
+    store = SegmentedBackupStore(str(tmpdir), fsync='always')
+    es_handler.set_backup_store(store)
+    es_handler.enable_backup()
+    es_handler.emit(logging.makeLogRecord({'msg': "TEST"}))
+    es_handler.flush()
+    assert socket.pop()
+    assert store.unacknowledged() == []
+    assert not tmpdir.join(es_handler.index()).check()
+    store.close()
+
+
+def test_handler_keeps_not_sent_batches(tmpdir, es_handler):
+    class BrokenSocket(object):
+        def send(self, data):
+            raise IOError
+
+    store = SegmentedBackupStore(str(tmpdir))
+    es_handler._connection = BrokenSocket()
+    es_handler.set_backup_store(store)
+    es_handler.enable_backup()
+    es_handler.emit(logging.makeLogRecord({'msg': "TEST"}))
+    with pytest.raises(IOError):
+        es_handler.flush()
+    assert b'"msg": "TEST"' in store.unacknowledged()[0][0][0]
+    store.close()
+
+
+def test_replay_command(store, tmpdir, capsys):
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(1)
+    store.append(["TEST"])
+    store.close()
+    try:
+        main([str(tmpdir), '--udp', '127.0.0.1:{0}'.format(
+            receiver.getsockname()[1])])
+        assert receiver.recv(65535) == b"TEST"
+    finally:
+        receiver.close()
+    assert '1 messages sent' in capsys.readouterr()[0]
@@ -0,0 +1,175 @@
+import socket
+import time
+
+import pytest
+
+from pysllo.utils.balancing import Balancer, RoundRobinBalancer, \
+    WeightedBalancer, LeastRecentlyFailedBalancer, make_balancer, tcp_probe
+from pysllo.utils.udp_buffer import UDPBuffer
+from tests import utils
+
+CONNECTIONS = [('localhost', 9700), ('localhost', 9701),
+               ('localhost', 9702)]
+
+
+def _choose(balancer, count):
+    return [balancer.choose().address[1] for _ in range(count)]
+
+
+def test_round_robin():
+    balancer = RoundRobinBalancer(CONNECTIONS)
+    assert _choose(balancer, 4) == [9700, 9701, 9702, 9700]
+
+
+def test_failed_endpoint_is_ejected():
+    balancer = RoundRobinBalancer(CONNECTIONS, eject_time=60)
+    balancer.failed(balancer.endpoints[1])
+    assert _choose(balancer, 4) == [9700, 9702, 9700, 9702]
+
+
+def test_eject_after_many_failures():
+    balancer = RoundRobinBalancer(CONNECTIONS, eject_after=2)
+    endpoint = balancer.endpoints[0]
+    balancer.failed(endpoint)
+    assert endpoint.is_available()
+    balancer.failed(endpoint)
+    assert not endpoint.is_available()
+
+
+def test_success_restores_endpoint():
+    balancer = RoundRobinBalancer(CONNECTIONS, eject_time=60)
+    endpoint = balancer.endpoints[0]
+    balancer.failed(endpoint)
+    balancer.succeeded(endpoint)
+    assert endpoint.is_available()
+    assert endpoint.failures == 0
+
+
+def test_ejection_expires():
+    balancer = RoundRobinBalancer(CONNECTIONS, eject_time=0.01)
+    balancer.failed(balancer.endpoints[0])
+    time.sleep(0.02)
+    assert len(balancer.available()) == 3
+
+
+def test_all_ejected_returns_first_to_come_back():
+    balancer = RoundRobinBalancer(CONNECTIONS[:2], eject_time=60)
+    balancer.failed(balancer.endpoints[1])
+    balancer.failed(balancer.endpoints[0])
+    assert balancer.choose() is balancer.endpoints[1]
+
+
+def test_weighted():
+    balancer = WeightedBalancer(CONNECTIONS[:2], weights=[3, 1])
+    chosen = _choose(balancer, 8)
+    assert chosen.count(9700) == 6
+    assert chosen.count(9701) == 2
+    # sends are interleaved, not in series
+    assert chosen[:4].count(9701) == 1
+
+
+def test_weighted_skips_ejected():
+    balancer = WeightedBalancer(CONNECTIONS[:2], weights=[3, 1],
+                                eject_time=60)
+    balancer.failed(balancer.endpoints[0])
+    assert _choose(balancer, 3) == [9701] * 3
+
+
+def test_least_recently_failed():
+    balancer = LeastRecentlyFailedBalancer(CONNECTIONS, eject_time=0)
+    balancer.failed(balancer.endpoints[0])
+    time.sleep(0.001)
+    balancer.failed(balancer.endpoints[1])
+    assert _choose(balancer, 2) == [9702, 9702]
+    balancer.failed(balancer.endpoints[2])
+    assert _choose(balancer, 1) == [9700]
+
+
+def test_make_balancer():
+    assert isinstance(make_balancer(CONNECTIONS), RoundRobinBalancer)
+    assert isinstance(make_balancer(CONNECTIONS, 'weighted'),
+                      WeightedBalancer)
+    balancer = LeastRecentlyFailedBalancer(CONNECTIONS)
+    assert make_balancer(CONNECTIONS, balancer) is balancer
+    with pytest.raises(ValueError):
+        make_balancer(CONNECTIONS, 'random')
+    with pytest.raises(ValueError):
+        Balancer(CONNECTIONS, weights=[1])
+
+
+def test_probe():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    dead = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    dead.bind(('127.0.0.1', 0))
+    dead_address = dead.getsockname()
+    dead.close()
+    try:
+        balancer = RoundRobinBalancer([server.getsockname(), dead_address],
+                                      eject_time=60)
+        balancer.probe(tcp_probe(timeout=1))
+        assert balancer.available() == [balancer.endpoints[0]]
+    finally:
+        server.close()
+
+
+class FailingSocket(utils.TestSocket):
+
+    def __init__(self, failing):
+        utils.TestSocket.__init__(self)
+        self._failing = failing
+
+    def sendto(self, data, connection):
+        if connection in self._failing:
+            raise socket.error('network is unreachable')
+        utils.TestSocket.sendto(self, data, connection)
+
+
+def test_udp_buffer_failover():
+    buffer = UDPBuffer(CONNECTIONS[:2])
+    sent = FailingSocket([CONNECTIONS[0]])
+    utils.connect_test_socket(buffer, sent)
+    buffer.send(['first'])
+    buffer.send(['second'])
+    assert sent.pop_with_connection() == (b'second', CONNECTIONS[1])
+    assert sent.pop_with_connection() == (b'first', CONNECTIONS[1])
+    assert not buffer._balancer.endpoints[0].is_available()
+
+
+def test_udp_buffer_raises_when_all_failed():
+    buffer = UDPBuffer(CONNECTIONS[:2])
+    utils.connect_test_socket(buffer, FailingSocket(CONNECTIONS[:2]))
+    with pytest.raises(socket.error):
+        buffer.send(['first'])
+
+
+def test_udp_buffer_ejects_dead_receiver():
+    live = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    live.bind(('127.0.0.1', 0))
+    live.settimeout(0.5)
+    dead = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    dead.bind(('127.0.0.1', 0))
+    dead_address = dead.getsockname()
+    dead.close()
+    try:
+        buffer = UDPBuffer([dead_address, live.getsockname()],
+                           balancer='least_recently_failed')
+        for i in range(10):
+            buffer.send(['batch{0}'.format(i)])
+            # port unreachable comes back after datagram is sent
+            time.sleep(0.01)
+        received = []
+        try:
+            while True:
+                received.append(live.recv(65535))
+        except socket.timeout:
+            pass
+        assert len(received) == 9
+        dead_endpoint, live_endpoint = buffer._balancer.endpoints
+        assert dead_endpoint.failures == 1
+        assert not dead_endpoint.is_available()
+        assert live_endpoint.failures == 0
+    finally:
+        buffer.close()
+        live.close()
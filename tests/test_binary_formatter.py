@@ -0,0 +1,147 @@
+# coding:utf-8
+
+import datetime
+import decimal
+import json
+import logging
+import re
+import sys
+
+import pytest
+
+from pysllo.formatters import BinaryFormatter, JsonFormatter
+from pysllo.utils.binary_codec import DecodeError, decode_frame, \
+    encode_document, iter_frames, main, to_bulk
+
+
+def _stable(message):
+    return re.sub(r'"_id": "[^"]*"', '"_id": ""', message)
+
+
+def _record(**kwargs):
+    kwargs.setdefault('msg', 'TEST')
+    return logging.makeLogRecord(kwargs)
+
+
+@pytest.mark.parametrize('values', [
+    {},
+    {'msg': 'user %s', 'args': (u'łukasz', )},
+    {'name': 'app.db', 'levelname': 'ERROR', 'count': -12345678901234567890,
+     'ratio': 0.1, 'flags': [True, False, None], 'nested': {'a': {'b': []}}},
+    {'when': datetime.datetime(2016, 1, 1), 'price': decimal.Decimal('1.5'),
+     'keys': {1: 'int', 2.5: 'float', None: 'none'}},
+    {'text': u'😀 "quoted" \\ \x00\n', 'nan': float('nan')},
+    {'long': 'x' * 1000, 'same': 'x' * 1000},
+])
+def test_decodes_to_json_format(values):
+    record = _record(**values)
+    binary = BinaryFormatter(limit=100000, doc_id='counter')
+    expected = JsonFormatter(limit=100000, doc_id='counter')
+    assert _stable(to_bulk(binary.format(record))) == \
+        _stable(expected.format(record))
+
+
+def test_exception_decodes_to_json_format():
+    try:
+        raise ValueError('test')
+    except ValueError:
+        record = _record(exc_info=sys.exc_info())
+    binary = BinaryFormatter(limit=100000, doc_id='none')
+    expected = JsonFormatter(limit=100000, doc_id='none')
+    assert to_bulk(binary.format(record)) == expected.format(record)
+
+
+def test_frame_is_smaller_than_json():
+    record = _record(name='app', user_id=123, path='/login')
+    binary = BinaryFormatter(doc_id='none').format(record)
+    assert len(binary) * 2 < len(JsonFormatter(doc_id='none').format(record))
+    assert binary.endswith(b'\n')
+
+
+def test_id_strategies():
+    record = _record()
+    header, _ = next(iter_frames(BinaryFormatter().format(record)))
+    assert len(header['index']['_id']) == 36
+    header, _ = next(iter_frames(
+        BinaryFormatter(doc_id='none').format(record)))
+    assert '_id' not in header['index']
+    content = BinaryFormatter(doc_id='content')
+    assert content.format(record) == content.format(record)
+
+
+def test_skipped_logger():
+    assert BinaryFormatter().format(_record(name='elasticsearch')) == b''
+
+
+def test_truncation():
+    formatter = BinaryFormatter(limit=1000)
+    record = _record(msg='%s', args=(u'zażółć' * 1000, ), other='y' * 100)
+    frame = formatter.format(record)
+    assert len(frame) <= 1000
+    _, document = next(iter_frames(frame))
+    assert document['ES_MTL'] is True
+    assert document['other'] == 'y' * 100
+    assert formatter.truncated == 1
+
+
+def test_unserializable_document():
+    formatter = BinaryFormatter()
+    with pytest.warns(UserWarning):
+        frame = formatter.format(_record(obj={(1, 2): 'tuple key'}))
+    _, document = next(iter_frames(frame))
+    assert document == {'error': 'unable to serialize'}
+
+
+def test_many_frames():
+    formatter = BinaryFormatter(doc_id='none')
+    data = b''.join(formatter.format(_record(msg='TEST{0}'.format(i)))
+                    for i in range(300))
+    documents = [document for _, document in iter_frames(data)]
+    assert [d['message'] for d in documents] == \
+        ['TEST{0}'.format(i) for i in range(300)]
+
+
+@pytest.mark.parametrize('data', [
+    b'x', b'\xb1\x05abc\n', b'\xb1\x01\x02\n',
+])
+def test_broken_frames(data):
+    with pytest.raises(DecodeError):
+        list(iter_frames(data))
+
+
+def test_unknown_reference():
+    with pytest.raises(DecodeError):
+        decode_frame(b'\x01\x00\x00\x00\x06\x7f')
+
+
+def test_large_table():
+    document = dict(('key{0}'.format(i), 'value{0}'.format(i))
+                    for i in range(300))
+    body = b'\x01\x00\x00\x00' + encode_document([document, document])
+    assert decode_frame(body)[1] == [document, document]
+
+
+def test_handler_backup(tmpdir, socket):
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    handler = ElasticSearchUDPHandler([('localhost', 9000)])
+    handler._connection = socket
+    handler.setFormatter(BinaryFormatter(doc_id='none'))
+    handler.set_backup_path(str(tmpdir))
+    handler.enable_backup()
+    for i in range(3):
+        handler.emit(_record(msg='TEST{0}'.format(i)))
+    handler.flush()
+    data = tmpdir.join(handler.index() + '.bin').read_binary()
+    assert [json.loads(line)['message']
+            for line in to_bulk(data).splitlines()[1::2]] == \
+        ['TEST0', 'TEST1', 'TEST2']
+
+
+def test_main(tmpdir, capsys):
+    path = tmpdir.join('backup.bin')
+    path.write_binary(BinaryFormatter(doc_id='none').format(_record()))
+    main([str(path)])
+    header, document = capsys.readouterr().out.splitlines()
+    assert json.loads(header)['index']['_type'] == 'logs'
+    assert json.loads(document)['message'] == 'TEST'
@@ -0,0 +1,114 @@
+import gzip
+import io
+import logging
+import os
+
+import pytest
+
+from pysllo.formatters.json_formatter import JsonFormatter
+from pysllo.handlers import ElasticSearchHTTPHandler, ElasticSearchUDPHandler
+from pysllo.utils.backup_store import SegmentedBackupStore
+from pysllo.utils.compression import Compressor, decompress, GZIP, ZLIB
+from pysllo.utils.udp_buffer import UDPBuffer
+from tests.utils import BulkHTTPServer, DecodingUDPReceiver
+
+
+@pytest.fixture()
+def receiver(request):
+    udp_receiver = DecodingUDPReceiver()
+    request.addfinalizer(udp_receiver.close)
+    return udp_receiver
+
+
+def _make_record(msg):
+    return logging.makeLogRecord({'msg': msg, 'levelname': 'DEBUG'})
+
+
+@pytest.mark.parametrize('method', [GZIP, ZLIB])
+def test_round_trip(method):
+    compressor = Compressor(method, level=1)
+    frame = compressor.compress([b"TEST1", u"TEST2"])
+    assert decompress(frame) == b"TEST1TEST2"
+
+
+def test_gzip_frame_is_standard():
+    frame = Compressor(GZIP).compress([b"TEST"])
+    assert gzip.GzipFile(fileobj=io.BytesIO(frame)).read() == b"TEST"
+
+
+def test_wrong_method():
+    with pytest.raises(ValueError):
+        Compressor('lzma')
+
+
+def test_pack_respects_limit():
+    compressor = Compressor()
+    messages = ['{"message": "TEST%d", "level": "DEBUG"}\n' % i
+                for i in range(1000)]
+    frames, dropped = compressor.pack(messages, 500)
+    assert dropped == 0
+    assert all(len(frame) <= 500 for frame in frames)
+    assert b''.join(decompress(f) for f in frames) == \
+        ''.join(messages).encode('utf-8')
+    # much less datagrams than without compression
+    assert len(frames) < len(''.join(messages)) // 500 / 2
+
+
+def test_pack_drops_incompressible_message():
+    frames, dropped = Compressor().pack([os.urandom(1000), b"TEST"], 500)
+    assert dropped == 1
+    assert [decompress(f) for f in frames] == [b"TEST"]
+
+
+def test_udp_buffer_with_compression(receiver):
+    udp = UDPBuffer([receiver.address], limit=200, compressor=Compressor())
+    messages = ["TEST{0}\n".format(i) for i in range(200)]
+    udp.send(messages)
+    data = b''
+    while len(data) < len(''.join(messages)):
+        data += receiver.receive()
+    assert data == ''.join(messages).encode('utf-8')
+    assert max(receiver.sizes) <= 200
+
+
+def test_udp_handler_with_compression(receiver):
+    handler = ElasticSearchUDPHandler([receiver.address],
+                                      compressor=Compressor())
+    handler.setFormatter(JsonFormatter())
+    handler.emit(_make_record("TEST"))
+    handler.flush()
+    assert receiver.documents(1)[0]['message'] == "TEST"
+
+
+def test_http_handler_with_compression(request):
+    server = BulkHTTPServer()
+    request.addfinalizer(server.close)
+    handler = ElasticSearchHTTPHandler([server.address],
+                                       compressor=Compressor(GZIP))
+    handler.setFormatter(JsonFormatter())
+    handler.emit(_make_record("TEST"))
+    handler.close()
+    assert [d['message'] for d in server.documents()] == ["TEST"]
+
+
+def test_compressed_backup_file(tmpdir, es_handler):
+    es_handler._compressor = Compressor(GZIP)
+    es_handler.set_backup_path(str(tmpdir))
+    es_handler.enable_backup()
+    for msg in ("TEST1", "TEST2"):
+        es_handler.emit(_make_record(msg))
+        es_handler.flush()
+    path = str(tmpdir.join(es_handler.index() + '.gz'))
+    with gzip.open(path) as in_file:
+        data = in_file.read().decode('utf-8')
+    assert '"msg": "TEST1"' in data
+    assert '"msg": "TEST2"' in data
+
+
+def test_compressed_backup_store(tmpdir):
+    store = SegmentedBackupStore(str(tmpdir), compressor=Compressor(ZLIB))
+    store.append(["TEST1", "TEST2"])
+    store.append(["TEST3"])
+    messages = [m for batch, _ in store.unacknowledged() for m in batch]
+    assert messages == [b"TEST1", b"TEST2", b"TEST3"]
+    store.close()
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from pysllo.utils import context
+
+
+def setup_function(function):
+    context.unbind()
+
+
+def teardown_function(function):
+    context.unbind()
+    context.unbind_global()
+
+
+def test_bind_is_copy_on_write():
+    context.bind(user='first')
+    values = context.get_context()
+    context.bind(ip='127.0.0.1')
+    assert values == {'user': 'first'}
+    assert context.get_context() == {'user': 'first', 'ip': '127.0.0.1'}
+    context.unbind('user')
+    assert values == {'user': 'first'}
+    assert context.get_context() == {'ip': '127.0.0.1'}
+
+
+def test_tasks_share_context_until_bind():
+    context.bind(app='test')
+    parent = context.get_context()
+
+    async def request(user):
+        assert context.get_context() is parent
+        context.bind(user=user)
+        await asyncio.sleep(0.01)
+        return context.get_context()
+
+    async def main():
+        return await asyncio.gather(request('first'), request('second'))
+
+    first, second = asyncio.run(main())
+    assert first == {'app': 'test', 'user': 'first'}
+    assert second == {'app': 'test', 'user': 'second'}
+    assert context.get_context() == {'app': 'test'}
+
+
+def test_bound_block():
+    context.bind(app='test')
+    before = context.get_scope()
+    with context.bound(user='first'):
+        assert context.get_context() == {'app': 'test', 'user': 'first'}
+        with context.bound(user='second', ip='127.0.0.1'):
+            assert context.get_context() == {
+                'app': 'test', 'user': 'second', 'ip': '127.0.0.1'}
+        assert context.get_context() == {'app': 'test', 'user': 'first'}
+    assert context.get_scope() is before
+
+
+def test_bound_restores_on_exception():
+    before = context.get_scope()
+    try:
+        with context.bound(user='first'):
+            raise ValueError('test')
+    except ValueError:
+        pass
+    assert context.get_scope() is before
+
+
+def test_bound_decorator():
+    @context.bound(job='cleanup')
+    def job(depth):
+        values = context.get_context()
+        if depth:
+            return [values] + job(depth - 1)
+        return [values]
+
+    assert job(1) == [{'job': 'cleanup'}, {'job': 'cleanup'}]
+    assert context.get_context() == {}
+
+
+def test_merged_once_and_shared():
+    with context.bound(user='first'):
+        scope = context.get_scope()
+        assert context.get_context() is context.get_context()
+        with context.bound(ip='127.0.0.1'):
+            assert context.get_scope().parent is scope
+
+
+def test_deep_chain_is_merged_without_recursion():
+    scope = context.EMPTY
+    for i in range(5000):
+        scope = scope.child({'key{0}'.format(i % 10): i})
+    assert scope.merged()['key9'] == 4999
+
+
+def test_bind_keeps_chain_short():
+    for i in range(100):
+        context.bind(**{'key{0}'.format(i): i})
+    assert context.get_scope().depth <= context.MAX_DEPTH
+    assert len(context.get_context()) == 100
+
+
+def test_global_values_are_base_layer():
+    context.bind_global(service='test', user='global')
+    assert context.get_context() == {'service': 'test', 'user': 'global'}
+    with context.bound(user='scope'):
+        values = context.get_context()
+        assert values == {'service': 'test', 'user': 'scope'}
+        # merged once for every base layer
+        assert context.get_context() is values
+        context.bind_global(host='local')
+        assert context.get_context() == {
+            'service': 'test', 'user': 'scope', 'host': 'local'}
+    context.unbind_global('user')
+    assert context.get_context() == {'service': 'test', 'host': 'local'}
+    with pytest.raises(KeyError):
+        context.unbind('service')
+
+
+def test_bound_coroutine_function():
+    @context.bound(request_id='r1')
+    async def handler(delay):
+        await asyncio.sleep(delay)
+        return context.get_context().get('request_id')
+
+    async def main():
+        coroutine = handler(0.01)
+        # scope isn't entered by making coroutine
+        assert 'request_id' not in context.get_context()
+        return await coroutine, context.get_context().get('request_id')
+
+    assert asyncio.iscoroutinefunction(handler)
+    assert asyncio.run(main()) == ('r1', None)
+
+
+def test_bound_block_shared_by_tasks():
+    block = context.bound(job='shared')
+
+    async def request(user, delay):
+        with block:
+            context.bind(user=user)
+            await asyncio.sleep(delay)
+            values = context.get_context()
+        return values, context.get_context()
+
+    async def main():
+        return await asyncio.gather(request('first', 0.01),
+                                    request('second', 0.02))
+
+    first, second = asyncio.run(main())
+    assert first == ({'job': 'shared', 'user': 'first'}, {})
+    assert second == ({'job': 'shared', 'user': 'second'}, {})
@@ -0,0 +1,78 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from pysllo.formatters import JsonFormatter
+from pysllo.utils.doc_id import get_id_strategy, CounterId, ContentId
+
+
+def _header(formatter, record):
+    return json.loads(formatter.format(record).split('\n')[0])['index']
+
+
+@pytest.mark.parametrize('name', ['uuid1', 'counter', 'random'])
+def test_unique_ids(name):
+    make_id = get_id_strategy(name)
+    ids = set(make_id(None) for _ in range(1000))
+    assert len(ids) == 1000
+
+
+def test_counter_in_threads():
+    make_id = CounterId()
+    results = []
+
+    def worker():
+        results.extend(make_id(None) for _ in range(1000))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 4000
+
+
+def test_counter_prefix_changes_in_other_process():
+    make_id = CounterId()
+    first = make_id(None)
+    make_id._pid = -1  # as if id was made in child process after fork
+    second = make_id(None)
+    assert first.rsplit('-', 1)[0] != second.rsplit('-', 1)[0]
+    assert second.endswith('-0')
+
+
+def test_content_id():
+    make_id = ContentId()
+    assert make_id('{"a": 1}') == make_id(b'{"a": 1}')
+    assert make_id('{"a": 1}') != make_id('{"a": 2}')
+    assert len(make_id('{"a": 1}')) == 32
+
+
+def test_no_id_in_header():
+    formatter = JsonFormatter(name='test', doc_id='none')
+    index = _header(formatter, logging.makeLogRecord({'msg': 'TEST'}))
+    assert index == {'_index': formatter.index(), '_type': 'test'}
+
+
+def test_content_id_is_repeatable():
+    formatter = JsonFormatter(name='test', doc_id='content')
+    record = logging.makeLogRecord({'msg': 'TEST'})
+    other = logging.makeLogRecord({'msg': 'OTHER'})
+    assert _header(formatter, record) == _header(formatter, record)
+    assert _header(formatter, record)['_id'] != \
+        _header(formatter, other)['_id']
+
+
+def test_counter_id_in_header():
+    formatter = JsonFormatter(name='test', doc_id='counter')
+    record = logging.makeLogRecord({'msg': 'TEST'})
+    first = _header(formatter, record)['_id']
+    second = _header(formatter, record)['_id']
+    assert first != second
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        get_id_strategy('sequence')
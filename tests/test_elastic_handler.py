@@ -1,4 +1,9 @@
+import sys
+import time
 import logging
+import warnings
+
+import pytest
 
 from tests.utils import socket_data
 
@@ -67,3 +72,312 @@ def test_close_handler(es_logger, es_handler, socket):
     data = socket_data(socket)[0]
     assert data['message'] == msg
     assert data['levelname'] == logging.getLevelName(logging.DEBUG)
+
+
+@pytest.fixture()
+def threaded_es_handler(socket):
+    from pysllo.formatters.json_formatter import JsonFormatter
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    handler = ElasticSearchUDPHandler([('localhost', 9000)], limit=1000,
+                                      threaded=True, flush_interval=0.05)
+    handler._connection = socket
+    handler.setFormatter(JsonFormatter(limit=1000))
+    return handler
+
+
+def _make_record(msg):
+    return logging.makeLogRecord({'msg': msg, 'levelname': 'DEBUG'})
+
+
+def test_threaded_flush(threaded_es_handler, socket):
+    msg = "TEST"
+    threaded_es_handler.emit(_make_record(msg))
+    threaded_es_handler.flush()
+    data = socket_data(socket)[0]
+    assert data['message'] == msg
+    threaded_es_handler.close()
+
+
+def test_threaded_flush_interval(threaded_es_handler, socket):
+    msg = "TEST"
+    threaded_es_handler.emit(_make_record(msg))
+    for _ in range(100):
+        if socket._records:
+            break
+        time.sleep(0.01)
+    data = socket_data(socket)[0]
+    assert data['message'] == msg
+    threaded_es_handler.close()
+
+
+def test_threaded_close_drains_queue(threaded_es_handler, socket):
+    threaded_es_handler._flush_interval = None
+    for i in range(5):
+        threaded_es_handler.emit(_make_record("TEST{0}".format(i)))
+    threaded_es_handler.close()
+    assert not threaded_es_handler._flusher.is_alive()
+    messages = []
+    while socket._records:
+        messages.extend(d['message'] for d in socket_data(socket))
+    assert sorted(messages) == ["TEST{0}".format(i) for i in range(5)]
+
+
+def _finished(func, timeout=10):
+    import threading
+
+    thread = threading.Thread(target=func)
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_threaded_close_with_failing_send(threaded_es_handler):
+    import socket as socket_module
+
+    def fail(payload, ticket=None):
+        raise socket_module.error('connection refused')
+
+    threaded_es_handler._send = fail
+    threaded_es_handler._flush_interval = None
+    threaded_es_handler.emit(_make_record("TEST"))
+    raise_exceptions = logging.raiseExceptions
+    logging.raiseExceptions = False
+    try:
+        assert _finished(threaded_es_handler.close)
+    finally:
+        logging.raiseExceptions = raise_exceptions
+    assert not threaded_es_handler._flusher.is_alive()
+
+
+def test_threaded_flush_with_handler_lock(threaded_es_handler, socket):
+    # `logging.shutdown` flushes handlers with their lock held
+    def shutdown():
+        threaded_es_handler.acquire()
+        try:
+            threaded_es_handler.flush()
+        finally:
+            threaded_es_handler.release()
+
+    threaded_es_handler.emit(_make_record("TEST"))
+    assert _finished(shutdown)
+    assert socket_data(socket)[0]['message'] == "TEST"
+    threaded_es_handler.close()
+
+
+def test_threaded_full_queue_from_threads(socket):
+    import threading
+    from pysllo.formatters.json_formatter import JsonFormatter
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    handler = ElasticSearchUDPHandler([('localhost', 9000)], limit=2000,
+                                      threaded=True, queue_size=2)
+    handler._connection = socket
+    handler.setFormatter(JsonFormatter(limit=2000))
+    log = logging.getLogger('threaded_full_queue')
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    log.addHandler(handler)
+
+    def worker():
+        for i in range(500):
+            log.info('TEST %s', i)
+
+    def run():
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        handler.close()
+
+    try:
+        assert _finished(run, timeout=30)
+    finally:
+        log.removeHandler(handler)
+    messages = 0
+    while socket._records:
+        messages += len(socket_data(socket))
+    assert messages == 2000
+
+
+def test_handle_without_handler_lock(es_handler, socket):
+    import threading
+
+    locked = threading.Event()
+    release = threading.Event()
+
+    def hold_lock():
+        es_handler.acquire()
+        locked.set()
+        release.wait()
+        es_handler.release()
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    locked.wait()
+    try:
+        assert _finished(lambda: es_handler.handle(_make_record("TEST")))
+    finally:
+        release.set()
+        holder.join()
+    es_handler.flush()
+    assert socket_data(socket)[0]['message'] == "TEST"
+
+
+def test_threads_append_to_shards(es_handler, socket):
+    import threading
+
+    es_handler.set_limit(10 ** 9)
+
+    def worker():
+        for i in range(200):
+            es_handler.handle(_make_record("TEST"))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    shards = [shard for shard in es_handler._buffer._shards if shard.items]
+    assert len(shards) > 1
+    es_handler.flush()
+    assert len(socket_data(socket)) == 800
+
+
+def test_independent_handlers(socket):
+    from tests.utils import TestSocket
+    from pysllo.formatters.json_formatter import JsonFormatter
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    first = ElasticSearchUDPHandler([('localhost', 9000)], name='first')
+    second = ElasticSearchUDPHandler([('localhost', 9001)], name='second')
+    first._connection = socket
+    second._connection = TestSocket()
+    first.setFormatter(JsonFormatter())
+    second.setFormatter(JsonFormatter())
+
+    first.emit(_make_record("TEST1"))
+    second.emit(_make_record("TEST2"))
+    first.flush()
+
+    assert [d['message'] for d in socket_data(socket)] == ["TEST1"]
+    assert first.index().startswith('first-')
+    assert second.index().startswith('second-')
+    assert len(second._buffer) == 1
+
+
+@pytest.fixture()
+def deferred_es_handler(socket):
+    from pysllo.formatters.json_formatter import JsonFormatter
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    handler = ElasticSearchUDPHandler([('localhost', 9000)], limit=1000,
+                                      deferred=True)
+    handler._connection = socket
+    handler.setFormatter(JsonFormatter(limit=1000))
+    return handler
+
+
+def _all_messages(socket):
+    batches = []
+    while socket._records:
+        batches.append([d['message'] for d in socket_data(socket)])
+    return [message for batch in reversed(batches) for message in batch]
+
+
+def test_deferred_buffers_snapshots(deferred_es_handler, socket):
+    args = ['first']
+    record = logging.makeLogRecord({'msg': 'TEST %s', 'args': (args, ),
+                                    'levelname': 'DEBUG'})
+    deferred_es_handler.emit(record)
+    args.append('second')
+    assert isinstance(deferred_es_handler._buffer.drain()[0], tuple)
+
+    deferred_es_handler.emit(record)
+    args[:] = ['changed']
+    deferred_es_handler.flush()
+    data = socket_data(socket)[0]
+    assert data['message'] == "TEST ['first', 'second']"
+
+
+def test_deferred_exception(deferred_es_handler, socket):
+    try:
+        raise ValueError('test')
+    except ValueError:
+        record = logging.makeLogRecord({'msg': 'TEST',
+                                        'exc_info': sys.exc_info()})
+    deferred_es_handler.emit(record)
+    deferred_es_handler.flush()
+    data = socket_data(socket)[0]
+    assert 'ValueError' in data['exc_class']
+    assert 'raise ValueError' in data['traceback']
+
+
+def test_deferred_size_estimate(deferred_es_handler, socket):
+    for i in range(3):
+        deferred_es_handler.emit(_make_record("TEST{0}".format(i)))
+    deferred_es_handler.flush()
+    assert _all_messages(socket) == ["TEST0", "TEST1", "TEST2"]
+    assert 0 < deferred_es_handler._message_size < 1000
+
+
+def test_deferred_threaded(socket):
+    from pysllo.formatters.json_formatter import JsonFormatter
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    handler = ElasticSearchUDPHandler([('localhost', 9000)], limit=1000,
+                                      threaded=True, deferred=True)
+    handler._connection = socket
+    handler.setFormatter(JsonFormatter(limit=1000))
+    for i in range(5):
+        handler.emit(_make_record("TEST{0}".format(i)))
+    handler.close()
+    messages = _all_messages(socket)
+    assert messages == ["TEST{0}".format(i) for i in range(5)]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 2),
+                    reason='concurrent.futures is required')
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_deferred_executor(socket, pool):
+    from concurrent import futures
+    from pysllo.formatters.json_formatter import JsonFormatter
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    if pool == 'thread':
+        executor = futures.ThreadPoolExecutor(2)
+    else:
+        executor = futures.ProcessPoolExecutor(2)
+    handler = ElasticSearchUDPHandler([('localhost', 9000)], limit=100000,
+                                      deferred=True, executor=executor)
+    handler._connection = socket
+    handler.setFormatter(JsonFormatter(limit=100000))
+    with executor:
+        for i in range(1200):
+            handler.emit(_make_record("TEST{0}".format(i)))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            handler.flush()
+    messages = _all_messages(socket)
+    assert messages == ["TEST{0}".format(i) for i in range(1200)]
+
+
+def test_deferred_executor_fallback(socket):
+    from pysllo.formatters.json_formatter import JsonFormatter
+    from pysllo.handlers import ElasticSearchUDPHandler
+
+    class BrokenExecutor(object):
+        def map(self, func, chunks):
+            raise RuntimeError('broken')
+
+    handler = ElasticSearchUDPHandler([('localhost', 9000)], limit=1000,
+                                      deferred=True,
+                                      executor=BrokenExecutor())
+    handler._connection = socket
+    handler.setFormatter(JsonFormatter(limit=1000))
+    handler.emit(_make_record("TEST"))
+    with pytest.warns(UserWarning):
+        handler.flush()
+    assert _all_messages(socket) == ["TEST"]
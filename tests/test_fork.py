@@ -0,0 +1,172 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+
+import pytest
+
+from pysllo.formatters import BinaryFormatter, JsonFormatter
+from pysllo.handlers import ElasticSearchUDPHandler, \
+    ElasticSearchAggregatorHandler, LogShipper
+from pysllo.utils.binary_codec import iter_frames
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'register_at_fork'),
+                                reason='fork hooks are not available')
+
+
+@pytest.fixture()
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(5)
+    yield sock
+    sock.close()
+
+
+def _messages(sock, count):
+    result = []
+    datagrams = 0
+    while len(result) < count:
+        lines = sock.recv(65535).decode('utf-8').split('\n')
+        datagrams += 1
+        result.extend(json.loads(doc)['message']
+                      for doc in [l for l in lines if l][1::2])
+    return result, datagrams
+
+
+def _logger(name, handler):
+    log = logging.getLogger(name)
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    log.addHandler(handler)
+    return log
+
+
+def _wait_child(pid):
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_child_doesnt_send_parent_buffer(receiver):
+    handler = ElasticSearchUDPHandler([receiver.getsockname()])
+    handler.setFormatter(JsonFormatter())
+    log = _logger('fork_test', handler)
+    try:
+        log.info('parent')
+        # socket of parent is open before fork
+        handler._connection._socket_for(receiver.getsockname())
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            code = 1
+            try:
+                if len(handler._buffer) == 0 and \
+                        not handler._connection._sockets:
+                    log.info('child')
+                    handler.flush()
+                    code = 0
+            finally:
+                os._exit(code)
+        _wait_child(pid)
+        handler.flush()
+        messages, _ = _messages(receiver, 2)
+        assert sorted(messages) == ['child', 'parent']
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+
+
+def test_child_has_own_flusher(receiver):
+    handler = ElasticSearchUDPHandler([receiver.getsockname()],
+                                      threaded=True)
+    handler.setFormatter(JsonFormatter())
+    log = _logger('fork_threaded_test', handler)
+    try:
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            code = 1
+            try:
+                log.info('child')
+                handler.flush()
+                if handler._flusher.is_alive():
+                    code = 0
+            finally:
+                os._exit(code)
+        _wait_child(pid)
+        assert _messages(receiver, 1)[0] == ['child']
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+
+
+def _worker(shipper, number):
+    handler = ElasticSearchAggregatorHandler(shipper)
+    handler.setFormatter(JsonFormatter())
+    log = _logger('aggregator_worker', handler)
+    for i in range(20):
+        log.info('worker %s message %s', number, i)
+
+
+def test_aggregator_builds_full_batches(receiver):
+    context = multiprocessing.get_context('fork')
+    shipper = LogShipper(ElasticSearchUDPHandler, [receiver.getsockname()],
+                         limit=9000)
+    shipper.start()
+    workers = [context.Process(target=_worker, args=(shipper, i))
+               for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    shipper.stop(timeout=10)
+
+    messages, datagrams = _messages(receiver, 80)
+    assert sorted(messages) == sorted(
+        'worker {0} message {1}'.format(n, i)
+        for n in range(4) for i in range(20))
+    assert datagrams < 20
+
+
+def test_aggregator_passes_binary_frames(receiver):
+    shipper = LogShipper(ElasticSearchUDPHandler, [receiver.getsockname()])
+    shipper.start()
+    handler = ElasticSearchAggregatorHandler(shipper)
+    handler.setFormatter(BinaryFormatter())
+    log = _logger('aggregator_binary', handler)
+    try:
+        log.info('binary frame')
+    finally:
+        log.removeHandler(handler)
+        shipper.stop(timeout=10)
+    frames = list(iter_frames(receiver.recv(65535)))
+    assert [doc['message'] for _, doc in frames] == ['binary frame']
+
+
+class BrokenHandler(logging.Handler):
+
+    def __init__(self):
+        raise RuntimeError('broken')
+
+
+class ErrorHandler(ElasticSearchAggregatorHandler):
+
+    errors = 0
+
+    def handleError(self, record):
+        self.errors += 1
+
+
+def test_dead_shipper_is_reported():
+    shipper = LogShipper(BrokenHandler)
+    shipper.start()
+    shipper._process.join(10)
+    handler = ErrorHandler(shipper)
+    handler.setFormatter(JsonFormatter())
+    log = _logger('dead_shipper', handler)
+    try:
+        log.info('lost')
+        assert handler.errors == 1
+    finally:
+        log.removeHandler(handler)
+        shipper.stop(timeout=10)
@@ -0,0 +1,72 @@
+import logging
+import warnings
+
+import pytest
+
+from pysllo.formatters.json_formatter import JsonFormatter
+from pysllo.handlers import ElasticSearchHTTPHandler
+from tests.utils import BulkHTTPServer
+
+
+@pytest.fixture()
+def server(request):
+    bulk_server = BulkHTTPServer()
+    request.addfinalizer(bulk_server.close)
+    return bulk_server
+
+
+@pytest.fixture()
+def http_handler(request, server):
+    handler = ElasticSearchHTTPHandler([server.address], limit=1000,
+                                       pool_size=2)
+    handler.setFormatter(JsonFormatter(limit=1000))
+    request.addfinalizer(handler.close)
+    return handler
+
+
+def _make_record(msg, **kwargs):
+    data = {'msg': msg, 'levelname': 'DEBUG'}
+    data.update(kwargs)
+    return logging.makeLogRecord(data)
+
+
+def test_bulk_request(http_handler, server):
+    msg = "TEST"
+    http_handler.emit(_make_record(msg))
+    http_handler.flush()
+    data = server.documents()
+    assert len(data) == 1
+    assert data[0]['message'] == msg
+    assert http_handler.sent_items == 1
+    assert http_handler.failed_items == 0
+
+
+def test_many_bulk_requests_reuse_connections(http_handler, server):
+    for i in range(200):
+        http_handler.emit(_make_record("TEST{0}".format(i)))
+    http_handler.flush()
+    messages = sorted(d['message'] for d in server.documents())
+    assert messages == sorted("TEST{0}".format(i) for i in range(200))
+    assert len(server.bodies) > 2
+    assert len(server.clients) <= 2
+    assert http_handler.sent_items == 200
+
+
+def test_rejected_items(http_handler, server):
+    http_handler.emit(_make_record("TEST1"))
+    http_handler.emit(_make_record("TEST2", reject=True))
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        http_handler.flush()
+    assert http_handler.sent_items == 1
+    assert http_handler.failed_items == 1
+    assert any('mapper_parsing_exception' in str(w.message) for w in caught)
+
+
+def test_close_sends_buffer(server):
+    handler = ElasticSearchHTTPHandler([server.address])
+    handler.setFormatter(JsonFormatter())
+    handler.emit(_make_record("TEST"))
+    handler.close()
+    handler.close()
+    assert [d['message'] for d in server.documents()] == ["TEST"]
@@ -0,0 +1,183 @@
+# coding:utf-8
+
+import collections
+import datetime
+import decimal
+import enum
+import logging
+import re
+import uuid
+
+import pytest
+
+from pysllo.formatters import JsonFormatter
+from pysllo.utils.json_encoder import ConverterRegistry, \
+    LoggingJSONEncoder, StdlibBackend, available_backends, get_backend
+
+Point = collections.namedtuple('Point', 'x y')
+
+
+class Color(enum.Enum):
+    red = 'RED'
+    rgb = (1, 2, 3)
+
+
+class Money(object):
+
+    def __init__(self, amount):
+        self.amount = amount
+
+    def __json__(self):
+        return {'amount': self.amount}
+
+
+class Opaque(object):
+
+    def __repr__(self):
+        return '<Opaque>'
+
+
+CONFORMANCE_CASES = [
+    None, True, False, 0, -1, 2 ** 70, 1.0, 0.1, -0.0, 1e100, 1.5e-7,
+    float('nan'), float('inf'), float('-inf'),
+    '', 'ascii', u'zażółć gęślą jaźń', u'  ', u'😀',
+    '"quoted" \\ back/slash', '\x00\x1f\t\n\r\x7f',
+    [], {}, [1, [2, [3]]], (1, 2), Point(1, 2),
+    {'b': 1, 'a': 2}, {1: 'int'}, {2.5: 'float'}, {True: 'bool'},
+    {None: 'none'},
+    {'nested': {'list': [{'a': None}]}},
+    datetime.datetime(2010, 10, 10, 10, 10, 10, 123),
+    datetime.date(2010, 10, 10),
+    {'when': datetime.datetime(2016, 1, 1)},
+    decimal.Decimal('1.5'), uuid.UUID(int=1), Color.red, Color.rgb,
+    set([1]), frozenset(['a']), b'bytes', b'\xff', Money(10),
+    {'opaque': Opaque()}, [Money(decimal.Decimal('0.1'))],
+]
+
+UNSERIALIZABLE_CASES = [
+    {(1, 2): 'tuple key'},
+]
+
+CONVERTED_CASES = [
+    (decimal.Decimal('1.5'), '"1.5"'),
+    (uuid.UUID(int=1), '"00000000-0000-0000-0000-000000000001"'),
+    (Color.red, '"RED"'),
+    (Color.rgb, '[1, 2, 3]'),
+    (set([1]), '[1]'),
+    (b'bytes', '"bytes"'),
+    (b'\xff', '"\\ufffd"'),
+    (Money(10), '{"amount": 10}'),
+    (Opaque(), '"<Opaque>"'),
+]
+
+reference = LoggingJSONEncoder()
+
+
+@pytest.fixture(params=available_backends())
+def backend(request):
+    return get_backend(request.param)
+
+
+@pytest.mark.parametrize('value', CONFORMANCE_CASES)
+def test_conformance(backend, value):
+    assert backend.encode(value) == reference.encode(value)
+
+
+@pytest.mark.parametrize('value', UNSERIALIZABLE_CASES)
+def test_unserializable(backend, value):
+    with pytest.raises(TypeError):
+        backend.encode(value)
+
+
+@pytest.mark.parametrize('value,expected', CONVERTED_CASES)
+def test_converters(backend, value, expected):
+    assert backend.encode(value) == expected
+
+
+def test_dataclass(backend):
+    dataclasses = pytest.importorskip('dataclasses')
+
+    @dataclasses.dataclass
+    class User(object):
+        name: str
+        tags: set
+
+    assert backend.encode(User('bob', set(['admin']))) == \
+        '{"name": "bob", "tags": ["admin"]}'
+
+
+def test_registry_cache_and_subclasses():
+    calls = []
+
+    class Base(object):
+        pass
+
+    class Child(Base):
+        pass
+
+    def convert(obj):
+        calls.append(obj)
+        return 'base'
+
+    registry = ConverterRegistry()
+    registry.register(Base, convert)
+    encoder = StdlibBackend(registry)
+    assert encoder.encode([Base(), Child()]) == '["base", "base"]'
+    assert registry.lookup(Child) is convert
+    assert Child in registry._cache
+    registry.register(Child, lambda obj: 'child')
+    assert encoder.encode(Child()) == '"child"'
+    assert len(calls) == 2
+
+
+def test_registry_fallback():
+    def reject(obj):
+        raise TypeError('rejected')
+
+    registry = ConverterRegistry(fallback=reject)
+    with pytest.warns(UserWarning):
+        with pytest.raises(TypeError):
+            StdlibBackend(registry).encode(Opaque())
+
+
+def _stable(message):
+    message = re.sub(r'"_id": "[^"]*"', '"_id": ""', message)
+    return re.sub(r'"@timestamp": "[^"]*"', '"@timestamp": ""', message)
+
+
+def test_formatter_output(backend):
+    record = logging.makeLogRecord({
+        'msg': u'user %s', 'args': (u'łukasz',), 'when': datetime.date.today(),
+        'tags': ('a', 'b'), 'score': 0.1})
+    expected = JsonFormatter(limit=1000, backend=StdlibBackend())
+    formatter = JsonFormatter(limit=1000, backend=backend)
+    assert _stable(formatter.format(record)) == \
+        _stable(expected.format(record))
+
+
+def test_formatter_unserializable(backend):
+    record = logging.makeLogRecord({'msg': 'TEST', 'obj': {(1, 2): 'key'}})
+    formatter = JsonFormatter(limit=1000, backend=backend)
+    with pytest.warns(UserWarning):
+        assert '"error": "unable to serialize"' in formatter.format(record)
+
+
+def test_formatter_converts_field(backend):
+    record = logging.makeLogRecord({'msg': 'TEST', 'obj': Opaque(),
+                                    'price': decimal.Decimal('9.99')})
+    formatter = JsonFormatter(limit=1000, backend=backend)
+    result = formatter.format(record)
+    assert '"obj": "<Opaque>"' in result
+    assert '"price": "9.99"' in result
+    assert '"message": "TEST"' in result
+
+
+def test_automatic_choice():
+    assert get_backend().is_accelerated() or \
+        not any(get_backend(name).is_accelerated()
+                for name in available_backends())
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend('orjson')
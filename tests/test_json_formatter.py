@@ -1,10 +1,13 @@
 # coding:utf-8
 
 import pytest
+import json
 import logging
 import datetime
+import sys
 
 from pysllo.formatters.json_formatter import JsonFormatter
+from pysllo.formatters.field_plan import FieldPlan
 
 
 @pytest.fixture()
@@ -58,7 +61,8 @@ def test_msg_with_unserializable_obj(formatter):
     record = logging.makeLogRecord({'msg': msg, 'obj': test_obj})
     with pytest.warns(UserWarning):
         result = formatter.format(record)
-    assert '"error": "unable to serialize"' in result
+    assert '"obj": "<' in result
+    assert '"message": "TEST"' in result
 
 
 def test_msg_with_bad_formatting(formatter):
@@ -86,3 +90,182 @@ def test_skipping_msg(formatter):
     result = formatter.format(record)
 
     assert result == ''
+
+
+def _documents(message):
+    index, doc = [json.loads(line) for line in message.split('\n') if line]
+    del index['index']['_id']
+    del doc['@timestamp']
+    return index, doc
+
+
+def test_default_plan_makes_the_same_documents(formatter):
+    planned = JsonFormatter(name='test', limit=1000, plan=FieldPlan())
+    record = logging.makeLogRecord({'msg': 'TEST %s', 'args': ('arg',),
+                                    'user': 'john', 'exc_info': None})
+    assert _documents(planned.format(record)) == \
+        _documents(formatter.format(record))
+
+
+def test_plan_fields_rename_and_static():
+    plan = FieldPlan(fields=['name', 'levelname', 'message'],
+                     rename={'levelname': 'level', 'user': 'user_name',
+                             '@timestamp': 'time'},
+                     static={'service': 'billing', 'user_name': 'nobody'})
+    formatter = JsonFormatter(name='test', limit=1000, plan=plan)
+    record = logging.makeLogRecord({'name': 'app', 'levelname': 'INFO',
+                                    'msg': 'TEST %s', 'args': (1,),
+                                    'user': 'john'})
+    doc = json.loads(formatter.format(record).split('\n')[1])
+    assert 'time' in doc
+    del doc['time']
+    assert doc == {'service': 'billing', 'name': 'app', 'level': 'INFO',
+                   'message': 'TEST 1', 'user_name': 'john'}
+
+
+def test_plan_with_exception():
+    formatter = JsonFormatter(name='test', limit=1000, plan=FieldPlan())
+    try:
+        raise ValueError
+    except ValueError:
+        record = logging.makeLogRecord({'exc_info': sys.exc_info()})
+    result = formatter.format(record)
+    assert '"exc_class": "{0}"'.format(ValueError) in result
+    assert 'exc_info' not in result
+
+
+def test_plan_truncates_renamed_message():
+    plan = FieldPlan(rename={'message': 'text'})
+    formatter = JsonFormatter(name='test', limit=1000, plan=plan)
+    record = logging.makeLogRecord({'msg': 'TEST' * 1000})
+    doc = json.loads(formatter.format(record).split('\n')[1])
+    assert doc['ES_MTL'] is True
+    assert len(doc['text']) < 1000
+
+
+def test_plan_validation():
+    with pytest.raises(ValueError):
+        FieldPlan(fields=['name', 'user'])
+    with pytest.raises(ValueError):
+        FieldPlan(rename={'exc_info': 'error'})
+
+
+def test_timestamp_from_record_creation(formatter):
+    record = logging.makeLogRecord({'msg': 'TEST'})
+    record.created = 1262304000.25  # 2010-01-01 00:00:00.25 UTC
+    doc = json.loads(formatter.format(record).split('\n')[1])
+    assert doc['@timestamp'] == '2010-01-01T00:00:00.250000Z'
+
+
+def test_format_timestamp():
+    from pysllo.utils.timestamp import format_timestamp
+    assert format_timestamp(0) == '1970-01-01T00:00:00.000000Z'
+    assert format_timestamp(59.5) == '1970-01-01T00:00:59.500000Z'
+    assert format_timestamp(60.000001) == '1970-01-01T00:01:00.000001Z'
+    assert format_timestamp(-0.5) == '1969-12-31T23:59:59.500000Z'
+
+
+def test_index_header_follows_record_day(formatter):
+    import time
+    today = time.time()
+    yesterday = today - 24 * 3600
+    headers = []
+    for created in (today, today, yesterday):
+        record = logging.makeLogRecord({'msg': 'TEST'})
+        record.created = created
+        headers.append(json.loads(formatter.format(record).split('\n')[0]))
+    assert headers[0]['index']['_index'] == formatter.index()
+    assert headers[0]['index']['_type'] == 'test'
+    assert headers[0]['index']['_id'] != headers[1]['index']['_id']
+    assert headers[2]['index']['_index'] == 'test-' + time.strftime(
+        '%Y-%m-%d', time.localtime(yesterday))
+
+
+def _size(message):
+    return len(message.encode('utf-8'))
+
+
+def test_truncation_is_byte_exact(formatter):
+    record = logging.makeLogRecord({'message': 'TEST' * 1000})
+    result = formatter.format(record)
+    assert _size(result) == 1000
+    doc = json.loads(result.split('\n')[1])
+    assert doc['ES_MTL'] is True
+    assert ('TEST' * 1000).startswith(doc['message'])
+    assert formatter.truncated == 1
+
+
+@pytest.mark.parametrize('text', [u'łążćóń', u'😀x', u'"\\\n'])
+def test_truncation_of_escaped_characters(formatter, text):
+    record = logging.makeLogRecord({'message': text * 1000})
+    result = formatter.format(record)
+    assert 1000 - 12 < _size(result) <= 1000
+    doc = json.loads(result.split('\n')[1])
+    assert (text * 1000).startswith(doc['message'])
+
+
+def test_truncation_of_many_fields():
+    formatter = JsonFormatter(name='test', limit=1000,
+                              truncate=['message', 'context'])
+    record = logging.makeLogRecord({'message': 'm' * 600,
+                                    'context': 'c' * 900})
+    result = formatter.format(record)
+    assert _size(result) == 1000
+    doc = json.loads(result.split('\n')[1])
+    assert doc['message'] == 'm' * 600
+    assert doc['context'] == 'c' * len(doc['context'])
+
+
+def test_truncation_of_traceback(formatter):
+    # two functions make frames that aren't collapsed in traceback
+    def first(depth):
+        if depth:
+            second(depth - 1)
+        raise ValueError('deep')
+
+    def second(depth):
+        first(depth)
+
+    try:
+        first(20)
+    except ValueError:
+        record = logging.makeLogRecord({'msg': 'TEST',
+                                        'exc_info': sys.exc_info()})
+    result = formatter.format(record)
+    assert _size(result) == 1000
+    doc = json.loads(result.split('\n')[1])
+    assert doc['message'] == 'TEST'
+    assert doc['traceback'].startswith('  File')
+
+
+def test_not_truncated_message_is_not_counted(formatter):
+    formatter.format(logging.makeLogRecord({'msg': 'TEST'}))
+    assert formatter.truncated == 0
+
+
+def test_snapshot_formats_like_record():
+    formatter = JsonFormatter(limit=1000, doc_id='none')
+    record = logging.makeLogRecord({'msg': 'TEST %s', 'args': ('arg', )})
+    snapshot = formatter.snapshot(record)
+    assert formatter.format_snapshot(snapshot) == formatter.format(record)
+
+
+def test_snapshot_can_be_pickled(formatter):
+    import pickle
+    try:
+        raise ValueError('test')
+    except ValueError:
+        record = logging.makeLogRecord({'msg': 'TEST',
+                                        'exc_info': sys.exc_info()})
+    snapshot = pickle.loads(pickle.dumps(formatter.snapshot(record)))
+    formatter = pickle.loads(pickle.dumps(formatter))
+    data = json.loads(formatter.format_snapshot(snapshot).split('\n')[1])
+    assert 'ValueError' in data['exc_class']
+
+
+def test_format_batch_skips_loggers(formatter):
+    records = [logging.makeLogRecord({'msg': 'TEST', 'name': name})
+               for name in ('app', 'elasticsearch', 'app')]
+    snapshots = [formatter.snapshot(record) for record in records]
+    assert snapshots[1] is None
+    assert len(formatter.format_batch(snapshots)) == 2
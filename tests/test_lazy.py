@@ -0,0 +1,104 @@
+import json
+import logging
+
+from pysllo.formatters.binary_formatter import BinaryFormatter
+from pysllo.formatters.json_formatter import JsonFormatter
+from pysllo.utils import Lazy
+from pysllo.utils.binary_codec import iter_frames
+
+
+class Counter(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def _document(message):
+    return json.loads(message.split('\n')[1])
+
+
+def teardown_function(function):
+    from pysllo.loggers import StructuredLogger
+    StructuredLogger.unbind()
+
+
+def test_value_is_computed_once_per_record():
+    counter = Counter()
+    formatter = JsonFormatter()
+    record = logging.makeLogRecord({'msg': 'TEST', 'calls': Lazy(counter)})
+    assert _document(formatter.format(record))['calls'] == 1
+    assert _document(formatter.format(record))['calls'] == 2
+    assert counter.calls == 2
+
+
+def test_memoized_value_is_computed_once():
+    counter = Counter()
+    formatter = JsonFormatter()
+    value = Lazy(counter, memoize=True)
+    for _ in range(3):
+        record = logging.makeLogRecord({'msg': 'TEST', 'calls': value})
+        assert _document(formatter.format(record))['calls'] == 1
+    assert counter.calls == 1
+
+
+def test_nested_value_is_computed():
+    formatter = JsonFormatter()
+    record = logging.makeLogRecord(
+        {'msg': 'TEST', 'values': [Lazy(lambda: 'nested')]})
+    assert _document(formatter.format(record))['values'] == ['nested']
+
+
+def test_failed_value_is_described():
+    def fail():
+        raise ValueError('broken')
+
+    formatter = JsonFormatter()
+    record = logging.makeLogRecord({'msg': 'TEST', 'value': Lazy(fail)})
+    value = _document(formatter.format(record))['value']
+    assert 'lazy value failed' in value
+    assert 'broken' in value
+
+
+def test_snapshot_has_computed_value():
+    formatter = JsonFormatter()
+    record = logging.makeLogRecord({'msg': 'TEST', 'value': Lazy(list)})
+    _, data, _ = formatter.snapshot(record)
+    assert data['value'] == []
+
+
+def test_binary_formatter_computes_value():
+    formatter = BinaryFormatter()
+    record = logging.makeLogRecord({'msg': 'TEST', 'value': Lazy(lambda: 7)})
+    _, document = next(iter_frames(formatter.format(record)))
+    assert document['value'] == 7
+
+
+def test_standard_formatter_uses_value():
+    formatter = logging.Formatter('%(value)s')
+    record = logging.makeLogRecord({'msg': 'TEST', 'value': Lazy(lambda: 7)})
+    assert formatter.format(record) == '7'
+
+
+def test_filtered_record_doesnt_compute_value(structured_logger, handler):
+    counter = Counter()
+    structured_logger.setLevel(logging.INFO)
+    structured_logger.bind(bound=Lazy(counter))
+    structured_logger.debug('TEST', value=Lazy(counter))
+    assert counter.calls == 0
+    assert len(handler) == 0
+
+
+def test_bound_value_is_computed_by_formatter(structured_logger, handler):
+    counter = Counter()
+    formatter = JsonFormatter()
+    structured_logger.bind(calls=Lazy(counter))
+    structured_logger.info('TEST')
+    structured_logger.info('TEST')
+    assert counter.calls == 0
+    documents = [_document(formatter.format(record))
+                 for record in handler._records]
+    assert [document['calls'] for document in documents] == [1, 2]
@@ -75,3 +75,89 @@ def test_mixed_logger_with_handler(es_handler, socket):
     assert data['TEST'] == 'TEST'
     assert 'TEST1' in data
     assert data['TEST1'] == 'TEST'
+
+
+def _all_mixed_loggers():
+    for structured in (False, True):
+        for propagation in (False, True):
+            for tracking in (False, True):
+                yield LoggersFactory.make(structured_logger=structured,
+                                          propagation_logger=propagation,
+                                          tracking_logger=tracking)
+
+
+def test_disabled_level_skips_extra(monkeypatch):
+    calls = []
+    original = loggers.StructuredLogger._proper_extra
+
+    def proper_extra(self, kwargs):
+        calls.append(kwargs)
+        return original(self, kwargs)
+
+    monkeypatch.setattr(loggers.StructuredLogger, '_proper_extra',
+                        proper_extra)
+    for MixedLogger in _all_mixed_loggers():
+        logger = MixedLogger('test')
+        logger.setLevel(logging.INFO)
+        logger.debug('TEST %s', 1, TEST='TEST')
+        logger.log(logging.DEBUG, 'TEST', TEST='TEST')
+    assert calls == []
+
+
+def test_tracked_structured_logs(handler):
+    MixedLogger = LoggersFactory.make(tracking_logger=True,
+                                      structured_logger=True)
+    logger = MixedLogger('test')
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        with logger.trace:
+            logger.debug('TEST', TEST='TEST')
+            raise ValueError
+    except ValueError:
+        pass
+    record = handler.pop()
+    assert record.msg == 'TEST'
+    assert record.TEST == 'TEST'
+    logger.debug('TEST')
+    assert len(handler) == 0
+
+
+def test_tracked_view_logs(handler):
+    MixedLogger = LoggersFactory.make(tracking_logger=True,
+                                      structured_logger=True)
+    logger = MixedLogger('test')
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    logger.propagate = False
+    view = logger.new(component='db')
+    try:
+        with logger.trace:
+            view.debug('TEST', TEST='TEST')
+            raise ValueError
+    except ValueError:
+        pass
+    record = handler.pop()
+    assert record.component == 'db'
+    assert record.TEST == 'TEST'
+
+
+def test_tracked_logs_keep_bound_context(handler):
+    MixedLogger = LoggersFactory.make(tracking_logger=True,
+                                      structured_logger=True)
+    logger = MixedLogger('test')
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        with logger.trace:
+            with logger.bound(request_id='r1'):
+                logger.debug('TEST')
+            raise ValueError
+    except ValueError:
+        pass
+    record = handler.pop()
+    assert record.msg == 'TEST'
+    assert record.request_id == 'r1'
+    assert 'request_id' not in logger
@@ -126,3 +126,16 @@ def test_forcing_level_with_too_many_args(propagation_logger, handler):
     with pytest.raises(TypeError) as exc_info:
         propagation_logger.force_level(logging.DEBUG, logging.DEBUG)
     assert '2 given' in str(exc_info.value)
+
+
+def test_disabled_logger_ignores_cached_level(propagation_logger, handler):
+    propagation_logger.setLevel(logging.INFO)
+    assert propagation_logger.isEnabledFor(logging.INFO)
+    propagation_logger.disabled = True
+    try:
+        propagation_logger.info("TEST")
+        assert not propagation_logger.isEnabledFor(logging.INFO)
+        with pytest.raises(IndexError):
+            handler.pop()
+    finally:
+        propagation_logger.disabled = False
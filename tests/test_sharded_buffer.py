@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from pysllo.utils.sharded_buffer import ShardedBuffer
+
+
+@pytest.fixture()
+def buffer():
+    return ShardedBuffer(shards=4)
+
+
+def test_append_and_drain(buffer):
+    buffer.append('TEST1', 5)
+    buffer.append('TEST2', 5)
+    assert buffer.size == 10
+    assert len(buffer) == 2
+    assert buffer.drain() == ['TEST1', 'TEST2']
+    assert buffer.size == 0
+    assert buffer.drain() == []
+
+
+def test_append_from_many_threads(buffer):
+    def worker(n):
+        for i in range(100):
+            buffer.append((n, i), 1)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert buffer.size == 800
+    data = buffer.drain()
+    assert sorted(data) == sorted((n, i) for n in range(8) for i in range(100))
+    for n in range(8):
+        # order of messages from one thread is kept
+        assert [i for m, i in data if m == n] == list(range(100))
@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+import pytest
+
+from pysllo.formatters import JsonFormatter
+from pysllo.handlers import ElasticSearchStreamHandler
+from pysllo.utils.backup_store import SegmentedBackupStore
+from pysllo.utils.stream_buffer import StreamBuffer
+from tests.utils import StreamReceiver
+
+
+@pytest.fixture()
+def receiver():
+    server = StreamReceiver()
+    yield server
+    server.close()
+
+
+@pytest.fixture()
+def unix_receiver():
+    path = tempfile.mkdtemp()
+    server = StreamReceiver(os.path.join(path, 'shipper.sock'))
+    yield server
+    server.close()
+    shutil.rmtree(path)
+
+
+def _free_address():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    address = sock.getsockname()
+    sock.close()
+    return address
+
+
+def test_tcp_newline_framing(receiver):
+    stream = StreamBuffer([receiver.address])
+    assert stream.send(['first', b'second\n', u'trzeci ą']) == 0
+    assert receiver.lines(3) == [b'first', b'second',
+                                 u'trzeci ą'.encode('utf-8')]
+    stream.close()
+
+
+def test_unix_socket(unix_receiver):
+    stream = StreamBuffer([unix_receiver.address])
+    stream.send(['first'])
+    stream.send(['second'])
+    assert unix_receiver.lines(2) == [b'first', b'second']
+    assert unix_receiver.connections == 1
+    stream.close()
+
+
+def test_retry_queue_and_backoff():
+    address = _free_address()
+    stream = StreamBuffer([address], backoff=60, max_backoff=120)
+    assert stream.send(['first']) == 1
+    assert stream.send(['second']) == 2
+    # second call waits for backoff, it doesn't try to connect
+    assert stream._failures == 1
+    assert stream._next_attempt > time.time() + 25
+
+
+def test_backoff_grows_and_is_limited():
+    stream = StreamBuffer([_free_address()], backoff=1, max_backoff=4)
+    delays = []
+    for _ in range(5):
+        stream._next_attempt = 0
+        stream.send(['msg'])
+        delays.append(stream._next_attempt - time.time())
+    assert 0.4 < delays[0] <= 1
+    assert 1.9 < delays[2] <= 4
+    assert 1.9 < delays[4] <= 4
+
+
+def test_retry_queue_is_bounded():
+    stream = StreamBuffer([_free_address()], retry_limit=3, backoff=60)
+    stream.send(['1', '2'])
+    assert stream.send(['3', '4', '5']) == 3
+    assert stream.dropped == 2
+    assert list(stream._pending) == [b'3\n', b'4\n', b'5\n']
+
+
+def test_failover_to_next_connection(receiver):
+    address = _free_address()
+    stream = StreamBuffer([address, receiver.address], backoff=60)
+    assert stream.send(['first']) == 0
+    assert stream.send(['second']) == 0
+    assert receiver.lines(2) == [b'first', b'second']
+    assert stream._balancer.endpoints[0].failures == 1
+    assert not stream._balancer.endpoints[0].is_available()
+
+
+def test_reconnect_sends_waiting_messages(unix_receiver):
+    path = unix_receiver.address + '.late'
+    stream = StreamBuffer([path], backoff=0)
+    assert stream.send(['first']) == 1
+    late = StreamReceiver(path)
+    try:
+        assert stream.send(['second']) == 0
+        assert late.lines(2) == [b'first', b'second']
+    finally:
+        late.close()
+
+
+def test_reconnect_after_server_closed_connection(receiver):
+    stream = StreamBuffer([receiver.address], backoff=0)
+    stream.send(['first'])
+    assert receiver.lines(1) == [b'first']
+    receiver.drop_client()
+    # peer reset is noticed by one of next writes
+    for i in range(50):
+        if stream.send(['msg']) and stream._socket is None:
+            break
+        time.sleep(0.01)
+    assert stream.send(['last']) == 0
+    lines = receiver.lines(1)
+    while lines[-1] != b'last':
+        lines = receiver.lines(1)
+    assert receiver.connections == 2
+
+
+def test_handler(receiver):
+    handler = ElasticSearchStreamHandler([receiver.address], limit=10000)
+    handler.setFormatter(JsonFormatter())
+    log = logging.getLogger('stream_handler_test')
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        log.error('TEST %s', 1)
+        log.error('TEST %s', 2)
+        handler.flush()
+        lines = receiver.lines(4)
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+    assert [json.loads(l)['message'] for l in lines[1::2]] == \
+        ['TEST 1', 'TEST 2']
+
+
+def test_handler_acknowledges_after_retry_queue_is_sent(unix_receiver):
+    path = tempfile.mkdtemp()
+    store = SegmentedBackupStore(path)
+    address = unix_receiver.address + '.late'
+    handler = ElasticSearchStreamHandler([address], backoff=0)
+    handler.set_backup_store(store)
+    handler.enable_backup()
+    late = None
+    try:
+        handler._buffer.append('first', 5)
+        handler.flush()
+        assert len(store.unacknowledged()) == 1
+        late = StreamReceiver(address)
+        handler._buffer.append('second', 6)
+        handler.flush()
+        assert late.lines(2) == [b'first', b'second']
+        assert store.unacknowledged() == []
+    finally:
+        handler.close()
+        store.close()
+        shutil.rmtree(path)
+        if late is not None:
+            late.close()
+
+
+def test_flush_retries_waiting_messages(unix_receiver):
+    address = unix_receiver.address + '.late'
+    handler = ElasticSearchStreamHandler([address], backoff=0)
+    late = None
+    try:
+        handler._buffer.append('first', 5)
+        handler.flush()
+        assert handler._connection.pending == 1
+        late = StreamReceiver(address)
+        handler.flush()
+        assert late.lines(1) == [b'first']
+        assert handler._connection.pending == 0
+    finally:
+        handler.close()
+        if late is not None:
+            late.close()
+
+
+def test_close_makes_last_attempt(unix_receiver):
+    address = unix_receiver.address + '.late'
+    handler = ElasticSearchStreamHandler([address], backoff=60)
+    late = None
+    try:
+        handler._buffer.append('first', 5)
+        handler.flush()
+        late = StreamReceiver(address)
+        handler.close()
+        assert late.lines(1) == [b'first']
+        assert handler._connection.dropped == 0
+    finally:
+        if late is not None:
+            late.close()
+
+
+def test_close_counts_undelivered_messages_as_dropped():
+    handler = ElasticSearchStreamHandler([_free_address()], backoff=60)
+    handler._buffer.append('first', 5)
+    handler.flush()
+    handler.close()
+    assert handler._connection.pending == 0
+    assert handler._connection.dropped == 1
+
+
+def test_handler_doesnt_acknowledge_overflowed_batch(unix_receiver):
+    path = tempfile.mkdtemp()
+    store = SegmentedBackupStore(path)
+    address = unix_receiver.address + '.late'
+    handler = ElasticSearchStreamHandler(
+        [address], backoff=0, retry_limit=1)
+    handler.set_backup_store(store)
+    handler.enable_backup()
+    late = None
+    try:
+        handler._buffer.append('first', 5)
+        handler.flush()
+        late = StreamReceiver(address)
+        handler._buffer.append('second', 6)
+        handler.flush()
+        assert late.lines(1) == [b'second']
+        assert handler._connection.dropped == 1
+        assert len(store.unacknowledged()) == 1
+    finally:
+        handler.close()
+        store.close()
+        shutil.rmtree(path)
+        if late is not None:
+            late.close()
@@ -231,3 +231,94 @@ def test_level_exception_with_extra_args(structured_logger, handler):
     assert isinstance(e, record.exc_info[0])
     assert 'TEST' in record.__dict__
     assert record.TEST == 'TEST'
+
+
+def test_context_of_thread(structured_logger, handler):
+    import threading
+
+    structured_logger.unbind()
+    structured_logger.bind(user='main')
+    structured_logger.bind_global(service='test', user='global')
+    seen = {}
+
+    def worker():
+        seen['before'] = structured_logger.get('user')
+        seen['service'] = structured_logger.get('service')
+        structured_logger.bind(user='worker')
+        seen['after'] = structured_logger.get('user')
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen == {'before': 'global', 'service': 'test',
+                    'after': 'worker'}
+    assert structured_logger.get('user') == 'main'
+    assert structured_logger.get('service') == 'test'
+    structured_logger.unbind()
+    structured_logger.unbind_global()
+    assert 'service' not in structured_logger
+
+
+def test_unbind_unknown_keeps_context(structured_logger):
+    structured_logger.unbind()
+    structured_logger.bind(TEST='TEST')
+    with pytest.raises(KeyError):
+        structured_logger.unbind('TEST', 'MISSING')
+    assert 'TEST' in structured_logger
+    structured_logger.unbind()
+
+
+def test_bound_scope(structured_logger, handler):
+    structured_logger.unbind()
+    with structured_logger.bound(TEST='TEST'):
+        structured_logger.info('TEST')
+        assert 'TEST' in structured_logger
+    structured_logger.info('TEST')
+    assert 'TEST' not in handler.pop().__dict__
+    assert handler.pop().TEST == 'TEST'
+
+
+def test_view_fields(structured_logger, handler):
+    structured_logger.unbind()
+    view = structured_logger.new(component='db')
+    view.info('TEST', query='SELECT')
+    record = handler.pop()
+    assert record.component == 'db'
+    assert record.query == 'SELECT'
+    structured_logger.info('TEST')
+    assert 'component' not in handler.pop().__dict__
+    assert 'component' not in structured_logger
+
+
+def test_view_precedence(structured_logger, handler):
+    structured_logger.unbind()
+    view = structured_logger.with_fields(TEST='view', OTHER='view')
+    child = view.new(OTHER='child')
+    assert view.fields == {'TEST': 'view', 'OTHER': 'view'}
+    child.warning('TEST', TEST='call')
+    record = handler.pop()
+    assert (record.TEST, record.OTHER) == ('call', 'child')
+    with structured_logger.bound(TEST='context'):
+        view.error('TEST')
+        assert view.get('TEST') == 'context'
+    assert handler.pop().TEST == 'context'
+    assert view.get('TEST') == 'view'
+    assert view.get('MISSING', 'NO') == 'NO'
+    assert 'OTHER' in view
+
+
+def test_view_levels_and_exception(structured_logger, handler):
+    view = structured_logger.new(TEST='TEST')
+    structured_logger.setLevel(logging.INFO)
+    view.debug('TEST')
+    view.log(logging.DEBUG, 'TEST')
+    assert len(handler) == 0
+    try:
+        raise ValueError('test')
+    except ValueError:
+        view.exception('TEST')
+    record = handler.pop()
+    assert record.TEST == 'TEST'
+    assert record.exc_info[0] is ValueError
+    assert view.level == logging.INFO
+    assert view.logger is structured_logger
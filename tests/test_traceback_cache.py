@@ -0,0 +1,91 @@
+import json
+import logging
+import sys
+import time
+
+from pysllo.formatters.json_formatter import JsonFormatter
+from pysllo.utils.traceback_cache import TracebackCache
+
+
+def _fail(value):
+    raise ValueError(value)
+
+
+def _exc_info(value='test'):
+    try:
+        _fail(value)
+    except ValueError:
+        return sys.exc_info()
+
+
+def test_same_error_is_cached():
+    cache = TracebackCache()
+    first = cache.render(_exc_info('first'))
+    second = cache.render(_exc_info('second'))
+    assert first == second
+    assert 'raise ValueError(value)' in first['traceback']
+    assert 'ValueError' in first['exc_class']
+    assert cache.misses == 1
+    assert cache.hits == 1
+
+
+def test_other_location_has_other_fingerprint():
+    cache = TracebackCache()
+    first = cache.render(_exc_info())
+    try:
+        raise ValueError('test')
+    except ValueError:
+        second = cache.render(sys.exc_info())
+    assert first['exc_fingerprint'] != second['exc_fingerprint']
+    assert cache.misses == 2
+
+
+def test_lru_eviction():
+    cache = TracebackCache(size=2)
+    infos = []
+    for _ in range(3):
+        try:
+            raise ValueError('test')
+        except ValueError:
+            infos.append(sys.exc_info())
+    # every raise in loop has the same location
+    try:
+        raise KeyError('test')
+    except KeyError:
+        infos.append(sys.exc_info())
+    try:
+        raise IndexError('test')
+    except IndexError:
+        infos.append(sys.exc_info())
+    cache.render(infos[0])
+    cache.render(infos[3])
+    cache.render(infos[0])
+    cache.render(infos[4])
+    assert len(cache._entries) == 2
+    cache.render(infos[0])
+    assert cache.hits == 2
+    cache.render(infos[3])
+    assert cache.misses == 4
+
+
+def test_window_suppresses_repeated_tracebacks():
+    cache = TracebackCache(window=0.05)
+    assert 'traceback' in cache.render(_exc_info())
+    repeated = cache.render(_exc_info())
+    assert 'traceback' not in repeated
+    assert repeated['exc_fingerprint']
+    time.sleep(0.06)
+    assert 'traceback' in cache.render(_exc_info())
+
+
+def test_formatter_sends_fingerprint():
+    cache = TracebackCache(window=60)
+    formatter = JsonFormatter(limit=10000, traceback_cache=cache)
+    records = [logging.makeLogRecord({'msg': 'TEST',
+                                      'exc_info': _exc_info()})
+               for _ in range(2)]
+    first, second = [json.loads(formatter.format(record).split('\n')[1])
+                     for record in records]
+    assert first['exc_fingerprint'] == second['exc_fingerprint']
+    assert 'raise ValueError' in first['traceback']
+    assert 'traceback' not in second
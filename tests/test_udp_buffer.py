@@ -1,5 +1,8 @@
 import pytest
 
+from pysllo.utils import sendmmsg
+from tests.utils import connect_test_socket
+
 
 @pytest.fixture()
 def socket():
@@ -12,8 +15,7 @@ def buffer(socket):
     from pysllo.utils.udp_buffer import UDPBuffer
 
     udp = UDPBuffer([('localhost', 9700)])
-    udp._socket = socket
-    return udp
+    return connect_test_socket(udp, socket)
 
 
 @pytest.fixture()
@@ -21,15 +23,14 @@ def buffer_with_rounding(socket):
     from pysllo.utils.udp_buffer import UDPBuffer
 
     udp = UDPBuffer([('localhost', 9700), ('localhost', 9701)])
-    udp._socket = socket
-    return udp
+    return connect_test_socket(udp, socket)
 
 
 def test_simple_sending(socket, buffer):
     msg = "TEST"
-    buffer.send(msg)
+    buffer.send([msg])
     data, (host, port) = socket.pop_with_connection()
-    assert data == msg
+    assert data == msg.encode('utf-8')
     assert host == 'localhost'
     assert port == 9700
 
@@ -40,7 +41,8 @@ def test_too_long_message(socket, buffer):
     data = '123456789012345678901234567890'
     import sys
     assert sys.getsizeof(data, 0) > limit
-    buffer.send([data])
+    assert buffer.send([data]) == 1
+    assert buffer.dropped == 1
     with pytest.raises(IndexError):
         socket.pop_with_connection()
 
@@ -49,17 +51,17 @@ def test_rounded_connection(socket, buffer_with_rounding):
 
     msg1 = "TEST1"
     msg2 = "TEST2"
-    buffer_with_rounding.send(msg1)
-    buffer_with_rounding.send(msg2)
+    buffer_with_rounding.send([msg1])
+    buffer_with_rounding.send([msg2])
 
     data_2, (host_2, port_2) = socket.pop_with_connection()
     data_1, (host_1, port_1) = socket.pop_with_connection()
 
-    assert data_1 == msg1
+    assert data_1 == msg1.encode('utf-8')
     assert host_1 == 'localhost'
     assert port_1 == 9700
 
-    assert data_2 == msg2
+    assert data_2 == msg2.encode('utf-8')
     assert host_2 == 'localhost'
     assert port_2 == 9701
 
@@ -68,12 +70,89 @@ def test_over_udp_limit(socket, buffer):
     msg1 = "TEST1"
     msg2 = "TEST2"
 
-    import sys
-    buffer._limit = sys.getsizeof(msg1) + 1
+    buffer._limit = len(msg1) + 1
 
     buffer.send([msg1, msg2])
     data_2 = socket.pop_with_connection()[0]
     data_1 = socket.pop_with_connection()[0]
 
-    assert data_1 == msg1
-    assert data_2 == msg2
+    assert data_1 == msg1.encode('utf-8')
+    assert data_2 == msg2.encode('utf-8')
+
+
+def test_filling_datagrams(socket, buffer):
+    buffer._limit = 10
+
+    buffer.send(["TEST1", "TEST2", "TEST3"])
+    data_2 = socket.pop_with_connection()[0]
+    data_1 = socket.pop_with_connection()[0]
+
+    assert data_1 == b"TEST1TEST2"
+    assert data_2 == b"TEST3"
+
+
+def test_unicode_byte_length(socket, buffer):
+    msg = u"\u0142\u0105\u017c"
+    buffer._limit = len(msg.encode('utf-8'))
+
+    assert buffer.send([msg, msg]) == 0
+    data_2 = socket.pop_with_connection()[0]
+    data_1 = socket.pop_with_connection()[0]
+
+    assert data_1 == data_2 == msg.encode('utf-8')
+
+
+def test_arena_reused(socket, buffer):
+    buffer.send(["TEST1" * 10])
+    arena = buffer._arena
+    buffer.send(["TEST2"])
+
+    assert buffer._arena is arena
+    assert socket.pop_with_connection()[0] == b"TEST2"
+
+
+@pytest.fixture()
+def receiver(request):
+    import socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(1)
+    request.addfinalizer(sock.close)
+    return sock
+
+
+def _receive(sock, count):
+    return [sock.recvfrom(65535)[0] for _ in range(count)]
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_sending_to_local_receiver(receiver, batch):
+    from pysllo.utils.udp_buffer import UDPBuffer
+
+    udp = UDPBuffer([receiver.getsockname()], limit=10, batch=batch)
+    messages = ["TEST{0}".format(i) for i in range(10)]
+    udp.send(messages)
+
+    assert _receive(receiver, 5) == [
+        (messages[i] + messages[i + 1]).encode('utf-8')
+        for i in range(0, 10, 2)
+    ]
+
+
+@pytest.mark.skipif(not sendmmsg.is_available(),
+                    reason='sendmmsg is not available')
+def test_batch_sender(receiver):
+    import socket
+    from pysllo.utils.sendmmsg import BatchSender
+
+    sender = BatchSender(max_batch=2)
+    arena = bytearray(b"TEST1TEST2TEST3")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sent = sender.send(sock, arena, [(0, 5), (5, 10), (10, 15)],
+                           receiver.getsockname())
+    finally:
+        sock.close()
+
+    assert sent == 3
+    assert _receive(receiver, 3) == [b"TEST1", b"TEST2", b"TEST3"]
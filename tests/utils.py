@@ -1,5 +1,8 @@
 import logging
 import json
+import socket
+
+from pysllo.utils.compression import decompress
 
 
 class TestHandler(logging.Handler):
@@ -38,6 +41,9 @@ class TestSocket(object):
         self._records = []
 
     def sendto(self, data, connection):
+        if isinstance(data, memoryview):
+            # real socket copies data before sendto returns
+            data = data.tobytes()
         self._records.append((data, connection))
 
     def send(self, data):
@@ -53,6 +59,31 @@ class TestSocket(object):
         self._records = []
 
 
+class ConnectedSocket(object):
+    """
+    Connected datagram socket of one endpoint, it records data with
+    address of endpoint in shared `TestSocket`
+    """
+
+    def __init__(self, records, address):
+        self._records = records
+        self._address = address
+
+    def send(self, data):
+        self._records.sendto(data, self._address)
+
+    def close(self):
+        pass
+
+
+def connect_test_socket(udp, socket):
+    """
+    Make `UDPBuffer` send datagrams of all endpoints to `TestSocket`
+    """
+    udp._make_socket = lambda address: ConnectedSocket(socket, address)
+    return udp
+
+
 def socket_data(socket):
     record = socket.pop()
     result = []
@@ -60,3 +91,155 @@ def socket_data(socket):
         data = c.split("\n")
         result.append(json.loads(data[1]))
     return result
+
+
+class BulkHTTPServer(object):
+    """
+    Local stand-in of ElasticSearch `_bulk` endpoint, it stores received
+    bodies and answers with per item results, documents with `"reject"`
+    field are rejected.
+    """
+
+    def __init__(self):
+        import threading
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+            from socketserver import ThreadingMixIn
+        except ImportError:  # pragma: no cover
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+            from SocketServer import ThreadingMixIn
+
+        server = self
+        self.bodies = []
+        self.clients = set()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                size = int(self.headers['Content-Length'])
+                body = self.rfile.read(size)
+                if self.headers.get('Content-Encoding'):
+                    body = decompress(body)
+                server.bodies.append(body)
+                server.clients.add(self.client_address)
+                lines = [l for l in body.decode('utf-8').split('\n') if l]
+                items = []
+                for doc in lines[1::2]:
+                    if 'reject' in json.loads(doc):
+                        items.append({'index': {'status': 400, 'error': {
+                            'type': 'mapper_parsing_exception'}}})
+                    else:
+                        items.append({'index': {'status': 201}})
+                response = json.dumps({
+                    'errors': any('error' in i['index'] for i in items),
+                    'items': items,
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def documents(self):
+        result = []
+        for body in self.bodies:
+            lines = [l for l in body.decode('utf-8').split('\n') if l]
+            result.extend(json.loads(doc) for doc in lines[1::2])
+        return result
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class DecodingUDPReceiver(object):
+    """
+    Local UDP receiver that decompresses every datagram made by
+    `pysllo.utils.compression.Compressor`
+    """
+
+    def __init__(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.settimeout(1)
+        self.address = self._socket.getsockname()
+        self.sizes = []
+
+    def receive(self):
+        datagram = self._socket.recv(65535)
+        self.sizes.append(len(datagram))
+        return decompress(datagram)
+
+    def documents(self, count):
+        result = []
+        for _ in range(count):
+            lines = self.receive().decode('utf-8').split('\n')
+            lines = [l for l in lines if l]
+            result.extend(json.loads(doc) for doc in lines[1::2])
+        return result
+
+    def close(self):
+        self._socket.close()
+
+
+class StreamReceiver(object):
+    """
+    Local TCP or Unix socket server that collects lines sent through
+    persistent connections
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.bind(('127.0.0.1', 0))
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.bind(path)
+        self._socket.listen(8)
+        self._socket.settimeout(1)
+        self.address = self._socket.getsockname()
+        self.connections = 0
+        self._client = None
+        self._data = b''
+
+    def _accept(self):
+        self._client, _ = self._socket.accept()
+        self._client.settimeout(1)
+        self.connections += 1
+
+    def lines(self, count):
+        if self._client is None:
+            self._accept()
+        while self._data.count(b'\n') < count:
+            chunk = self._client.recv(65535)
+            if not chunk:
+                self._client.close()
+                self._accept()
+            self._data += chunk
+        lines = self._data.split(b'\n')
+        self._data = b'\n'.join(lines[count:])
+        return lines[:count]
+
+    def drop_client(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def close(self):
+        self.drop_client()
+        self._socket.close()